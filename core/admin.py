@@ -251,12 +251,66 @@ class AttendanceAdmin(admin.ModelAdmin):
     list_select_related = ['student']
     date_hierarchy = 'date'
 
+@admin.register(ClassAttendanceDaily)
+class ClassAttendanceDailyAdmin(admin.ModelAdmin):
+    list_display = ['class_level', 'date', 'present_count', 'absent_count', 'updated_at']
+    list_filter = ['class_level']
+    list_select_related = ['class_level']
+    date_hierarchy = 'date'
+    readonly_fields = ['updated_at']
+
+@admin.register(StudentAttendanceMonthly)
+class StudentAttendanceMonthlyAdmin(admin.ModelAdmin):
+    list_display = ['student', 'month', 'present_count', 'absent_count', 'updated_at']
+    search_fields = ['student__first_name', 'student__last_name', 'student__student_id']
+    list_select_related = ['student']
+    date_hierarchy = 'month'
+    readonly_fields = ['updated_at']
+
+@admin.register(AttendanceBitmap)
+class AttendanceBitmapAdmin(admin.ModelAdmin):
+    list_display = ['student', 'academic_year', 'term', 'start_date', 'end_date', 'updated_at']
+    list_filter = ['academic_year', 'term']
+    search_fields = ['student__first_name', 'student__last_name', 'student__student_id']
+    list_select_related = ['student', 'academic_year']
+    readonly_fields = ['marked', 'present', 'updated_at']
+
+@admin.register(StudentAttendanceWindow)
+class StudentAttendanceWindowAdmin(admin.ModelAdmin):
+    list_display = ['student', 'window_days', 'present_days', 'marked_days', 'attendance_rate', 'is_flagged', 'as_of']
+    list_filter = ['is_flagged', 'window_days']
+    search_fields = ['student__first_name', 'student__last_name', 'student__student_id']
+    list_select_related = ['student']
+    readonly_fields = ['flagged_at', 'updated_at']
+
+@admin.register(AttendanceSubmission)
+class AttendanceSubmissionAdmin(admin.ModelAdmin):
+    list_display = ['key', 'submitted_by', 'date', 'record_count', 'created_at']
+    list_filter = ['date']
+    search_fields = ['key', 'submitted_by__username']
+    list_select_related = ['submitted_by']
+    readonly_fields = ['created_at']
+
+def run_regrade(modeladmin, request, results):
+    from core.grading import regrade_results
+    scanned = changed = 0
+    for batch in regrade_results(results):
+        scanned += batch['scanned']
+        changed += batch['changed']
+    modeladmin.message_user(request, f"Regraded {scanned} results; {changed} results changed.")
+
 @admin.register(Exam)
 class ExamAdmin(admin.ModelAdmin):
     list_display = ['name', 'exam_type', 'subject', 'class_level', 'exam_date', 'total_marks']
     list_filter = ['exam_type', 'subject', 'class_level', 'exam_date']  # Changed 'class_name' to 'class_level'
     search_fields = ['name', 'subject__name']
     list_select_related = ['subject', 'class_level']
+    
+    actions = ['regrade_exams']
+    
+    def regrade_exams(self, request, queryset):
+        run_regrade(self, request, ExamResult.objects.filter(exam__in=queryset))
+    regrade_exams.short_description = "Regrade results for selected exams"
 
 @admin.register(ExamResult)
 class ExamResultAdmin(admin.ModelAdmin):
@@ -264,6 +318,35 @@ class ExamResultAdmin(admin.ModelAdmin):
     list_filter = ['exam', 'grade']
     search_fields = ['student__first_name', 'student__last_name', 'exam__name']
     list_select_related = ['student', 'exam']
+    
+    actions = ['regrade_results']
+    
+    def regrade_results(self, request, queryset):
+        run_regrade(self, request, queryset)
+    regrade_results.short_description = "Regrade selected results"
+
+@admin.register(ExamSummary)
+class ExamSummaryAdmin(admin.ModelAdmin):
+    list_display = ['exam', 'result_count', 'min_marks', 'max_marks', 'pass_count', 'updated_at']
+    search_fields = ['exam__name']
+    list_select_related = ['exam']
+    readonly_fields = ['updated_at']
+
+@admin.register(ResultImportJob)
+class ResultImportJobAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'exam', 'uploaded_by', 'status', 'processed_rows', 'success_count', 'error_count', 'created_at']
+    list_filter = ['status', 'file_format', 'created_at']
+    search_fields = ['original_name', 'exam__name', 'uploaded_by__username']
+    list_select_related = ['exam', 'uploaded_by']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+@admin.register(ReportCardJob)
+class ReportCardJobAdmin(admin.ModelAdmin):
+    list_display = ['academic_year', 'term', 'class_level', 'requested_by', 'status', 'processed_cards', 'rendered_cards', 'skipped_cards', 'created_at']
+    list_filter = ['status', 'term', 'academic_year']
+    search_fields = ['class_level__name', 'requested_by__username']
+    list_select_related = ['academic_year', 'class_level', 'requested_by']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
 
 @admin.register(FeePayment)
 class FeePaymentAdmin(admin.ModelAdmin):
@@ -273,6 +356,22 @@ class FeePaymentAdmin(admin.ModelAdmin):
     list_select_related = ['student', 'fee']
     date_hierarchy = 'payment_date'
 
+@admin.register(Reminder)
+class ReminderAdmin(admin.ModelAdmin):
+    list_display = ['student_name', 'fee', 'sent_via', 'status', 'attempts', 'sent_date', 'delivered_at']
+    list_filter = ['status', 'sent_via']
+    search_fields = ['student_name', 'email', 'phone']
+    list_select_related = ['fee']
+    readonly_fields = ['sent_date', 'attempts', 'delivered_at', 'last_error']
+
+@admin.register(StudentFeeBalance)
+class StudentFeeBalanceAdmin(admin.ModelAdmin):
+    list_display = ['student', 'academic_year', 'total_billed', 'total_paid', 'outstanding', 'updated_at']
+    list_filter = ['academic_year']
+    search_fields = ['student__first_name', 'student__last_name', 'student__student_id']
+    list_select_related = ['student', 'academic_year']
+    readonly_fields = ['total_billed', 'total_paid', 'outstanding', 'updated_at']
+
 @admin.register(Notice)
 class NoticeAdmin(admin.ModelAdmin):
     list_display = ['title', 'priority', 'target_audience', 'publish_date', 'is_active']
@@ -302,6 +401,14 @@ class MessageAdmin(admin.ModelAdmin):
     readonly_fields = ['sent_date']
     date_hierarchy = 'sent_date'
 
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ['user_low', 'user_high', 'last_activity', 'unread_low', 'unread_high']
+    search_fields = ['user_low__username', 'user_high__username']
+    list_select_related = ['user_low', 'user_high']
+    readonly_fields = ['last_message', 'last_activity', 'unread_low', 'unread_high']
+    raw_id_fields = ['user_low', 'user_high']
+
 @admin.register(SchoolInfo)
 class SchoolInfoAdmin(admin.ModelAdmin):
     list_display = ['name', 'phone', 'email', 'established_date']
@@ -319,4 +426,10 @@ class BookAdmin(admin.ModelAdmin):
 class BookBorrowingAdmin(admin.ModelAdmin):
     list_display = ['book', 'borrower', 'borrowed_date', 'due_date', 'status', 'is_overdue']
     list_filter = ['status', 'borrowed_date']
-    search_fields = ['book__title', 'borrower__username']
\ No newline at end of file
+    search_fields = ['book__title', 'borrower__username']
+
+@admin.register(GradingSystem)
+class GradingSystemAdmin(admin.ModelAdmin):
+    list_display = ['name', 'grade', 'min_mark', 'max_mark', 'points', 'remarks', 'is_active']
+    list_filter = ['is_active', 'name']
+    list_editable = ['is_active']
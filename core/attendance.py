@@ -0,0 +1,313 @@
+# core/attendance.py
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .attendance_bitmaps import apply_bitmap_changes
+from .dashboard_metrics import invalidate_dashboard_metrics
+from .fragment_cache import bump_fragment_generation
+
+def commit_register(attendance_date, entries, marked_by=None):
+    """
+    Save a day's register in a fixed number of queries.
+
+    ``entries`` maps a student pk to a (status, remarks) pair. Existing rows
+    for the date are fetched and locked in one query, then new rows are
+    inserted with one bulk_create and changed rows written with one
+    bulk_update, all inside a single transaction. Returns a dict of student pk -> 'created',
+    'updated' or 'unchanged'.
+    """
+    from .models import Attendance
+
+    outcome = {}
+    if not entries:
+        return outcome
+
+    marked_by_id = getattr(marked_by, 'pk', marked_by)
+    now = timezone.now()
+    with transaction.atomic():
+        # The existing rows are read and locked inside the transaction, so a
+        # concurrent save of the same register cannot slip in between this
+        # read and the writes and leave the rollups counting a stale status
+        existing = {
+            attendance.student_id: attendance
+            for attendance in Attendance.objects.select_for_update().filter(
+                student_id__in=list(entries), date=attendance_date
+            ).order_by()
+        }
+
+        to_create = []
+        to_update = []
+        changes = []
+        for student_pk, (status, remarks) in entries.items():
+            remarks = remarks or ''
+            attendance = existing.get(student_pk)
+            if attendance is None:
+                changes.append((student_pk, attendance_date, None, status))
+                to_create.append(Attendance(
+                    student_id=student_pk,
+                    date=attendance_date,
+                    status=status,
+                    remarks=remarks,
+                    marked_by_id=marked_by_id,
+                ))
+                outcome[student_pk] = 'created'
+            elif attendance.status != status or attendance.remarks != remarks:
+                changes.append((student_pk, attendance_date, attendance.status, status))
+                attendance.status = status
+                attendance.remarks = remarks
+                attendance.marked_by_id = marked_by_id
+                # bulk_update does not touch auto_now fields
+                attendance.updated_at = now
+                to_update.append(attendance)
+                outcome[student_pk] = 'updated'
+            else:
+                outcome[student_pk] = 'unchanged'
+
+        if to_create:
+            Attendance.objects.bulk_create(to_create)
+        if to_update:
+            Attendance.objects.bulk_update(to_update, ['status', 'remarks', 'marked_by', 'updated_at'])
+        # Bulk writes skip the model signals, so the rollups are updated here
+        apply_attendance_changes(changes)
+
+    return outcome
+
+# Batch register submissions
+
+def parse_register_records(records, allowed_ids):
+    """
+    Turn submitted register records into commit_register entries.
+
+    Each record is a dict with student_id, status ('present'/'absent' or a
+    boolean) and optional remarks. Returns (entries, rejected) where
+    rejected lists the records that were dropped and why.
+    """
+    entries = {}
+    rejected = []
+    for record in records:
+        try:
+            student_id = int(record.get('student_id'))
+        except (AttributeError, TypeError, ValueError):
+            rejected.append({'record': record, 'error': 'Invalid student id'})
+            continue
+        if student_id not in allowed_ids:
+            rejected.append({'student_id': student_id, 'error': 'Student not found in your classes'})
+            continue
+
+        status = record.get('status')
+        if isinstance(status, str):
+            status = status.lower() in ('present', 'true', '1')
+        entries[student_id] = (bool(status), str(record.get('remarks') or '').strip())
+    return entries, rejected
+
+def apply_register_batch(user, key, attendance_date, entries, rejected=None):
+    """
+    Apply a batch register exactly once per (user, key).
+
+    The register and its AttendanceSubmission are written in the same
+    transaction, so a retried request either finds the stored response and
+    replays it or applies the whole register. Returns (response, replayed).
+    """
+    from django.db import IntegrityError
+    from .models import AttendanceSubmission
+
+    submission = AttendanceSubmission.objects.filter(submitted_by=user, key=key).first()
+    if submission is not None:
+        return submission.response, True
+
+    try:
+        with transaction.atomic():
+            outcome = commit_register(attendance_date, entries, marked_by=user)
+            response = {
+                'date': attendance_date.isoformat(),
+                'results': {str(student_id): status for student_id, status in outcome.items()},
+                'rejected': rejected or [],
+            }
+            AttendanceSubmission.objects.create(
+                key=key,
+                submitted_by=user,
+                date=attendance_date,
+                record_count=len(entries),
+                response=response,
+            )
+    except IntegrityError:
+        # A concurrent retry with the same key got there first
+        submission = AttendanceSubmission.objects.filter(submitted_by=user, key=key).first()
+        if submission is None:
+            raise
+        return submission.response, True
+
+    return response, False
+
+# Rollups
+
+def _delta(old, new):
+    """(present, absent) change for one row going from ``old`` to ``new`` status (None = no row)"""
+    present = absent = 0
+    if old is not None:
+        present, absent = (present - 1, absent) if old else (present, absent - 1)
+    if new is not None:
+        present, absent = (present + 1, absent) if new else (present, absent + 1)
+    return present, absent
+
+def _apply_rollup_deltas(model, owner_field, period_field, deltas):
+    """
+    Add (present, absent) deltas to rollup rows keyed by (owner, period).
+    Missing rows are inserted only when something is being added, and rows
+    with the same delta are updated together with one F() expression.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+
+    model.objects.bulk_create(
+        [model(**{owner_field: owner, period_field: period})
+         for (owner, period), (present, absent) in deltas.items() if present > 0 or absent > 0],
+        ignore_conflicts=True,
+    )
+
+    groups = {}
+    for (owner, period), delta in deltas.items():
+        groups.setdefault((period, delta), []).append(owner)
+    now = timezone.now()
+    for (period, (present, absent)), owners in groups.items():
+        model.objects.filter(**{f'{owner_field}__in': owners, period_field: period}).update(
+            present_count=Greatest(F('present_count') + present, 0),
+            absent_count=Greatest(F('absent_count') + absent, 0),
+            updated_at=now,
+        )
+
+def apply_attendance_changes(changes):
+    """
+    Keep the attendance rollups and bitmaps in step with a set of row changes.
+
+    ``changes`` is an iterable of (student_id, date, old_status, new_status)
+    where a status of None means the row did not exist before (or no longer
+    exists). Class rollups follow the student's current class.
+    """
+    from .models import ClassAttendanceDaily, Student, StudentAttendanceMonthly
+
+    changes = [change for change in changes if change[2] != change[3]]
+    if not changes:
+        return
+
+    class_ids = dict(
+        Student.objects.filter(pk__in={change[0] for change in changes})
+        .order_by().values_list('pk', 'current_class_id')
+    )
+    class_deltas = {}
+    student_deltas = {}
+    for student_id, day, old, new in changes:
+        present, absent = _delta(old, new)
+        month = day.replace(day=1)
+        previous = student_deltas.get((student_id, month), (0, 0))
+        student_deltas[(student_id, month)] = (previous[0] + present, previous[1] + absent)
+        class_id = class_ids.get(student_id)
+        if class_id is not None:
+            previous = class_deltas.get((class_id, day), (0, 0))
+            class_deltas[(class_id, day)] = (previous[0] + present, previous[1] + absent)
+
+    with transaction.atomic():
+        _apply_rollup_deltas(ClassAttendanceDaily, 'class_level_id', 'date', class_deltas)
+        _apply_rollup_deltas(StudentAttendanceMonthly, 'student_id', 'month', student_deltas)
+        apply_bitmap_changes(changes)
+    invalidate_dashboard_metrics('attendance')
+    bump_fragment_generation('attendance')
+
+def recount_attendance_rollups(student_id, day):
+    """Recount the class-day and student-month rollups touched by one row from the raw table"""
+    from .models import Attendance, ClassAttendanceDaily, Student, StudentAttendanceMonthly
+
+    counts = dict(present_count=Count('id', filter=Q(status=True)), absent_count=Count('id', filter=Q(status=False)))
+    month = day.replace(day=1)
+    class_id = Student.objects.filter(pk=student_id).values_list('current_class_id', flat=True).first()
+
+    with transaction.atomic():
+        totals = Attendance.objects.filter(
+            student_id=student_id, date__gte=month, date__lt=_next_month(month)
+        ).order_by().aggregate(**counts)
+        StudentAttendanceMonthly.objects.update_or_create(student_id=student_id, month=month, defaults=totals)
+        if class_id is not None:
+            totals = Attendance.objects.filter(
+                student__current_class_id=class_id, date=day
+            ).order_by().aggregate(**counts)
+            ClassAttendanceDaily.objects.update_or_create(class_level_id=class_id, date=day, defaults=totals)
+        status = Attendance.objects.filter(student_id=student_id, date=day).values_list('status', flat=True).first()
+        apply_bitmap_changes([(student_id, day, None, status)])
+    invalidate_dashboard_metrics('attendance')
+    bump_fragment_generation('attendance')
+
+def _next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+def rebuild_attendance_rollups(batch_size=1000):
+    """
+    Rebuild both rollup tables from the raw attendance rows with two grouped
+    queries. Class rollups are attributed to each student's current class.
+    Returns (class_days, student_months) written.
+    """
+    from django.db.models.functions import TruncMonth
+    from .models import Attendance, ClassAttendanceDaily, StudentAttendanceMonthly
+
+    counts = dict(present=Count('id', filter=Q(status=True)), absent=Count('id', filter=Q(status=False)))
+    class_rows = (
+        Attendance.objects.filter(student__current_class__isnull=False).order_by()
+        .values_list('student__current_class', 'date').annotate(**counts)
+    )
+    student_rows = (
+        Attendance.objects.order_by().annotate(month=TruncMonth('date'))
+        .values_list('student', 'month').annotate(**counts)
+    )
+
+    with transaction.atomic():
+        ClassAttendanceDaily.objects.all().delete()
+        StudentAttendanceMonthly.objects.all().delete()
+        class_days = _bulk_insert(ClassAttendanceDaily, 'class_level_id', 'date', class_rows, batch_size)
+        student_months = _bulk_insert(StudentAttendanceMonthly, 'student_id', 'month', student_rows, batch_size)
+    return class_days, student_months
+
+def _bulk_insert(model, owner_field, period_field, rows, batch_size):
+    written = 0
+    batch = []
+    for owner, period, present, absent in rows.iterator(chunk_size=batch_size):
+        batch.append(model(**{owner_field: owner, period_field: period,
+                              'present_count': present, 'absent_count': absent}))
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+def student_attendance_summaries(student_ids):
+    """Lifetime totals per student from the monthly rollups, in one query"""
+    from .models import StudentAttendanceMonthly
+
+    summaries = {student_id: {'total_days': 0, 'present_days': 0, 'absent_days': 0} for student_id in student_ids}
+    rows = (
+        StudentAttendanceMonthly.objects.filter(student_id__in=summaries).order_by()
+        .values_list('student').annotate(present=Sum('present_count'), absent=Sum('absent_count'))
+    )
+    for student_id, present, absent in rows:
+        summaries[student_id] = {
+            'total_days': present + absent,
+            'present_days': present,
+            'absent_days': absent,
+        }
+    return summaries
+
+def student_attendance_summary(student):
+    return student_attendance_summaries([student.pk])[student.pk]
+
+def class_attendance_totals(day, classes=None):
+    """Present and absent counts for a day from the class rollups, optionally limited to some classes"""
+    from .models import ClassAttendanceDaily
+
+    rollups = ClassAttendanceDaily.objects.filter(date=day)
+    if classes is not None:
+        rollups = rollups.filter(class_level__in=classes)
+    totals = rollups.order_by().aggregate(present=Sum('present_count'), absent=Sum('absent_count'))
+    return {'present': totals['present'] or 0, 'absent': totals['absent'] or 0}
@@ -0,0 +1,261 @@
+# core/attendance_bitmaps.py
+from datetime import timedelta
+from django.db import transaction
+from .terms import TERMS, term_dates
+
+# Share of marked days a student can miss before counting as chronically absent
+CHRONIC_ABSENCE_THRESHOLD = 0.1
+CHRONIC_ABSENCE_MIN_DAYS = 10
+
+def to_int(data):
+    return int.from_bytes(bytes(data or b''), 'little')
+
+def to_bytes(value, days):
+    return value.to_bytes((days + 7) // 8, 'little')
+
+def term_span(day, academic_years):
+    """(academic_year, term, start, end) of the term containing ``day``, or None outside every year"""
+    for academic_year in academic_years:
+        if academic_year.start_date <= day <= academic_year.end_date:
+            for term in TERMS:
+                start, end = term_dates(academic_year, term)
+                if start <= day <= end:
+                    return academic_year, term, start, end
+    return None
+
+def apply_bitmap_changes(changes):
+    """
+    Write attendance changes through to the term bitmaps.
+
+    ``changes`` is an iterable of (student_id, date, old_status, new_status)
+    as passed to apply_attendance_changes; new_status None clears the day.
+    All affected bitmaps are loaded with one locking query and written back
+    with one bulk_update plus one bulk_create. Days outside every academic
+    year are not stored.
+    """
+    from .models import AcademicYear, AttendanceBitmap
+
+    final = {}
+    for student_id, day, old, new in changes:
+        final[(student_id, day)] = new
+    if not final:
+        return
+
+    days = [day for student_id, day in final]
+    academic_years = list(AcademicYear.objects.filter(
+        start_date__lte=max(days), end_date__gte=min(days)
+    ).order_by('start_date'))
+    spans = {day: term_span(day, academic_years) for day in set(days)}
+
+    wanted = {}
+    for (student_id, day), status in final.items():
+        span = spans[day]
+        if span is None:
+            continue
+        academic_year, term, start, end = span
+        wanted.setdefault((student_id, academic_year.pk, term), (start, end, []))[2].append((day, status))
+    if not wanted:
+        return
+
+    with transaction.atomic():
+        existing = {
+            (bitmap.student_id, bitmap.academic_year_id, bitmap.term): bitmap
+            for bitmap in AttendanceBitmap.objects.select_for_update().filter(
+                student_id__in={key[0] for key in wanted},
+                academic_year_id__in={key[1] for key in wanted},
+                term__in={key[2] for key in wanted},
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for key, (start, end, updates) in wanted.items():
+            bitmap = existing.get(key)
+            if bitmap is None:
+                if all(status is None for day, status in updates):
+                    continue  # Nothing stored to clear
+                student_id, academic_year_id, term = key
+                bitmap = AttendanceBitmap(
+                    student_id=student_id, academic_year_id=academic_year_id,
+                    term=term, start_date=start, end_date=end,
+                )
+                to_create.append(bitmap)
+            else:
+                to_update.append(bitmap)
+
+            marked = to_int(bitmap.marked)
+            present = to_int(bitmap.present)
+            if (bitmap.start_date, bitmap.end_date) != (start, end):
+                # The academic year's dates changed since this bitmap was written
+                marked, present = (_rebase(value, bitmap.start_date, start, end) for value in (marked, present))
+                bitmap.start_date, bitmap.end_date = start, end
+            for day, status in updates:
+                bit = 1 << (day - bitmap.start_date).days
+                if status is None:
+                    marked &= ~bit
+                    present &= ~bit
+                else:
+                    marked |= bit
+                    present = present | bit if status else present & ~bit
+            length = (bitmap.end_date - bitmap.start_date).days + 1
+            bitmap.marked = to_bytes(marked, length)
+            bitmap.present = to_bytes(present, length)
+
+        if to_update:
+            AttendanceBitmap.objects.bulk_update(to_update, ['start_date', 'end_date', 'marked', 'present'])
+        if to_create:
+            AttendanceBitmap.objects.bulk_create(to_create)
+
+def _rebase(value, old_start, start, end):
+    """Move day bits recorded from ``old_start`` onto a bitmap starting at ``start``, dropping days past ``end``"""
+    shift = (old_start - start).days
+    value = value << shift if shift >= 0 else value >> -shift
+    return value & ((1 << ((end - start).days + 1)) - 1)
+
+def rebuild_attendance_bitmaps(batch_size=500):
+    """Rebuild every bitmap from the raw attendance rows, one batch of students at a time"""
+    from .models import AcademicYear, Attendance, AttendanceBitmap, Student
+
+    academic_years = list(AcademicYear.objects.order_by('start_date'))
+    student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+
+    with transaction.atomic():
+        AttendanceBitmap.objects.all().delete()
+        for offset in range(0, len(student_ids), batch_size):
+            batch = student_ids[offset:offset + batch_size]
+            rows = Attendance.objects.filter(student_id__in=batch).order_by().values_list('student_id', 'date', 'status')
+
+            bitmaps = {}
+            for student_id, day, status in rows.iterator(chunk_size=2000):
+                span = term_span(day, academic_years)
+                if span is None:
+                    continue
+                academic_year, term, start, end = span
+                key = (student_id, academic_year.pk, term)
+                if key not in bitmaps:
+                    bitmaps[key] = [start, end, 0, 0]
+                bit = 1 << (day - start).days
+                bitmaps[key][2] |= bit
+                if status:
+                    bitmaps[key][3] |= bit
+
+            AttendanceBitmap.objects.bulk_create([
+                AttendanceBitmap(
+                    student_id=student_id, academic_year_id=academic_year_id, term=term,
+                    start_date=start, end_date=end,
+                    marked=to_bytes(marked, (end - start).days + 1),
+                    present=to_bytes(present, (end - start).days + 1),
+                )
+                for (student_id, academic_year_id, term), (start, end, marked, present) in bitmaps.items()
+            ])
+    return AttendanceBitmap.objects.count()
+
+# Queries
+
+def _range_bits(bitmap, start, end):
+    """(marked, present, first_day, length) for the part of a bitmap inside [start, end]"""
+    first = max(start, bitmap.start_date)
+    last = min(end, bitmap.end_date)
+    offset = (first - bitmap.start_date).days
+    length = (last - first).days + 1
+    mask = (1 << length) - 1
+    return (to_int(bitmap.marked) >> offset) & mask, (to_int(bitmap.present) >> offset) & mask, first, length
+
+def load_bitmaps(student_ids, start, end):
+    """Bitmaps overlapping [start, end] for some students, grouped by student in date order"""
+    from .models import AttendanceBitmap
+
+    bitmaps = {student_id: [] for student_id in student_ids}
+    rows = AttendanceBitmap.objects.filter(
+        student_id__in=bitmaps, start_date__lte=end, end_date__gte=start
+    ).order_by('student_id', 'start_date').only('student_id', 'start_date', 'end_date', 'marked', 'present')
+    for bitmap in rows:
+        bitmaps[bitmap.student_id].append(bitmap)
+    return bitmaps
+
+def _count(bitmaps, start, end):
+    marked_days = present_days = 0
+    for bitmap in bitmaps:
+        if bitmap.end_date < start or bitmap.start_date > end:
+            continue
+        marked, present, first, length = _range_bits(bitmap, start, end)
+        marked_days += marked.bit_count()
+        present_days += present.bit_count()
+    return {
+        'marked_days': marked_days,
+        'present_days': present_days,
+        'absent_days': marked_days - present_days,
+    }
+
+def attendance_counts(student_ids, start, end):
+    """{student_id: {'marked_days', 'present_days', 'absent_days'}} over [start, end] by popcount"""
+    return {
+        student_id: _count(bitmaps, start, end)
+        for student_id, bitmaps in load_bitmaps(student_ids, start, end).items()
+    }
+
+def window_counts(student_ids, end, windows):
+    """Counts for several trailing windows of days ending on ``end``, from one bitmap query"""
+    starts = {days: end - timedelta(days=days - 1) for days in windows}
+    return {
+        student_id: {days: _count(bitmaps, start, end) for days, start in starts.items()}
+        for student_id, bitmaps in load_bitmaps(student_ids, min(starts.values()), end).items()
+    }
+
+def present_days(student, start, end):
+    return attendance_counts([student.pk], start, end)[student.pk]['present_days']
+
+def attendance_rate(student, start, end):
+    """Percentage of marked days the student was present, or None when nothing was marked"""
+    counts = attendance_counts([student.pk], start, end)[student.pk]
+    if not counts['marked_days']:
+        return None
+    return round(counts['present_days'] / counts['marked_days'] * 100, 1)
+
+def attendance_streaks(student, start, end):
+    """
+    Longest present and absent runs over [start, end], plus the absent run
+    still open at the end of the range. Days with no record (weekends,
+    holidays) neither extend nor break a run.
+    """
+    streaks = {'longest_present': 0, 'longest_absent': 0, 'current_absent': 0}
+    run_status = None
+    run_length = 0
+    for bitmap in load_bitmaps([student.pk], start, end)[student.pk]:
+        marked, present, first, length = _range_bits(bitmap, start, end)
+        while marked:
+            bit = marked & -marked
+            marked ^= bit
+            status = bool(present & bit)
+            run_length = run_length + 1 if status == run_status else 1
+            run_status = status
+            key = 'longest_present' if status else 'longest_absent'
+            streaks[key] = max(streaks[key], run_length)
+    if run_status is False:
+        streaks['current_absent'] = run_length
+    return streaks
+
+def chronic_absentees(start, end, student_ids=None, threshold=CHRONIC_ABSENCE_THRESHOLD,
+                      min_days=CHRONIC_ABSENCE_MIN_DAYS):
+    """
+    Students who missed at least ``threshold`` of their marked days in
+    [start, end], ignoring students with fewer than ``min_days`` marked.
+    Returns a list of dicts sorted by absence rate, worst first.
+    """
+    from .models import AttendanceBitmap
+
+    if student_ids is None:
+        student_ids = set(
+            AttendanceBitmap.objects.filter(start_date__lte=end, end_date__gte=start)
+            .order_by().values_list('student_id', flat=True)
+        )
+
+    absentees = []
+    for student_id, counts in attendance_counts(student_ids, start, end).items():
+        if counts['marked_days'] < min_days:
+            continue
+        rate = counts['absent_days'] / counts['marked_days']
+        if rate >= threshold:
+            absentees.append({'student_id': student_id, 'absence_rate': round(rate * 100, 1), **counts})
+    absentees.sort(key=lambda row: row['absence_rate'], reverse=True)
+    return absentees
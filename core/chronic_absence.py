@@ -0,0 +1,176 @@
+# core/chronic_absence.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .attendance_bitmaps import window_counts
+from .conversations import record_messages
+
+CHECKPOINT_NAME = 'detect_chronic_absence'
+
+# Trailing window in days -> (minimum attendance percentage, minimum marked days before judging)
+DEFAULT_WINDOWS = {
+    7: (60, 3),
+    30: (80, 10),
+    90: (90, 20),
+}
+
+def absence_windows():
+    return getattr(settings, 'CHRONIC_ABSENCE_WINDOWS', DEFAULT_WINDOWS)
+
+def changed_students(checkpoint, batch_size):
+    """
+    Yield (student_ids, last_timestamp, last_id) for attendance rows written
+    after the checkpoint, one page of at most ``batch_size`` rows at a time.
+    Rows are paged on (updated_at, id) so a page boundary never skips rows
+    that share a timestamp.
+    """
+    from .models import Attendance
+
+    last_timestamp, last_id = checkpoint.last_timestamp, checkpoint.last_id or 0
+    while True:
+        rows = Attendance.objects.order_by('updated_at', 'id')
+        if last_timestamp is not None:
+            rows = rows.filter(
+                Q(updated_at__gt=last_timestamp) | Q(updated_at=last_timestamp, id__gt=last_id)
+            )
+        page = list(rows.values_list('id', 'student_id', 'updated_at')[:batch_size])
+        if not page:
+            return
+        last_id, student_id, last_timestamp = page[-1]
+        yield {row[1] for row in page}, last_timestamp, last_id
+        if len(page) < batch_size:
+            return
+
+def update_windows(student_ids, as_of, windows=None):
+    """
+    Refresh the rolling counters of some students and return the
+    (student_id, window) pairs that have just crossed below their threshold.
+    """
+    from .models import StudentAttendanceWindow
+
+    windows = windows or absence_windows()
+    counts = window_counts(student_ids, as_of, list(windows))
+    existing = {
+        (window.student_id, window.window_days): window
+        for window in StudentAttendanceWindow.objects.filter(student_id__in=student_ids, window_days__in=list(windows))
+    }
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    newly_flagged = []
+    for student_id, by_window in counts.items():
+        for days, (minimum_rate, minimum_days) in windows.items():
+            count = by_window[days]
+            flagged = (
+                count['marked_days'] >= minimum_days and
+                count['present_days'] * 100 < minimum_rate * count['marked_days']
+            )
+            window = existing.get((student_id, days))
+            if window is None:
+                window = StudentAttendanceWindow(student_id=student_id, window_days=days)
+                to_create.append(window)
+            else:
+                to_update.append(window)
+
+            if flagged and not window.is_flagged:
+                window.flagged_at = now
+                newly_flagged.append((student_id, days))
+            window.is_flagged = flagged
+            window.marked_days = count['marked_days']
+            window.present_days = count['present_days']
+            window.as_of = as_of
+            window.updated_at = now
+
+    with transaction.atomic():
+        StudentAttendanceWindow.objects.bulk_create(to_create)
+        StudentAttendanceWindow.objects.bulk_update(
+            to_update, ['marked_days', 'present_days', 'as_of', 'is_flagged', 'flagged_at', 'updated_at']
+        )
+    return newly_flagged, counts
+
+def build_alerts(flagged, counts, sender, windows=None):
+    """Unsaved Message objects telling each flagged student's parents and class teacher"""
+    from .models import Message, Student
+
+    windows = windows or absence_windows()
+    by_student = {}
+    for student_id, days in flagged:
+        by_student.setdefault(student_id, []).append(days)
+
+    students = (
+        Student.objects.filter(pk__in=by_student)
+        .select_related('current_class__class_teacher__user')
+        .prefetch_related('parents__user')
+    )
+    messages = []
+    for student in students:
+        lines = []
+        for days in sorted(by_student[student.pk]):
+            count = counts[student.pk][days]
+            rate = count['present_days'] * 100 / count['marked_days']
+            lines.append(
+                f"Last {days} days: present {count['present_days']} of {count['marked_days']} "
+                f"marked days ({rate:.0f}%, expected at least {windows[days][0]}%)."
+            )
+
+        recipients = [parent.user for parent in student.parents.all() if parent.user_id]
+        class_teacher = student.current_class.class_teacher if student.current_class else None
+        if class_teacher and class_teacher.user_id:
+            recipients.append(class_teacher.user)
+
+        content = (
+            f"{student.full_name} ({student.student_id}) has fallen below the expected attendance level.\n\n"
+            + "\n".join(lines)
+        )
+        for receiver in {user.pk: user for user in recipients}.values():
+            messages.append(Message(
+                sender=sender,
+                receiver=receiver,
+                subject=f"Attendance alert: {student.full_name}",
+                content=content,
+            ))
+    return messages
+
+def detect_chronic_absence(as_of=None, batch_size=500, sender=None, send_alerts=True):
+    """
+    Process attendance rows changed since the last run: refresh the rolling
+    windows of the students involved, alert parents and class teachers about
+    newly flagged windows, and advance the watermark after every batch.
+    Returns a dict of totals.
+    """
+    from .models import JobCheckpoint, Message, StudentAttendanceWindow
+
+    as_of = as_of or timezone.now().date()
+    checkpoint, created = JobCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    totals = {'students': 0, 'flagged': 0, 'messages': 0}
+
+    def process(student_ids):
+        flagged, counts = update_windows(student_ids, as_of)
+        if flagged and send_alerts and sender is not None:
+            messages = build_alerts(flagged, counts, sender)
+            Message.objects.bulk_create(messages)
+            # bulk_create skips the model signals, so the conversations are updated here
+            record_messages(messages)
+            totals['messages'] += len(messages)
+        totals['students'] += len(student_ids)
+        totals['flagged'] += len(flagged)
+
+    for student_ids, last_timestamp, last_id in changed_students(checkpoint, batch_size):
+        with transaction.atomic():
+            process(student_ids)
+            checkpoint.last_timestamp = last_timestamp
+            checkpoint.last_id = last_id
+            checkpoint.save(update_fields=['last_timestamp', 'last_id', 'updated_at'])
+
+    # Flagged windows also roll forward on days with no new marks, so they can clear
+    stale = set(
+        StudentAttendanceWindow.objects.filter(is_flagged=True, as_of__lt=as_of)
+        .order_by().values_list('student_id', flat=True)
+    )
+    if stale:
+        with transaction.atomic():
+            process(stale)
+
+    return totals
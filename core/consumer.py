@@ -4,7 +4,6 @@ from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 import redis
 import json
-from django.utils import timezone
 from .models import *
 
 # Initialize Redis connection (optional - for persistent online status)
@@ -69,8 +68,25 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
             if message_type == 'heartbeat':
                 # Update last activity timestamp
                 await self.update_last_activity()
+            elif message_type == 'typing':
+                # Relay straight to the other user's sockets; nothing is stored.
+                # Only users who already have a conversation can signal each other.
+                receiver_id = int(text_data_json.get('receiver_id'))
+                if not await self.has_conversation(receiver_id):
+                    return
+                await self.channel_layer.group_send(
+                    f"user_{receiver_id}",
+                    {
+                        'type': 'chat.typing',
+                        'user_id': self.user_id,
+                        'is_typing': bool(text_data_json.get('is_typing', True))
+                    }
+                )
+            elif message_type == 'read':
+                # A pushed message was shown in the open thread
+                await self.mark_read(int(text_data_json.get('sender_id')))
                 
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, TypeError, ValueError):
             pass
     
     async def user_online_status(self, event):
@@ -82,23 +98,53 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
             'is_online': event['is_online']
         }))
     
+    async def chat_message(self, event):
+        """A new message for this user (see core.realtime.publish_new_message)"""
+        await self.send(text_data=json.dumps({
+            'type': 'new_message',
+            'message': event['message']
+        }))
+    
+    async def chat_read(self, event):
+        """Someone read the messages this user sent them"""
+        await self.send(text_data=json.dumps({
+            'type': 'messages_read',
+            'reader_id': event['reader_id']
+        }))
+    
+    async def chat_typing(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'typing',
+            'user_id': event['user_id'],
+            'is_typing': event['is_typing']
+        }))
+    
+    @sync_to_async
+    def has_conversation(self, other_id):
+        from .conversations import conversation_with
+        
+        return conversation_with(self.user, other_id).exists()
+    
+    @sync_to_async
+    def mark_read(self, sender_id):
+        """Mark a conversation read; the sender gets a read receipt"""
+        from .conversations import mark_conversation_read
+        
+        try:
+            mark_conversation_read(self.user, sender_id)
+        except Exception as e:
+            print(f"Error marking messages read: {e}")
+    
     @sync_to_async
     def update_online_status(self, online):
-        """Update user's online status in the database"""
+        """Record the user's presence; the profile tables are updated by flush_presence"""
+        from .presence import mark_offline, record_heartbeat
+        
         try:
-            # Check what type of user this is and update accordingly
-            if hasattr(self.user, 'student'):
-                profile = self.user.student
-            elif hasattr(self.user, 'teacher'):
-                profile = self.user.teacher
-            elif hasattr(self.user, 'parent'):
-                profile = self.user.parent
+            if online:
+                record_heartbeat(self.user.id)
             else:
-                return  # Regular user without profile
-            
-            profile.is_online = online
-            profile.last_activity = timezone.now()
-            profile.save()
+                mark_offline(self.user.id)
             
         except Exception as e:
             print(f"Error updating online status: {e}")
@@ -106,47 +152,22 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
     @sync_to_async
     def update_last_activity(self):
         """Update user's last activity timestamp"""
+        from .presence import record_heartbeat
+        
         try:
-            if hasattr(self.user, 'student'):
-                profile = self.user.student
-            elif hasattr(self.user, 'teacher'):
-                profile = self.user.teacher
-            elif hasattr(self.user, 'parent'):
-                profile = self.user.parent
-            else:
-                return
-            
-            profile.last_activity = timezone.now()
-            profile.save()
+            record_heartbeat(self.user.id)
             
         except Exception as e:
             print(f"Error updating last activity: {e}")
 
 def check_user_online(user):
     """
-    Check if a user is currently online based on their profile type
+    Check if a user is currently online from their presence heartbeat
     """
+    from .presence import is_user_online
+    
     try:
-        # Determine user type and get their profile
-        if hasattr(user, 'student'):
-            profile = user.student
-        elif hasattr(user, 'teacher'):
-            profile = user.teacher
-        elif hasattr(user, 'parent'):
-            profile = user.parent
-        else:
-            return False  # Regular user without profile
-        
-        # Check if user is marked as online
-        if profile.is_online:
-            return True
-        
-        # Fallback: Check last activity (within last 5 minutes)
-        if hasattr(profile, 'last_activity'):
-            time_diff = timezone.now() - profile.last_activity
-            return time_diff.total_seconds() < 300  # 5 minutes
-        
-        return False
+        return is_user_online(user.id)
         
     except Exception as e:
         print(f"Error checking online status: {e}")
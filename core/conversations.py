@@ -0,0 +1,253 @@
+# core/conversations.py
+import mimetypes
+import os
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, IntegerField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils.dateparse import parse_datetime
+
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 100
+
+def user_pair(first_id, second_id):
+    """The (user_low_id, user_high_id) key of the conversation between two users"""
+    return (first_id, second_id) if first_id < second_id else (second_id, first_id)
+
+def conversation_with(user, other):
+    """The one Conversation row between two users, or a filter matching none"""
+    from .models import Conversation
+
+    low, high = user_pair(user.pk, getattr(other, 'pk', other))
+    return Conversation.objects.filter(user_low_id=low, user_high_id=high)
+
+def record_messages(messages):
+    """
+    Fold newly saved messages into their conversations: move last_message
+    and last_activity forward and add to the receiver's unread counter.
+    Missing conversation rows are inserted with one bulk_create, and each
+    conversation is then updated with one F() expression.
+    """
+    from .models import Conversation
+
+    summaries = {}
+    for message in messages:
+        key = user_pair(message.sender_id, message.receiver_id)
+        summary = summaries.setdefault(key, {'latest': message, 'unread_low': 0, 'unread_high': 0})
+        if (message.sent_date, message.pk) > (summary['latest'].sent_date, summary['latest'].pk):
+            summary['latest'] = message
+        if not message.is_read:
+            summary['unread_low' if message.receiver_id == key[0] else 'unread_high'] += 1
+    if not summaries:
+        return
+
+    with transaction.atomic():
+        Conversation.objects.bulk_create(
+            [Conversation(user_low_id=low, user_high_id=high) for low, high in summaries],
+            ignore_conflicts=True,
+        )
+        for (low, high), summary in summaries.items():
+            latest = summary['latest']
+            newer = Q(last_activity__isnull=True) | Q(last_activity__lte=latest.sent_date)
+            Conversation.objects.filter(user_low_id=low, user_high_id=high).update(
+                last_message_id=Case(
+                    When(newer, then=Value(latest.pk)), default=F('last_message_id'), output_field=IntegerField()
+                ),
+                last_activity=Case(
+                    When(newer, then=Value(latest.sent_date)), default=F('last_activity'), output_field=DateTimeField()
+                ),
+                unread_low=F('unread_low') + summary['unread_low'],
+                unread_high=F('unread_high') + summary['unread_high'],
+            )
+
+def mark_conversation_read(user, other):
+    """
+    Mark everything ``other`` sent to ``user`` as read, clear the user's
+    unread counter and send ``other`` a read receipt.
+    """
+    from .models import Message
+    from .realtime import publish_messages_read
+
+    other_id = getattr(other, 'pk', other)
+    field = 'unread_low' if user.pk < other_id else 'unread_high'
+    with transaction.atomic():
+        updated = Message.objects.filter(sender_id=other_id, receiver=user, is_read=False).update(is_read=True)
+        conversation_with(user, other_id).update(**{field: 0})
+        if updated:
+            publish_messages_read(user.pk, [other_id])
+    return updated
+
+def mark_all_messages_read(user):
+    from .models import Conversation, Message
+    from .realtime import publish_messages_read
+
+    with transaction.atomic():
+        unread = Message.objects.filter(receiver=user, is_read=False)
+        sender_ids = set(unread.order_by().values_list('sender_id', flat=True).distinct())
+        updated = unread.update(is_read=True)
+        Conversation.objects.filter(user_low=user).update(unread_low=0)
+        Conversation.objects.filter(user_high=user).update(unread_high=0)
+        publish_messages_read(user.pk, sender_ids)
+    return updated
+
+def unread_total(user):
+    """Unread messages across all of a user's conversations, from the counters"""
+    from django.db.models import Sum
+    from .models import Conversation
+
+    total = Conversation.objects.filter(Q(user_low=user) | Q(user_high=user)).aggregate(
+        total=Sum(Case(When(user_low=user, then=F('unread_low')), default=F('unread_high')))
+    )['total']
+    return total or 0
+
+def _pair_summaries(messages):
+    """
+    {(low, high): (last_message_id, last_activity, unread_low, unread_high)}
+    for every pair in a Message queryset, from one windowed query and one
+    grouped count.
+    """
+    low = Case(When(sender_id__lt=F('receiver_id'), then=F('sender_id')), default=F('receiver_id'))
+    high = Case(When(sender_id__lt=F('receiver_id'), then=F('receiver_id')), default=F('sender_id'))
+    latest = (
+        messages.annotate(low=low, high=high)
+        .annotate(row_number=Window(
+            RowNumber(),
+            partition_by=[F('low'), F('high')],
+            order_by=[F('sent_date').desc(), F('id').desc()],
+        ))
+        .filter(row_number=1).order_by().values_list('low', 'high', 'id', 'sent_date')
+    )
+    summaries = {(low_id, high_id): [message_id, sent_date, 0, 0] for low_id, high_id, message_id, sent_date in latest}
+
+    unread = messages.filter(is_read=False).order_by().values_list('sender_id', 'receiver_id').annotate(count=Count('id'))
+    for sender_id, receiver_id, count in unread:
+        key = user_pair(sender_id, receiver_id)
+        if key in summaries:
+            summaries[key][2 if receiver_id == key[0] else 3] += count
+    return summaries
+
+def recount_conversation(first_id, second_id):
+    """Recount one conversation row from the raw messages (used when messages are edited or deleted)"""
+    from .models import Conversation, Message
+
+    low, high = user_pair(first_id, second_id)
+    messages = Message.objects.filter(
+        Q(sender_id=low, receiver_id=high) | Q(sender_id=high, receiver_id=low)
+    )
+    message_id, last_activity, unread_low, unread_high = _pair_summaries(messages).get(
+        (low, high), (None, None, 0, 0)
+    )
+    Conversation.objects.filter(user_low_id=low, user_high_id=high).update(
+        last_message_id=message_id,
+        last_activity=last_activity,
+        unread_low=unread_low,
+        unread_high=unread_high,
+    )
+
+def rebuild_conversations(batch_size=1000):
+    """Rebuild every conversation row from the raw messages. Returns the number of conversations."""
+    from .models import Conversation, Message
+
+    summaries = _pair_summaries(Message.objects.all())
+    with transaction.atomic():
+        Conversation.objects.all().delete()
+        Conversation.objects.bulk_create(
+            [
+                Conversation(
+                    user_low_id=low, user_high_id=high, last_message_id=message_id,
+                    last_activity=last_activity, unread_low=unread_low, unread_high=unread_high,
+                )
+                for (low, high), (message_id, last_activity, unread_low, unread_high) in summaries.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(summaries)
+
+# Attachments
+
+def attachment_metadata(file):
+    """
+    (name, size, MIME type) of a file being attached to a message, taken
+    from the upload itself. The browser's content type is used when it
+    gave one, otherwise it is guessed from the file name.
+    """
+    upload = getattr(file, 'file', file)
+    name = os.path.basename(getattr(upload, 'name', None) or file.name or '')
+    content_type = getattr(upload, 'content_type', None)
+    if not content_type or content_type == 'application/octet-stream':
+        content_type = mimetypes.guess_type(name)[0] or content_type or ''
+    return name[:255], upload.size, content_type[:100]
+
+def attachment_info(message):
+    """The attachment details the messaging page shows, from the stored metadata; no storage access"""
+    name = message.file_name or os.path.basename(message.file.name)
+    return {
+        'name': name,
+        'file_name': name,
+        'file_url': message.file.url,
+        'file_size': message.file_size,
+        'file_type': message.file_type or 'unknown',
+    }
+
+def message_json(message, viewer_id):
+    """A message as the messaging page renders it, seen by ``viewer_id``; the sender should be joined in"""
+    data = {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'sender_name': message.sender.get_full_name() or message.sender.username,
+        'content': message.content,
+        'subject': message.subject,
+        'sent_date': message.sent_date.strftime('%Y-%m-%d %H:%M'),
+        'is_read': message.is_read,
+        'is_outgoing': message.sender_id == viewer_id,
+    }
+    # Attachment details were stored at upload time
+    if message.file:
+        data['file_info'] = attachment_info(message)
+    return data
+
+# History
+
+def encode_cursor(message):
+    return f"{message.sent_date.isoformat()}_{message.pk}"
+
+def decode_cursor(cursor):
+    """(sent_date, id) from a cursor made by encode_cursor; raises ValueError if it is malformed"""
+    sent_date, _, message_id = (cursor or '').rpartition('_')
+    # A '+' in the UTC offset arrives as a space when the cursor was not URL-encoded
+    sent_date = parse_datetime(sent_date.replace(' ', '+'))
+    if sent_date is None:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return sent_date, int(message_id)
+
+def conversation_history(user, other, before=None, after=None, limit=HISTORY_PAGE_SIZE):
+    """
+    One page of the messages between two users, oldest first, keyed on
+    (sent_date, id) so each page is a single indexed range query however
+    long the thread is. With ``before`` the page holds the newest messages
+    older than that cursor; with ``after`` the oldest ones newer than it
+    (for picking up new messages); with neither, the latest messages.
+    Returns (messages, has_more) where has_more says whether further
+    messages lie beyond the page in the direction being read.
+    """
+    from .models import Message
+
+    other_id = getattr(other, 'pk', other)
+    limit = max(1, min(int(limit), MAX_HISTORY_PAGE_SIZE))
+    messages = Message.objects.filter(
+        Q(sender=user, receiver_id=other_id) | Q(sender_id=other_id, receiver=user)
+    ).select_related('sender')
+
+    if after is not None:
+        sent_date, message_id = decode_cursor(after)
+        page = list(
+            messages.filter(Q(sent_date__gt=sent_date) | Q(sent_date=sent_date, id__gt=message_id))
+            .order_by('sent_date', 'id')[:limit + 1]
+        )
+        return page[:limit], len(page) > limit
+
+    if before is not None:
+        sent_date, message_id = decode_cursor(before)
+        messages = messages.filter(Q(sent_date__lt=sent_date) | Q(sent_date=sent_date, id__lt=message_id))
+    page = list(messages.order_by('-sent_date', '-id')[:limit + 1])
+    has_more = len(page) > limit
+    return page[:limit][::-1], has_more
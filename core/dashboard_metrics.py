@@ -0,0 +1,126 @@
+# core/dashboard_metrics.py
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+# Seconds each metric may be served from cache; writes to the underlying
+# models also invalidate it straight away (see the receivers in models.py)
+METRIC_TTLS = {
+    'people': 10 * 60,
+    'attendance': 60,
+    'fees': 5 * 60,
+    'admissions': 5 * 60,
+    'notices': 5 * 60,
+    'exams': 30 * 60,
+}
+NUMERIC_METRICS = ['people', 'attendance', 'fees', 'admissions']
+
+def people_metric(today):
+    from .models import Class, Student, Subject, Teacher
+
+    students = Student.objects.order_by().aggregate(
+        total_students=Count('id'),
+        active_students=Count('id', filter=Q(is_active=True)),
+    )
+    return {
+        **students,
+        'total_teachers': Teacher.objects.filter(is_active=True).count(),
+        'total_classes': Class.objects.count(),
+        'total_subjects': Subject.objects.count(),
+    }
+
+def attendance_metric(today):
+    # Counted from the raw rows rather than the per-class rollups, which
+    # leave out students without a class
+    from .models import Attendance
+
+    return Attendance.objects.filter(date=today).order_by().aggregate(
+        present_today=Count('id', filter=Q(status=True)),
+        absent_today=Count('id', filter=Q(status=False)),
+    )
+
+def fees_metric(today):
+    from .models import FeePayment
+
+    month_start = today.replace(day=1)
+    totals = FeePayment.objects.filter(payment_date__gte=month_start).order_by().aggregate(
+        monthly_fee_collection=Sum('amount_paid'),
+        today_fee_collection=Sum('amount_paid', filter=Q(payment_date__gte=today)),
+    )
+    return {name: float(value or 0) for name, value in totals.items()}
+
+def admissions_metric(today):
+    from .models import AdmissionForm
+
+    return AdmissionForm.objects.order_by().aggregate(
+        pending_admissions=Count('id', filter=Q(status='PENDING')),
+        total_admissions=Count('id'),
+    )
+
+def notices_metric(today):
+    from .models import Notice
+
+    return {
+        'recent_notices': list(
+            Notice.objects.filter(is_active=True).select_related('posted_by').order_by('-publish_date')[:5]
+        )
+    }
+
+def exams_metric(today):
+    from .models import Exam
+
+    return {
+        'upcoming_exams': list(
+            Exam.objects.filter(exam_date__gte=today, exam_date__lte=today + timedelta(days=30))
+            .select_related('subject', 'class_level').order_by('exam_date')[:5]
+        )
+    }
+
+METRICS = {
+    'people': people_metric,
+    'attendance': attendance_metric,
+    'fees': fees_metric,
+    'admissions': admissions_metric,
+    'notices': notices_metric,
+    'exams': exams_metric,
+}
+
+def _cache_key(name, today):
+    return f'dashboard_metrics:{name}:{today.isoformat()}'
+
+def get_metric(name, today=None):
+    """One metric group, computed with a single aggregate query (or a few) and cached for its TTL"""
+    today = today or timezone.localdate()
+    key = _cache_key(name, today)
+    values = cache.get(key)
+    if values is None:
+        values = METRICS[name](today)
+        cache.set(key, values, METRIC_TTLS[name])
+    return values
+
+def get_dashboard_metrics(names=None, today=None):
+    """Flat dict of every requested metric; cache hits for all of them cost one cache round trip"""
+    today = today or timezone.localdate()
+    names = list(names or METRICS)
+    cached = cache.get_many([_cache_key(name, today) for name in names])
+
+    metrics = {}
+    for name in names:
+        key = _cache_key(name, today)
+        values = cached.get(key)
+        if values is None:
+            values = METRICS[name](today)
+            cache.set(key, values, METRIC_TTLS[name])
+        metrics.update(values)
+    return metrics
+
+def invalidate_dashboard_metrics(*names):
+    """
+    Drop today's cached metrics (all of them when no names are given). Only
+    the cache this process sees is cleared, so with a per-process cache the
+    other workers keep serving their copies until the TTL runs out; set
+    REDIS_URL to share one cache.
+    """
+    today = timezone.localdate()
+    cache.delete_many([_cache_key(name, today) for name in (names or METRICS)])
@@ -0,0 +1,258 @@
+# core/exam_stats.py
+import math
+from django.core.cache import cache
+from .grading import percentage_of
+
+EXAM_STATS_VERSION_KEY = 'exam_stats_version'
+EXAM_STATS_TIMEOUT = 60 * 60 * 24
+
+# Percentage buckets for the marks histogram: (label, minimum percentage)
+MARK_BUCKETS = [
+    ('90-100', 90),
+    ('80-89', 80),
+    ('70-79', 70),
+    ('60-69', 60),
+    ('50-59', 50),
+    ('40-49', 40),
+    ('0-39', 0),
+]
+PERCENTILES = (25, 50, 75, 90)
+PERFORMERS = 5
+
+def percentile(sorted_values, pct):
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def compute_exam_statistics(exam, rows):
+    """
+    Build every statistic shown on the results and analysis pages from one
+    pass over (pk, marks_obtained, grade) rows.
+    """
+    count = len(rows)
+    stats = {
+        'count': count,
+        'avg_marks': 0,
+        'max_marks': 0,
+        'min_marks': 0,
+        'std_dev': 0,
+        'pass_count': 0,
+        'fail_count': 0,
+        'pass_rate': 0,
+        'grade_data': [],
+        'marks_distribution': [],
+        'percentiles': {pct: 0 for pct in PERCENTILES},
+        'top_ids': [],
+        'bottom_ids': [],
+    }
+
+    passing = float(exam.passing_marks or 0)
+    total = 0.0
+    total_squares = 0.0
+    grades = {}
+    buckets = {label: 0 for label, minimum in MARK_BUCKETS}
+    marks = []
+
+    for pk, mark, grade in rows:
+        mark = float(mark)
+        marks.append(mark)
+        total += mark
+        total_squares += mark * mark
+        if mark >= passing:
+            stats['pass_count'] += 1
+        grades[grade] = grades.get(grade, 0) + 1
+        pct = percentage_of(mark, exam.total_marks)
+        for label, minimum in MARK_BUCKETS:
+            if pct >= minimum:
+                buckets[label] += 1
+                break
+
+    if count:
+        mean = total / count
+        marks.sort()
+        stats.update({
+            'avg_marks': mean,
+            'max_marks': marks[-1],
+            'min_marks': marks[0],
+            # Population standard deviation, matching the StdDev aggregate
+            'std_dev': math.sqrt(max(total_squares / count - mean * mean, 0)),
+            'fail_count': count - stats['pass_count'],
+            'pass_rate': round(stats['pass_count'] / count * 100, 1),
+            'percentiles': {pct: percentile(marks, pct) for pct in PERCENTILES},
+        })
+
+        stats['grade_data'] = [
+            {'grade': grade, 'count': grade_count, 'percentage': grade_count * 100.0 / count}
+            for grade, grade_count in sorted(grades.items(), key=lambda item: item[0] or '')
+        ]
+        stats['marks_distribution'] = [
+            {'range': label, 'count': buckets[label], 'percentage': round(buckets[label] / count * 100, 1)}
+            for label, minimum in MARK_BUCKETS
+        ]
+
+        ordered = sorted(rows, key=lambda row: row[1], reverse=True)
+        stats['top_ids'] = [row[0] for row in ordered[:PERFORMERS]]
+        stats['bottom_ids'] = [row[0] for row in reversed(ordered) if float(row[1]) < passing][:PERFORMERS]
+    else:
+        stats['marks_distribution'] = [
+            {'range': label, 'count': 0, 'percentage': 0} for label, minimum in MARK_BUCKETS
+        ]
+
+    return stats
+
+def _cache_key(exam_id):
+    version = cache.get(EXAM_STATS_VERSION_KEY)
+    if version is None:
+        cache.add(EXAM_STATS_VERSION_KEY, 1, None)
+        version = cache.get(EXAM_STATS_VERSION_KEY, 1)
+    return f'exam_stats:{version}:{exam_id}'
+
+def get_exam_statistics(exam):
+    """Cached statistics for an exam; costs one query when the cache is cold"""
+    from .models import ExamResult
+
+    key = _cache_key(exam.pk)
+    stats = cache.get(key)
+    if stats is None:
+        rows = list(
+            ExamResult.objects.filter(exam=exam).order_by('pk')
+            .values_list('pk', 'marks_obtained', 'grade')
+        )
+        stats = compute_exam_statistics(exam, rows)
+        cache.set(key, stats, EXAM_STATS_TIMEOUT)
+    return stats
+
+def invalidate_exam_statistics(*exam_ids):
+    cache.delete_many([_cache_key(exam_id) for exam_id in exam_ids])
+
+def invalidate_all_exam_statistics():
+    try:
+        cache.incr(EXAM_STATS_VERSION_KEY)
+    except ValueError:
+        cache.set(EXAM_STATS_VERSION_KEY, 1, None)
+
+# Materialized per-exam summaries
+
+def rebuild_exam_summaries(exam_ids=None):
+    """
+    Recompute ExamSummary rows from the raw results with two grouped
+    queries. Pass exam ids to limit the rebuild; returns the number of
+    summaries written.
+    """
+    from django.db.models import Count, F, Max, Min, Q, Sum
+    from .models import Exam, ExamResult, ExamSummary
+
+    exams = Exam.objects.order_by()
+    if exam_ids is not None:
+        exams = exams.filter(pk__in=exam_ids)
+    passing_marks = dict(exams.values_list('pk', 'passing_marks'))
+
+    results = ExamResult.objects.filter(exam__in=list(passing_marks)).order_by()
+    totals = {
+        row['exam']: row
+        for row in results.values('exam').annotate(
+            result_count=Count('id'),
+            marks_sum=Sum('marks_obtained'),
+            marks_sum_squares=Sum(F('marks_obtained') * F('marks_obtained')),
+            min_marks=Min('marks_obtained'),
+            max_marks=Max('marks_obtained'),
+            pass_count=Count('id', filter=Q(marks_obtained__gte=F('exam__passing_marks'))),
+        )
+    }
+    grade_counts = {}
+    for exam_id, grade, count in results.values_list('exam', 'grade').annotate(count=Count('id')):
+        grade_counts.setdefault(exam_id, {})[grade or ''] = count
+
+    summaries = []
+    for exam_id in passing_marks:
+        row = totals.get(exam_id, {})
+        summaries.append(ExamSummary(
+            exam_id=exam_id,
+            result_count=row.get('result_count', 0),
+            marks_sum=row.get('marks_sum') or 0,
+            marks_sum_squares=row.get('marks_sum_squares') or 0,
+            min_marks=row.get('min_marks'),
+            max_marks=row.get('max_marks'),
+            pass_count=row.get('pass_count', 0),
+            grade_counts=grade_counts.get(exam_id, {}),
+        ))
+
+    ExamSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['exam'],
+        update_fields=['result_count', 'marks_sum', 'marks_sum_squares', 'min_marks',
+                       'max_marks', 'pass_count', 'grade_counts', 'updated_at'],
+    )
+    return len(summaries)
+
+def get_exam_summary(exam):
+    """Return the exam's summary, building it on first use"""
+    from .models import ExamSummary
+
+    summary = ExamSummary.objects.filter(exam=exam).first()
+    if summary is None:
+        rebuild_exam_summaries([exam.pk])
+        summary = ExamSummary.objects.get(exam=exam)
+    return summary
+
+def update_exam_summary(result, old=None, new=None):
+    """
+    Apply one result change to its exam summary. ``old`` and ``new`` are
+    (marks, grade) pairs, either of which may be None for a create or a
+    delete. Exams without a summary yet are left for get_exam_summary to
+    build on demand.
+    """
+    from django.db import transaction
+    from django.db.models import Max, Min
+    from .models import ExamResult, ExamSummary
+
+    with transaction.atomic():
+        summary = ExamSummary.objects.select_for_update().filter(exam_id=result.exam_id).first()
+        if summary is None:
+            return
+        passing = result.exam.passing_marks or 0
+        grades = summary.grade_counts
+        recheck_extremes = False
+
+        if old is not None:
+            marks, grade = old
+            summary.result_count -= 1
+            summary.marks_sum -= marks
+            summary.marks_sum_squares -= marks * marks
+            if marks >= passing:
+                summary.pass_count -= 1
+            grade = grade or ''
+            grades[grade] = grades.get(grade, 0) - 1
+            if grades[grade] <= 0:
+                del grades[grade]
+            # Removing the current low or high means it has to be looked up again
+            recheck_extremes = marks in (summary.min_marks, summary.max_marks)
+
+        if new is not None:
+            marks, grade = new
+            summary.result_count += 1
+            summary.marks_sum += marks
+            summary.marks_sum_squares += marks * marks
+            if marks >= passing:
+                summary.pass_count += 1
+            grade = grade or ''
+            grades[grade] = grades.get(grade, 0) + 1
+            if not recheck_extremes:
+                summary.min_marks = marks if summary.min_marks is None else min(summary.min_marks, marks)
+                summary.max_marks = marks if summary.max_marks is None else max(summary.max_marks, marks)
+
+        if recheck_extremes:
+            extremes = ExamResult.objects.filter(exam_id=result.exam_id).order_by().aggregate(
+                low=Min('marks_obtained'), high=Max('marks_obtained')
+            )
+            summary.min_marks = extremes['low']
+            summary.max_marks = extremes['high']
+
+        summary.save()
@@ -0,0 +1,205 @@
+# core/exports.py
+import csv
+import tempfile
+from django.http import StreamingHttpResponse
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Workbooks smaller than this stay in memory; larger ones spill to disk
+SPOOL_MAX_SIZE = 5 * 1024 * 1024
+EXPORT_CHUNK_SIZE = 2000
+
+EXAM_RESULT_HEADERS = [
+    'Position', 'Student ID', 'Student Name', 'Roll Number', 'Class', 'Marks Obtained',
+    'Total Marks', 'Percentage', 'Grade', 'Remarks', 'Status',
+]
+
+def write_exam_results_xlsx(exam, results, summary):
+    """
+    Write an exam's results workbook in openpyxl write-only mode.
+
+    Results are streamed with .iterator() so rows are never all held in
+    memory, and the statistics sheets come from the exam summary instead of
+    extra aggregate queries. Returns a spooled temporary file positioned at
+    the start, ready to be served with FileResponse.
+    """
+    from openpyxl import Workbook
+
+    total_marks = float(exam.total_marks)
+    passing_marks = float(exam.passing_marks or 0)
+    class_name = exam.class_level.name
+
+    workbook = Workbook(write_only=True)
+
+    sheet = workbook.create_sheet('Exam Results')
+    sheet.append(EXAM_RESULT_HEADERS)
+    for result in results.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        marks = float(result.marks_obtained)
+        sheet.append([
+            result.position or '-',
+            result.student.student_id,
+            result.student.full_name,
+            result.student.roll_number,
+            class_name,
+            marks,
+            total_marks,
+            round(marks / total_marks * 100, 2) if total_marks else 0,
+            result.grade,
+            result.remarks or '',
+            'Pass' if marks >= passing_marks else 'Fail',
+        ])
+
+    sheet = workbook.create_sheet('Exam Summary')
+    sheet.append(['Exam Information', 'Details'])
+    for row in [
+        ('Exam Name', exam.name),
+        ('Subject', exam.subject.name),
+        ('Class', class_name),
+        ('Exam Date', exam.exam_date.strftime('%Y-%m-%d')),
+        ('Total Marks', total_marks),
+        ('Passing Marks', passing_marks),
+        ('Total Students', summary.result_count),
+    ]:
+        sheet.append(row)
+
+    sheet = workbook.create_sheet('Statistics')
+    sheet.append(['Statistics', 'Values'])
+    for row in [
+        ('Average Marks', summary.average),
+        ('Highest Marks', float(summary.max_marks or 0)),
+        ('Lowest Marks', float(summary.min_marks or 0)),
+        ('Pass Rate', f"{summary.pass_rate:.1f}%"),
+        ('Fail Rate', f"{summary.fail_rate:.1f}%"),
+    ]:
+        sheet.append(row)
+
+    sheet = workbook.create_sheet('Grade Distribution')
+    sheet.append(['Grade', 'Count', 'Percentage'])
+    for grade in summary.grade_distribution:
+        sheet.append([grade['grade'], grade['count'], f"{grade['percentage']:.1f}%"])
+
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+# Streaming CSV exports
+
+class Echo:
+    """File-like object whose write() hands the value straight back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+def resolve(obj, path):
+    """Follow a dotted attribute path such as 'student.full_name', stopping at None"""
+    for attr in path.split('.'):
+        if obj is None:
+            return ''
+        obj = getattr(obj, attr)
+        if callable(obj):
+            obj = obj()
+    return '' if obj is None else obj
+
+def csv_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield encoded CSV lines for a queryset: the header first, then one line
+    per object. Objects are fetched with .iterator() so memory stays flat
+    however many rows there are.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, accessor in columns])
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        yield writer.writerow([
+            accessor(obj) if callable(accessor) else resolve(obj, accessor)
+            for header, accessor in columns
+        ])
+
+def stream_csv(queryset, columns, filename, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream a queryset as a CSV download. ``columns`` is a list of
+    (header, accessor) pairs where the accessor is a dotted attribute path
+    or a callable taking the object.
+    """
+    response = StreamingHttpResponse(csv_rows(queryset, columns, chunk_size), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def wants_csv(request):
+    return request.GET.get('export') == 'csv'
+
+FEE_COLUMNS = [
+    ('Fee', 'name'),
+    ('Type', 'get_fee_type_display'),
+    ('Student ID', 'student.student_id'),
+    ('Student', 'student.full_name'),
+    ('Class', 'class_level.name'),
+    ('Academic Year', 'academic_year.name'),
+    ('Amount', 'amount'),
+    ('Status', 'get_status_display'),
+    ('Due Date', 'due_date'),
+    ('Paid Date', 'paid_date'),
+    ('Description', 'description'),
+]
+
+EXPENSE_COLUMNS = [
+    ('Expense ID', 'expense_id'),
+    ('Name', 'name'),
+    ('Type', 'get_expense_type_display'),
+    ('Amount', 'amount'),
+    ('Status', 'get_status_display'),
+    ('Date', 'date'),
+    ('Phone', 'phone'),
+    ('Email', 'email'),
+    ('Description', 'description'),
+]
+
+STUDENT_COLUMNS = [
+    ('Student ID', 'student_id'),
+    ('First Name', 'first_name'),
+    ('Last Name', 'last_name'),
+    ('Gender', 'get_gender_display'),
+    ('Date of Birth', 'date_of_birth'),
+    ('Class', 'current_class.name'),
+    ('Section', 'current_section.name'),
+    ('Roll Number', 'roll_number'),
+    ('Phone', 'phone'),
+    ('Email', 'email'),
+    ('Guardian Phone', 'guardian_phone'),
+    ('Admission Date', 'admission_date'),
+    ('Active', 'is_active'),
+]
+
+PROMOTION_COLUMNS = [
+    ('Student ID', 'student.student_id'),
+    ('Student', 'student.full_name'),
+    ('From Class', 'from_class.name'),
+    ('To Class', 'to_class.name'),
+    ('Academic Year', 'academic_year.name'),
+    ('Promotion Date', lambda promotion: promotion.promotion_date.strftime('%Y-%m-%d %H:%M')),
+    ('Promoted By', 'promoted_by.username'),
+]
+
+ATTENDANCE_COLUMNS = [
+    ('Date', 'date'),
+    ('Student ID', 'student.student_id'),
+    ('Student', 'student.full_name'),
+    ('Class', 'student.current_class.name'),
+    ('Roll Number', 'student.roll_number'),
+    ('Status', lambda attendance: 'Present' if attendance.status else 'Absent'),
+    ('Remarks', 'remarks'),
+]
+
+def exam_result_columns(exam):
+    total_marks = float(exam.total_marks)
+    return [
+        ('Position', 'position'),
+        ('Student ID', 'student.student_id'),
+        ('Student Name', 'student.full_name'),
+        ('Roll Number', 'student.roll_number'),
+        ('Marks Obtained', lambda result: float(result.marks_obtained)),
+        ('Total Marks', lambda result: total_marks),
+        ('Percentage', lambda result: round(float(result.marks_obtained) / total_marks * 100, 2) if total_marks else 0),
+        ('Grade', 'grade'),
+        ('Remarks', 'remarks'),
+    ]
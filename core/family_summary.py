@@ -0,0 +1,77 @@
+# core/family_summary.py
+from datetime import timedelta
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from .attendance import student_attendance_summaries
+from .fee_ledger import fee_balances
+
+UPCOMING_EXAM_DAYS = 30
+UPCOMING_EXAM_LIMIT = 5
+RECENT_RESULTS_PER_CHILD = 3
+
+def family_children(parent):
+    """A parent's active children with the relations the dashboard shows, in one query"""
+    return list(
+        parent.students.filter(is_active=True)
+        .select_related('current_class', 'current_section')
+        .order_by('first_name', 'last_name')
+    )
+
+def upcoming_family_exams(class_ids, today, days=UPCOMING_EXAM_DAYS, limit=UPCOMING_EXAM_LIMIT):
+    from .models import Exam
+
+    if not class_ids:
+        return []
+    return list(
+        Exam.objects.filter(
+            class_level_id__in=class_ids,
+            exam_date__gte=today,
+            exam_date__lte=today + timedelta(days=days),
+        ).select_related('subject', 'class_level').order_by('exam_date')[:limit]
+    )
+
+def recent_results(student_ids, per_student=RECENT_RESULTS_PER_CHILD):
+    """{student_id: [ExamResult, ...]} with each child's latest results, from one windowed query"""
+    from .models import ExamResult
+
+    results = {student_id: [] for student_id in student_ids}
+    if not results:
+        return results
+    rows = (
+        ExamResult.objects.filter(student_id__in=results)
+        .select_related('exam', 'exam__subject')
+        .annotate(row_number=Window(
+            RowNumber(),
+            partition_by=[F('student_id')],
+            order_by=[F('exam__exam_date').desc(), F('id').desc()],
+        ))
+        .filter(row_number__lte=per_student)
+        .order_by('student_id', 'row_number')
+    )
+    for result in rows:
+        results[result.student_id].append(result)
+    return results
+
+def family_summary(parent, today=None):
+    """
+    Everything the parent dashboard shows about a family, in a fixed number
+    of queries however many children the parent has.
+    """
+    from .models import AcademicYear
+
+    today = today or timezone.localdate()
+    children = family_children(parent)
+    student_ids = [child.pk for child in children]
+    class_ids = sorted({child.current_class_id for child in children if child.current_class_id})
+    academic_year = AcademicYear.objects.filter(is_current=True).first()
+
+    return {
+        'children': children,
+        'family_classes': ','.join(str(pk) for pk in class_ids),
+        'academic_year': academic_year,
+        'attendance_summary': student_attendance_summaries(student_ids),
+        'fee_status': fee_balances(student_ids, academic_year),
+        'upcoming_exams': upcoming_family_exams(class_ids, today),
+        'recent_results': recent_results(student_ids),
+    }
@@ -0,0 +1,168 @@
+# core/fee_ledger.py
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+ZERO = Decimal('0.00')
+
+def _totals(keys):
+    """
+    {(student_id, academic_year_id): (billed, paid)} from the raw fee tables
+    in three grouped queries. Paid is the sum of the FeePayment rows plus
+    the full amount of fees marked 'paid' that have no payments recorded,
+    since marking a fee paid from the fee pages only sets its status.
+    """
+    from .models import Fee, FeePayment
+
+    keys = set(keys)
+    totals = {key: [ZERO, ZERO] for key in keys}
+    student_ids = {student_id for student_id, year_id in keys}
+    year_ids = {year_id for student_id, year_id in keys}
+
+    billed = (
+        Fee.objects.filter(student_id__in=student_ids, academic_year_id__in=year_ids).order_by()
+        .values_list('student', 'academic_year').annotate(total=Sum('amount'))
+    )
+    for student_id, year_id, total in billed:
+        if (student_id, year_id) in totals:
+            totals[(student_id, year_id)][0] = total or ZERO
+
+    paid = (
+        FeePayment.objects.filter(student_id__in=student_ids, fee__academic_year_id__in=year_ids).order_by()
+        .values_list('student', 'fee__academic_year').annotate(total=Sum('amount_paid'))
+    )
+    for student_id, year_id, total in paid:
+        if (student_id, year_id) in totals:
+            totals[(student_id, year_id)][1] = total or ZERO
+
+    marked_paid = (
+        Fee.objects.filter(
+            student_id__in=student_ids, academic_year_id__in=year_ids, status='paid', feepayment__isnull=True
+        ).order_by().values_list('student', 'academic_year').annotate(total=Sum('amount'))
+    )
+    for student_id, year_id, total in marked_paid:
+        if (student_id, year_id) in totals:
+            totals[(student_id, year_id)][1] += total or ZERO
+
+    return {key: tuple(value) for key, value in totals.items()}
+
+def recount_fee_balances(keys, create=True):
+    """
+    Recount the ledger rows for some (student_id, academic_year_id) pairs
+    from the raw fees and payments, inside one transaction. With
+    create=False only rows that already exist are written.
+    """
+    from .models import StudentFeeBalance
+
+    keys = set(keys)
+    if not keys:
+        return
+    with transaction.atomic():
+        existing = {
+            (balance.student_id, balance.academic_year_id): balance
+            for balance in StudentFeeBalance.objects.select_for_update().filter(
+                student_id__in={key[0] for key in keys},
+                academic_year_id__in={key[1] for key in keys},
+            )
+        }
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for (student_id, year_id), (billed, paid) in _totals(keys).items():
+            balance = existing.get((student_id, year_id))
+            if balance is None:
+                if not create or (billed == ZERO and paid == ZERO):
+                    continue
+                balance = StudentFeeBalance(student_id=student_id, academic_year_id=year_id)
+                to_create.append(balance)
+            elif (balance.total_billed, balance.total_paid) == (billed, paid):
+                continue
+            else:
+                to_update.append(balance)
+            balance.total_billed = billed
+            balance.total_paid = paid
+            balance.outstanding = billed - paid
+            # bulk_update does not touch auto_now fields
+            balance.updated_at = now
+
+        if to_create:
+            StudentFeeBalance.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            StudentFeeBalance.objects.bulk_update(to_update, ['total_billed', 'total_paid', 'outstanding', 'updated_at'])
+
+def update_fees(fees, **fields):
+    """
+    queryset.update() for fees that keeps the ledger in step. update()
+    skips the Fee receivers, so the (student, academic year) rows the fees
+    belong to are collected first and recounted in the same transaction.
+    Returns the number of fees updated.
+    """
+    with transaction.atomic():
+        keys = set(fees.filter(student__isnull=False).order_by().values_list('student_id', 'academic_year_id'))
+        updated = fees.update(**fields)
+        if 'academic_year' in fields or 'academic_year_id' in fields or 'student' in fields or 'student_id' in fields:
+            keys.update(fees.filter(student__isnull=False).order_by().values_list('student_id', 'academic_year_id'))
+        recount_fee_balances(keys)
+    return updated
+
+def reconcile_fee_balances(fix=True, batch_size=500):
+    """
+    Compare every ledger row with the raw fee tables, one batch of students
+    at a time. Returns a list of (student_id, academic_year_id, stored,
+    expected) for each mismatch, where stored/expected are
+    (billed, paid, outstanding); mismatches are corrected unless fix=False.
+    """
+    from .models import Fee, FeePayment, StudentFeeBalance
+
+    student_ids = sorted(
+        set(StudentFeeBalance.objects.order_by().values_list('student_id', flat=True)) |
+        set(Fee.objects.filter(student__isnull=False).order_by().values_list('student_id', flat=True)) |
+        set(FeePayment.objects.order_by().values_list('student_id', flat=True))
+    )
+
+    mismatches = []
+    for offset in range(0, len(student_ids), batch_size):
+        batch = student_ids[offset:offset + batch_size]
+        stored = {
+            (student_id, year_id): (billed, paid, outstanding)
+            for student_id, year_id, billed, paid, outstanding in StudentFeeBalance.objects.filter(
+                student_id__in=batch
+            ).order_by().values_list('student_id', 'academic_year_id', 'total_billed', 'total_paid', 'outstanding')
+        }
+        keys = set(stored)
+        keys.update(
+            Fee.objects.filter(student_id__in=batch).order_by().values_list('student_id', 'academic_year_id').distinct()
+        )
+        keys.update(
+            FeePayment.objects.filter(student_id__in=batch).order_by()
+            .values_list('student_id', 'fee__academic_year_id').distinct()
+        )
+
+        wrong = []
+        for key, (billed, paid) in sorted(_totals(keys).items()):
+            expected = (billed, paid, billed - paid)
+            current = stored.get(key, (ZERO, ZERO, ZERO))
+            if current != expected:
+                mismatches.append((key[0], key[1], current, expected))
+                wrong.append(key)
+        if fix and wrong:
+            recount_fee_balances(wrong)
+    return mismatches
+
+def fee_balances(student_ids, academic_year):
+    """{student_id: StudentFeeBalance} for one academic year in one query; students without fees get an unsaved zero row"""
+    from .models import StudentFeeBalance
+
+    balances = {
+        student_id: StudentFeeBalance(student_id=student_id, academic_year=academic_year)
+        for student_id in student_ids
+    }
+    if academic_year is None or not balances:
+        return balances
+    for balance in StudentFeeBalance.objects.filter(student_id__in=balances, academic_year=academic_year):
+        balances[balance.student_id] = balance
+    return balances
+
+def fee_balance(student, academic_year):
+    return fee_balances([student.pk], academic_year)[student.pk]
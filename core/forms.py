@@ -340,8 +340,20 @@ class ExamResultForm(forms.ModelForm):
 class BulkResultForm(forms.Form):
     exam = forms.ModelChoiceField(queryset=Exam.objects.none())
     results_file = forms.FileField(
-        label='Upload CSV File',
-        help_text='Upload a CSV file with student marks. Format: student_id,marks_obtained,remarks'
+        label='Upload CSV or Excel File',
+        help_text='Upload a CSV or XLSX file with student marks. Format: student_id,marks_obtained,remarks'
+    )
+    background = forms.BooleanField(
+        required=False,
+        label='Process in background',
+        help_text='Recommended for large or multi-exam files. Add an exam_id column to upload several exams at once.'
+    )
+    chunk_size = forms.IntegerField(
+        required=False,
+        min_value=50,
+        max_value=5000,
+        label='Rows per batch',
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
     )
     
     def __init__(self, *args, **kwargs):
@@ -349,7 +361,13 @@ class BulkResultForm(forms.Form):
         super().__init__(*args, **kwargs)
         
         if self.teacher:
-            self.fields['exam'].queryset = Exam.objects.filter(created_by=self.teacher)
+            self.fields['exam'].queryset = Exam.objects.filter(created_by=self.teacher.user)
+    
+    def clean_results_file(self):
+        results_file = self.cleaned_data.get('results_file')
+        if results_file and not results_file.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Only CSV and XLSX files are supported.')
+        return results_file
 
 
 # Add to forms.py
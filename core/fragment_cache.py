@@ -0,0 +1,50 @@
+# core/fragment_cache.py
+import time
+from django.core.cache import cache
+
+# Shared blocks (same for everyone in a role or class) live longer than
+# personal ones; both are also dropped by bumping their generation below
+FRAGMENT_TIMEOUT = 10 * 60
+PERSONAL_FRAGMENT_TIMEOUT = 5 * 60
+
+FRAGMENT_GENERATIONS = ('notices', 'exams', 'attendance', 'results')
+
+def _generation_key(name):
+    return f'fragment_generation:{name}'
+
+def fragment_generations():
+    """
+    Current generation of every fragment group. Templates put these in their
+    {% cache %} keys, so bumping a generation orphans every cached copy at once.
+    """
+    keys = {name: _generation_key(name) for name in FRAGMENT_GENERATIONS}
+    found = cache.get_many(keys.values())
+    generations = {}
+    for name, key in keys.items():
+        generation = found.get(key)
+        if generation is None:
+            # Start from the clock so an evicted counter never reuses an old value
+            cache.add(key, int(time.time()), None)
+            generation = cache.get(key)
+        generations[name] = generation
+    return generations
+
+def bump_fragment_generation(*names):
+    for name in names:
+        try:
+            cache.incr(_generation_key(name))
+        except ValueError:
+            cache.set(_generation_key(name), int(time.time()), None)
+
+def fragment_context(cached=True):
+    """
+    Template context for pages that use cached fragments. Error fallbacks
+    pass cached=False so their placeholder blocks are rendered but never stored.
+    """
+    if not cached:
+        return {'fragments': {}, 'fragment_timeout': 0, 'personal_fragment_timeout': 0}
+    return {
+        'fragments': fragment_generations(),
+        'fragment_timeout': FRAGMENT_TIMEOUT,
+        'personal_fragment_timeout': PERSONAL_FRAGMENT_TIMEOUT,
+    }
@@ -0,0 +1,222 @@
+# core/grading.py
+import time
+from bisect import bisect_right
+
+# Used when no GradingSystem rows are active: (minimum percentage, grade)
+DEFAULT_BANDS = [
+    (0, 'F'),
+    (40, 'E'),
+    (50, 'D'),
+    (60, 'C'),
+    (70, 'B'),
+    (80, 'A'),
+]
+
+# Base remarks by performance level: (minimum percentage, remark)
+REMARK_BANDS = [
+    (0, "Requires significant improvement. "),
+    (40, "Needs improvement. "),
+    (50, "Satisfactory performance. "),
+    (60, "Good effort. "),
+    (70, "Very good performance. "),
+    (80, "Excellent work! "),
+    (90, "Outstanding performance! "),
+]
+REMARK_THRESHOLDS = [minimum for minimum, remark in REMARK_BANDS]
+
+# Subject-specific additions: (keyword, remark at 60% and above, remark below 60%)
+SUBJECT_REMARKS = [
+    ('math', "Strong problem-solving skills.", "Needs practice in problem-solving."),
+    ('english', "Good language expression.", "Focus on grammar and vocabulary."),
+    ('science', "Good scientific understanding.", "Work on scientific concepts."),
+    ('physics', "Good analytical thinking.", "Understand physical principles better."),
+    ('chemistry', "Good practical knowledge.", "Practice chemical concepts."),
+    ('biology', "Good memory and understanding.", "Study biological processes."),
+    ('history', "Good historical analysis.", "Focus on historical events."),
+    ('geography', "Good geographical knowledge.", "Study geographical concepts."),
+    ('kiswahili', "Umeweza vizuri.", "Hitaji kujitahidi zaidi."),
+]
+DEFAULT_SUBJECT_REMARK = ("Continue regular practice.", "Continue regular practice.")
+
+_compiled = {'version': None, 'scale': None}
+_subject_remarks = {}
+_generated_remarks = {}
+
+def percentage_of(marks, total_marks):
+    total = float(total_marks or 0)
+    if total <= 0:
+        return 0.0
+    return float(marks) / total * 100
+
+class GradingScale:
+    """A grading scale compiled into sorted thresholds for bisect lookups on percentage"""
+
+    def __init__(self, bands):
+        bands = sorted(bands, key=lambda band: band[0])
+        self.thresholds = [float(minimum) for minimum, grade in bands]
+        self.grades = [grade for minimum, grade in bands]
+
+    @classmethod
+    def from_database(cls):
+        from .models import GradingSystem
+
+        bands = list(
+            GradingSystem.objects.filter(is_active=True).values_list('min_mark', 'grade')
+        )
+        return cls(bands or DEFAULT_BANDS)
+
+    def grade_for(self, percentage):
+        index = bisect_right(self.thresholds, percentage) - 1
+        # Anything below the lowest band gets the lowest grade
+        return self.grades[max(index, 0)]
+
+    def grade_marks(self, marks, total_marks):
+        """Grade a whole sequence of marks against one total"""
+        total = float(total_marks or 0)
+        if total <= 0:
+            return [self.grades[0]] * len(marks)
+        thresholds = self.thresholds
+        grades = self.grades
+        return [
+            grades[max(bisect_right(thresholds, float(mark) / total * 100) - 1, 0)]
+            for mark in marks
+        ]
+
+def grading_scale_version():
+    """
+    (row count, latest updated_at) of the grading bands, read with one
+    aggregate query. Any save or delete changes it, so every process sees
+    an edit without sharing a cache.
+    """
+    from django.db.models import Count, Max
+    from .models import GradingSystem
+
+    version = GradingSystem.objects.order_by().aggregate(count=Count('id'), updated=Max('updated_at'))
+    return version['count'], version['updated']
+
+def get_grading_scale():
+    """Return the compiled grading scale, rebuilding it only when the bands have changed"""
+    version = grading_scale_version()
+    if _compiled['scale'] is None or _compiled['version'] != version:
+        _compiled['scale'] = GradingScale.from_database()
+        _compiled['version'] = version
+    return _compiled['scale']
+
+def invalidate_grading_scale():
+    """Drop this process's compiled scale; other processes notice the new version on their next call"""
+    _compiled['scale'] = None
+
+def subject_remarks(subject_name):
+    """(good, weak) remark pair for a subject name, memoised per name"""
+    subject_name = (subject_name or '').lower()
+    if subject_name not in _subject_remarks:
+        pair = DEFAULT_SUBJECT_REMARK
+        for keyword, good, weak in SUBJECT_REMARKS:
+            if keyword in subject_name:
+                pair = (good, weak)
+                break
+        _subject_remarks[subject_name] = pair
+    return _subject_remarks[subject_name]
+
+def remark_for(percentage, subject_name=''):
+    base_remark = REMARK_BANDS[max(bisect_right(REMARK_THRESHOLDS, percentage) - 1, 0)][1]
+    good, weak = subject_remarks(subject_name)
+    return base_remark + (good if percentage >= 60 else weak)
+
+def is_generated_remark(remark, subject_name=''):
+    """Whether a remark is one remark_for produces for the subject (rather than one a teacher wrote)"""
+    subject_name = (subject_name or '').lower()
+    if subject_name not in _generated_remarks:
+        good, weak = subject_remarks(subject_name)
+        _generated_remarks[subject_name] = {
+            base_remark + addition for minimum, base_remark in REMARK_BANDS for addition in (good, weak)
+        }
+    return remark in _generated_remarks[subject_name]
+
+def grade_results(results, scale=None):
+    """
+    Set grade (and a default remark where empty) on many ExamResult instances
+    at once. Results should share as few exams as possible; each exam's
+    subject is looked up once.
+    """
+    scale = scale or get_grading_scale()
+    by_exam = {}
+    for result in results:
+        by_exam.setdefault(result.exam_id, []).append(result)
+
+    for exam_results in by_exam.values():
+        exam = exam_results[0].exam
+        subject_name = exam.subject.name if exam.subject_id else ''
+        grades = scale.grade_marks([result.marks_obtained for result in exam_results], exam.total_marks)
+        for result, grade in zip(exam_results, grades):
+            result.grade = grade
+            if not result.remarks:
+                result.remarks = remark_for(percentage_of(result.marks_obtained, exam.total_marks), subject_name)
+    return results
+
+def regrade_results(queryset, batch_size=1000, dry_run=False, start_after=None):
+    """
+    Re-apply the current grading scale to a queryset of ExamResults.
+
+    Rows are streamed in primary-key order with keyset pagination, graded
+    per batch with grade_marks and only changed rows are written back with
+    bulk_update. Remarks are recomputed with remark_for when they are
+    empty or were generated; remarks a teacher wrote are kept. Yields one
+    stats dict per batch, whose ``changes`` are (pk, old_grade, new_grade,
+    old_remark, new_remark), so callers can report progress or checkpoint
+    ``last_id`` to resume later.
+    """
+    from .exam_stats import invalidate_exam_statistics, rebuild_exam_summaries
+    from .fragment_cache import bump_fragment_generation
+    from .models import ExamResult
+
+    scale = get_grading_scale()
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'marks_obtained', 'grade', 'exam__total_marks', 'exam_id', 'remarks', 'exam__subject__name'
+    )
+    last_id = start_after or 0
+
+    while True:
+        started = time.monotonic()
+        batch = list(rows.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            break
+
+        by_total = {}
+        for row in batch:
+            by_total.setdefault(row[3], []).append(row)
+
+        changes = []
+        changed_exams = set()
+        for total_marks, group in by_total.items():
+            grades = scale.grade_marks([row[1] for row in group], total_marks)
+            for (pk, marks, old_grade, total, exam_id, old_remark, subject_name), new_grade in zip(group, grades):
+                new_remark = old_remark
+                if not old_remark or is_generated_remark(old_remark, subject_name):
+                    new_remark = remark_for(percentage_of(marks, total), subject_name)
+                if old_grade != new_grade or old_remark != new_remark:
+                    changes.append((pk, old_grade, new_grade, old_remark, new_remark))
+                    if old_grade != new_grade:
+                        changed_exams.add(exam_id)
+
+        if changes and not dry_run:
+            ExamResult.objects.bulk_update(
+                [
+                    ExamResult(pk=pk, grade=new_grade, remarks=new_remark)
+                    for pk, old_grade, new_grade, old_remark, new_remark in changes
+                ],
+                ['grade', 'remarks'],
+            )
+            bump_fragment_generation('results')
+            if changed_exams:
+                rebuild_exam_summaries(changed_exams)
+                invalidate_exam_statistics(*changed_exams)
+
+        last_id = batch[-1][0]
+        yield {
+            'last_id': last_id,
+            'scanned': len(batch),
+            'changed': len(changes),
+            'changes': changes,
+            'seconds': time.monotonic() - started,
+        }
@@ -0,0 +1,64 @@
+# core/inbox.py
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+from .conversations import unread_total
+from .presence import online_user_ids
+from .utils import get_user_type
+
+CONVERSATIONS_PER_PAGE = 20
+
+def user_conversations(user):
+    """
+    The user's conversations, most recent first, read from the maintained
+    Conversation rows with both participants, their profiles and the last
+    message joined in.
+    """
+    from .models import Conversation
+
+    profiles = [
+        f'{side}__{profile}' for side in ('user_low', 'user_high') for profile in ('teacher', 'student', 'parent')
+    ]
+    return (
+        Conversation.objects.filter(Q(user_low=user) | Q(user_high=user), last_message__isnull=False)
+        .select_related('last_message', *profiles)
+        .order_by('-last_activity', '-id')
+    )
+
+def build_conversations(user, conversations):
+    """
+    Inbox entries for Conversation rows loaded by user_conversations; runs
+    no queries and reads presence for all partners with one cache lookup
+    """
+    partners = [conversation.partner_of(user) for conversation in conversations]
+    online = online_user_ids([partner.pk for partner in partners])
+    entries = []
+    for conversation, partner in zip(conversations, partners):
+        # Profiles are joined in, so the role check runs no queries
+        entries.append({
+            'user': partner,
+            'latest_message': conversation.last_message,
+            'unread_count': conversation.unread_for(user),
+            'user_type': get_user_type(partner),
+            'is_online': partner.pk in online,
+        })
+    return entries
+
+def inbox_page(user, page=1, per_page=CONVERSATIONS_PER_PAGE):
+    """
+    One page of the user's conversations, newest first, in two queries
+    (count and page). Returns (page, conversations).
+    """
+    paginator = Paginator(user_conversations(user), per_page)
+    page = paginator.get_page(page)
+    return page, build_conversations(user, page.object_list)
+
+def message_counts(user):
+    """Sent and received totals in one query, plus the unread total from the conversation counters"""
+    from .models import Message
+
+    counts = Message.objects.filter(Q(sender=user) | Q(receiver=user)).aggregate(
+        sent_count=Count('id', filter=Q(sender=user)),
+        received_count=Count('id', filter=Q(receiver=user)),
+    )
+    counts['unread_count'] = unread_total(user)
+    return counts
@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core.chronic_absence import CHECKPOINT_NAME, detect_chronic_absence
+from core.models import JobCheckpoint
+
+class Command(BaseCommand):
+    help = ('Flag students whose attendance has dropped below the 7/30/90 day thresholds and alert '
+            'their parents and class teachers. Only attendance changed since the last run is processed, '
+            'so schedule it as often as needed (e.g. hourly from cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Attendance rows processed per batch')
+        parser.add_argument('--sender', help='Username alerts are sent from (defaults to the first superuser)')
+        parser.add_argument('--no-alerts', action='store_true', help='Update the counters without sending messages')
+        parser.add_argument('--reset', action='store_true', help='Forget the watermark and reprocess all attendance')
+
+    def handle(self, *args, **options):
+        if options['sender']:
+            sender = User.objects.filter(username=options['sender']).first()
+            if sender is None:
+                raise CommandError(f"User {options['sender']} not found.")
+        else:
+            sender = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+            if sender is None and not options['no_alerts']:
+                self.stdout.write(self.style.WARNING('No superuser to send alerts from; counters only.'))
+
+        if options['reset']:
+            JobCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+
+        totals = detect_chronic_absence(
+            batch_size=options['batch_size'],
+            sender=sender,
+            send_alerts=not options['no_alerts'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {totals['students']} students: {totals['flagged']} newly flagged windows, "
+            f"{totals['messages']} alerts sent"
+        ))
@@ -0,0 +1,18 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from core.presence import flush_presence
+
+class Command(BaseCommand):
+    help = ('Write the presence heartbeats held in the cache to the student, teacher and parent profiles '
+            'in batches. Requests flush as they go; schedule this from cron so users who have gone quiet '
+            'are marked offline even when the site is idle. Needs the shared cache (REDIS_URL).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Profiles read and written per batch')
+
+    def handle(self, *args, **options):
+        try:
+            online, offline = flush_presence(batch_size=options['batch_size'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Marked {online} profiles online and {offline} offline'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import AcademicYear, Class, ReportCardJob
+from core.report_cards import run_report_card_job
+from core.terms import TERMS
+
+class Command(BaseCommand):
+    help = 'Render report card PDFs for a term and bundle them into per-class zip archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', choices=TERMS, required=True)
+        parser.add_argument('--academic-year', type=int, help='Academic year id (defaults to the current year)')
+        parser.add_argument('--class', dest='class_id', type=int, help='Only generate cards for this class')
+        parser.add_argument('--workers', type=int, help='Number of rendering processes')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render cards even when their content has not changed')
+
+    def handle(self, *args, **options):
+        if options['academic_year']:
+            academic_year = AcademicYear.objects.filter(pk=options['academic_year']).first()
+        else:
+            academic_year = AcademicYear.objects.filter(is_current=True).first()
+        if academic_year is None:
+            raise CommandError('Academic year not found.')
+
+        class_level = None
+        if options['class_id']:
+            class_level = Class.objects.filter(pk=options['class_id']).first()
+            if class_level is None:
+                raise CommandError(f"Class {options['class_id']} not found.")
+
+        job = ReportCardJob.objects.create(
+            academic_year=academic_year,
+            term=options['term'],
+            class_level=class_level,
+            force=options['force'],
+        )
+        self.stdout.write(f"Generating {job.get_term_display()} report cards for {academic_year.name}...")
+        run_report_card_job(job, workers=options['workers'])
+        job.refresh_from_db()
+
+        style = self.style.SUCCESS if job.status == 'COMPLETED' else self.style.ERROR
+        self.stdout.write(style(f'{job.status}: {job.message}'))
+        for class_id, name in job.archives.items():
+            self.stdout.write(f'  class {class_id}: {name}')
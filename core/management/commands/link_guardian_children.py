@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.utils import link_guardian_children
+
+class Command(BaseCommand):
+    help = 'Link parents without children to students whose guardian email or phone matches theirs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the matches without linking them')
+
+    def handle(self, *args, **options):
+        links = link_guardian_children(dry_run=options['dry_run'])
+        parents = len({parent_id for parent_id, student_id in links})
+        verb = 'Would link' if options['dry_run'] else 'Linked'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(links)} children to {parents} parents'))
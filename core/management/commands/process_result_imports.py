@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.models import ResultImportJob
+from core.marks import run_import_job
+
+class Command(BaseCommand):
+    help = 'Process pending background result imports (e.g. after a server restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, help='Process a single job by id, whatever its status')
+        parser.add_argument('--include-stalled', action='store_true',
+                            help='Also re-run jobs left in RUNNING state')
+
+    def handle(self, *args, **options):
+        if options['job']:
+            jobs = ResultImportJob.objects.filter(pk=options['job'])
+        else:
+            statuses = ['PENDING', 'RUNNING'] if options['include_stalled'] else ['PENDING']
+            jobs = ResultImportJob.objects.filter(status__in=statuses).order_by('created_at')
+
+        jobs = jobs.select_related('exam', 'exam__subject', 'uploaded_by')
+        if not jobs.exists():
+            self.stdout.write('No result imports to process.')
+            return
+
+        for job in jobs:
+            self.stdout.write(f'Processing import {job.pk} ({job.original_name})...')
+            run_import_job(job)
+            job.refresh_from_db()
+            style = self.style.SUCCESS if job.status == 'COMPLETED' else self.style.ERROR
+            self.stdout.write(style(f'  {job.status}: {job.message}'))
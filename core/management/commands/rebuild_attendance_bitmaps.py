@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.attendance_bitmaps import rebuild_attendance_bitmaps
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-term attendance bitmaps from the raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Students processed per batch')
+
+    def handle(self, *args, **options):
+        total = rebuild_attendance_bitmaps(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} attendance bitmaps'))
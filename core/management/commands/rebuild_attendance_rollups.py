@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.attendance import rebuild_attendance_rollups
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily class and monthly student attendance rollups from the raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rollup rows inserted per batch')
+
+    def handle(self, *args, **options):
+        class_days, student_months = rebuild_attendance_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {class_days} class-day and {student_months} student-month attendance rollups'
+        ))
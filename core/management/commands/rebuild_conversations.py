@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.conversations import rebuild_conversations
+
+class Command(BaseCommand):
+    help = 'Rebuild the conversation summaries (last message and unread counters) from the raw messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Conversation rows inserted per batch')
+
+    def handle(self, *args, **options):
+        count = rebuild_conversations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} conversations'))
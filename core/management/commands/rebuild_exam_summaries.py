@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from core.models import Exam
+from core.exam_stats import invalidate_all_exam_statistics, rebuild_exam_summaries
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-exam result summaries from the raw exam results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help='Exam id (can be repeated)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Exams rebuilt per batch')
+
+    def handle(self, *args, **options):
+        exam_ids = list(Exam.objects.order_by('pk').values_list('pk', flat=True))
+        if options['exam']:
+            exam_ids = [pk for pk in exam_ids if pk in set(options['exam'])]
+
+        batch_size = options['batch_size']
+        rebuilt = 0
+        for start in range(0, len(exam_ids), batch_size):
+            rebuilt += rebuild_exam_summaries(exam_ids[start:start + batch_size])
+            self.stdout.write(f'Rebuilt {rebuilt} of {len(exam_ids)} exam summaries')
+
+        invalidate_all_exam_statistics()
+        self.stdout.write(self.style.SUCCESS(f'{rebuilt} exam summaries rebuilt'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from core.fee_ledger import reconcile_fee_balances
+
+class Command(BaseCommand):
+    help = ('Check the student fee ledger against the raw fees and payments and correct any drift. '
+            'Meant to run nightly from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Students checked per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report mismatches without correcting them')
+
+    def handle(self, *args, **options):
+        mismatches = reconcile_fee_balances(fix=not options['dry_run'], batch_size=options['batch_size'])
+        for student_id, academic_year_id, stored, expected in mismatches:
+            self.stdout.write(
+                f'Student {student_id}, academic year {academic_year_id}: '
+                f'ledger billed/paid/outstanding {stored[0]}/{stored[1]}/{stored[2]}, '
+                f'expected {expected[0]}/{expected[1]}/{expected[2]}'
+            )
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Fee ledger matches the fee records'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(mismatches)} ledger rows out of step'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Corrected {len(mismatches)} ledger rows'))
@@ -0,0 +1,92 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from core.models import AcademicYear, Class, Exam, ExamResult, JobCheckpoint, Subject
+from core.grading import regrade_results
+
+class Command(BaseCommand):
+    help = 'Re-apply the current grading scale to existing exam results in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--academic-year', help='Academic year name or id (filters by exam date)')
+        parser.add_argument('--class', dest='class_level', help='Class id or code')
+        parser.add_argument('--subject', help='Subject id or code')
+        parser.add_argument('--exam', type=int, action='append', help='Exam id (can be repeated)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Show the grade and remark changes without saving them')
+        parser.add_argument('--show-changes', type=int, default=20,
+                            help='Maximum number of individual changes to list in a dry run')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue from the checkpoint left by an interrupted run with the same filters')
+
+    def lookup(self, model, value, field):
+        try:
+            return model.objects.get(Q(pk=value) if str(value).isdigit() else Q(**{field: value}))
+        except model.DoesNotExist:
+            raise CommandError(f'{model.__name__} "{value}" not found')
+
+    def handle(self, *args, **options):
+        results = ExamResult.objects.all()
+        filters = []
+
+        if options['academic_year']:
+            year = self.lookup(AcademicYear, options['academic_year'], 'name')
+            results = results.filter(exam__exam_date__range=(year.start_date, year.end_date))
+            filters.append(f'year={year.pk}')
+        if options['class_level']:
+            class_obj = self.lookup(Class, options['class_level'], 'code')
+            results = results.filter(exam__class_level=class_obj)
+            filters.append(f'class={class_obj.pk}')
+        if options['subject']:
+            subject = self.lookup(Subject, options['subject'], 'code')
+            results = results.filter(exam__subject=subject)
+            filters.append(f'subject={subject.pk}')
+        if options['exam']:
+            exams = Exam.objects.filter(pk__in=options['exam'])
+            results = results.filter(exam__in=exams)
+            filters.append('exam=' + ','.join(str(pk) for pk in sorted(options['exam'])))
+
+        dry_run = options['dry_run']
+        checkpoint_name = 'regrade_results:' + ('|'.join(filters) or 'all')
+        start_after = None
+        if options['resume'] and not dry_run:
+            checkpoint = JobCheckpoint.objects.filter(name=checkpoint_name).first()
+            if checkpoint and checkpoint.last_id:
+                start_after = checkpoint.last_id
+                self.stdout.write(f'Resuming after result id {start_after}')
+
+        scanned = changed = 0
+        shown = 0
+        started = time.monotonic()
+
+        for batch in regrade_results(results, options['batch_size'], dry_run, start_after):
+            scanned += batch['scanned']
+            changed += batch['changed']
+
+            if dry_run:
+                for pk, old_grade, new_grade, old_remark, new_remark in batch['changes']:
+                    if shown < options['show_changes']:
+                        self.stdout.write(f'  result {pk}: {old_grade or "-"} -> {new_grade}')
+                        if old_remark != new_remark:
+                            self.stdout.write(f'    remarks: "{old_remark}" -> "{new_remark}"')
+                        shown += 1
+            else:
+                JobCheckpoint.objects.update_or_create(
+                    name=checkpoint_name,
+                    defaults={'last_id': batch['last_id']},
+                )
+            self.stdout.write(
+                f'Batch up to id {batch["last_id"]}: {batch["scanned"]} scanned, '
+                f'{batch["changed"]} changed in {batch["seconds"]:.2f}s'
+            )
+
+        if not dry_run:
+            # A finished run starts from the beginning next time
+            JobCheckpoint.objects.filter(name=checkpoint_name).delete()
+
+        elapsed = time.monotonic() - started
+        rate = scanned / elapsed if elapsed else scanned
+        verb = 'would change' if dry_run else 'changed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{scanned} results scanned, {changed} {verb} in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from core.reminders import MAX_ATTEMPTS, STUCK_AFTER, deliver_reminders, requeue_stuck_reminders
+
+class Command(BaseCommand):
+    help = ('Deliver queued fee reminders over a single mail connection and record the outcome on each '
+            'reminder. Schedule it every few minutes from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Reminders claimed per batch')
+        parser.add_argument('--rate', type=float, help='Maximum messages sent per second')
+        parser.add_argument('--limit', type=int, help='Stop after this many reminders')
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS,
+                            help='Attempts before a reminder is marked as failed')
+        parser.add_argument('--requeue-stuck', action='store_true',
+                            help="First put reminders left in 'sending' by a crashed worker back in the queue")
+        parser.add_argument('--stuck-minutes', type=int, default=int(STUCK_AFTER.total_seconds() // 60),
+                            help="Minutes after its claim that a reminder still in 'sending' counts as stuck")
+
+    def handle(self, *args, **options):
+        if options['requeue_stuck']:
+            requeued = requeue_stuck_reminders(timedelta(minutes=options['stuck_minutes']))
+            self.stdout.write(f'Requeued {requeued} stuck reminders')
+
+        totals = deliver_reminders(
+            batch_size=options['batch_size'],
+            rate=options['rate'],
+            max_attempts=options['max_attempts'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {totals['sent']} reminders, {totals['retry']} will be retried, {totals['failed']} failed"
+        ))
@@ -0,0 +1,346 @@
+# core/marks.py
+import csv
+import io
+import threading
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import connection, transaction
+
+MAX_REPORTED_ERRORS = 1000
+
+# Header names accepted in uploaded files, mapped to the column they describe
+COLUMN_ALIASES = {
+    'student_id': 'student',
+    'student': 'student',
+    'marks_obtained': 'marks',
+    'marks': 'marks',
+    'remarks': 'remarks',
+    'exam_id': 'exam',
+    'exam': 'exam',
+}
+DEFAULT_COLUMNS = {'student': 0, 'marks': 1, 'remarks': 2}
+
+class MarkImportReport:
+    """Outcome of a mark ingestion run, with one entry per rejected row"""
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.error_total = 0
+
+    def add_error(self, row_number, student_ref, message):
+        # Keep counting past the cap so huge files stay in constant memory
+        self.error_total += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({
+                'row': row_number,
+                'student': student_ref,
+                'error': message,
+            })
+
+    @property
+    def success_count(self):
+        return self.created + self.updated
+
+    @property
+    def error_count(self):
+        return self.error_total
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'success_count': self.success_count,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+def parse_marks(value, total_marks):
+    """Parse and validate a raw marks value, raising ValueError with a readable message"""
+    value = str(value).strip() if value is not None else ''
+    if not value:
+        raise ValueError('Marks are missing')
+    try:
+        marks = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f'Invalid marks format: {value}')
+    if not marks.is_finite():
+        raise ValueError(f'Invalid marks format: {value}')
+    if marks < 0:
+        raise ValueError('Marks cannot be negative')
+    if marks > total_marks:
+        raise ValueError(f'Marks cannot exceed total marks ({total_marks})')
+    return marks
+
+def ingest_marks(exam, rows, key='student_id', recalculate_positions=True, report=None):
+    """
+    Validate and save marks for an exam in a fixed number of queries.
+
+    ``rows`` is an iterable of (row_number, student_ref, marks, remarks) where
+    ``student_ref`` is a Student.student_id (or the Student pk when
+    key='pk'). All students are resolved in one query, rows are validated in
+    memory and results are written with a single upsert inside one
+    transaction. Positions are recalculated once at the end.
+    """
+    from .exam_stats import invalidate_exam_statistics, rebuild_exam_summaries
+    from .fragment_cache import bump_fragment_generation
+    from .grading import grade_results
+    from .models import ExamResult, Student
+    from .utils import calculate_exam_positions
+
+    report = report if report is not None else MarkImportReport()
+    rows = list(rows)
+
+    refs = {str(row[1]).strip() for row in rows}
+
+    lookup = 'pk' if key == 'pk' else 'student_id'
+    if lookup == 'pk':
+        refs = {ref for ref in refs if ref.isdigit()}
+    students = {
+        str(ref): pk
+        for ref, pk in Student.objects.filter(
+            **{f'{lookup}__in': refs},
+            current_class=exam.class_level,
+            is_active=True,
+        ).order_by().values_list(lookup, 'pk')
+    }
+    existing = set(
+        ExamResult.objects.filter(exam=exam, student_id__in=students.values())
+        .order_by().values_list('student_id', flat=True)
+    )
+
+    pending = {}
+    for row_number, student_ref, marks, remarks in rows:
+        student_ref = str(student_ref).strip()
+        student_pk = students.get(student_ref)
+        if student_pk is None:
+            report.add_error(row_number, student_ref, 'Student not found in this class')
+            continue
+        if student_pk in pending:
+            report.add_error(row_number, student_ref, 'Duplicate entry for this student')
+            continue
+        try:
+            marks_decimal = parse_marks(marks, exam.total_marks)
+        except ValueError as e:
+            report.add_error(row_number, student_ref, str(e))
+            continue
+
+        pending[student_pk] = ExamResult(
+            exam=exam,
+            student_id=student_pk,
+            marks_obtained=marks_decimal,
+            remarks=(remarks or '').strip(),
+        )
+
+    if pending:
+        grade_results(pending.values())
+        with transaction.atomic():
+            ExamResult.objects.bulk_create(
+                pending.values(),
+                update_conflicts=True,
+                unique_fields=['exam', 'student'],
+                update_fields=['marks_obtained', 'grade', 'remarks'],
+            )
+        # bulk_create skips post_save, so refresh the summary, cached statistics
+        # and cached dashboard blocks here
+        rebuild_exam_summaries([exam.pk])
+        invalidate_exam_statistics(exam.pk)
+        bump_fragment_generation('results')
+        for student_pk in pending:
+            if student_pk in existing:
+                report.updated += 1
+            else:
+                report.created += 1
+
+    if recalculate_positions and pending:
+        calculate_exam_positions(exam)
+
+    return report
+
+def header_name(cell):
+    """A header cell as a COLUMN_ALIASES key: 'Student ID' and 'student-id' both become 'student_id'"""
+    return cell.lstrip('\ufeff').strip().lower().replace(' ', '_').replace('-', '_')
+
+def parse_result_rows(raw_rows):
+    """
+    Yield (row_number, exam_ref, student_ref, marks, remarks) from raw table
+    rows. A first row with any recognised column name is a header and
+    decides the column order; otherwise columns are student_id,
+    marks_obtained, remarks.
+    """
+    columns = DEFAULT_COLUMNS
+    for row_number, row in enumerate(raw_rows, start=1):
+        cells = ['' if cell is None else str(cell).strip() for cell in row]
+        if not any(cells):
+            continue
+        if row_number == 1:
+            names = [header_name(cell) for cell in cells]
+            if any(name in COLUMN_ALIASES for name in names):
+                columns = {
+                    COLUMN_ALIASES[name]: index
+                    for index, name in enumerate(names)
+                    if name in COLUMN_ALIASES
+                }
+                continue
+
+        values = {
+            name: cells[index] if index < len(cells) else ''
+            for name, index in columns.items()
+        }
+        yield (
+            row_number,
+            values.get('exam') or None,
+            values.get('student', ''),
+            values.get('marks', ''),
+            values.get('remarks', ''),
+        )
+
+def iter_csv_rows(lines):
+    """Yield (row_number, student_ref, marks, remarks) from CSV lines, skipping a header row"""
+    for row_number, exam_ref, student_ref, marks, remarks in parse_result_rows(csv.reader(lines)):
+        yield row_number, student_ref, marks, remarks
+
+def iter_exam_rows(exam, parsed_rows, report):
+    """Keep rows for a single exam, rejecting rows that name a different exam"""
+    for row_number, exam_ref, student_ref, marks, remarks in parsed_rows:
+        if exam_ref and exam_ref != str(exam.pk):
+            report.add_error(row_number, student_ref, 'Row belongs to another exam; use background import for multi-exam files')
+            continue
+        yield row_number, student_ref, marks, remarks
+
+def detect_upload_format(filename):
+    return 'xlsx' if filename.lower().endswith('.xlsx') else 'csv'
+
+def iter_upload_rows(file, file_format):
+    """Yield raw rows from an uploaded CSV or XLSX file without reading it all into memory"""
+    if file_format == 'xlsx':
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        try:
+            yield from csv.reader(text)
+        finally:
+            # Leave the underlying upload open for the caller
+            text.detach()
+
+def count_upload_rows(file, file_format):
+    """Cheap row count used for progress reporting; rewinds the file afterwards"""
+    if file_format == 'xlsx':
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            total = workbook.active.max_row or 0
+        finally:
+            workbook.close()
+    else:
+        total = sum(chunk.count(b'\n') for chunk in iter(lambda: file.read(64 * 1024), b''))
+    file.seek(0)
+    return total
+
+# Background import jobs
+
+def _import_chunk(job, chunk, exams, touched, report):
+    """Ingest one chunk of parsed rows, grouped by exam"""
+    from .models import Exam
+
+    unknown = {
+        exam_ref for row_number, exam_ref, student_ref, marks, remarks in chunk
+        if exam_ref and exam_ref not in exams
+    }
+    if unknown:
+        found = Exam.objects.filter(
+            pk__in=[ref for ref in unknown if ref.isdigit()],
+            created_by=job.uploaded_by,
+        ).select_related('subject', 'class_level')
+        for exam in found:
+            exams[str(exam.pk)] = exam
+        for ref in unknown:
+            exams.setdefault(ref, None)
+
+    grouped = {}
+    for row_number, exam_ref, student_ref, marks, remarks in chunk:
+        exam = exams[exam_ref] if exam_ref else job.exam
+        if exam is None:
+            report.add_error(row_number, student_ref, f'Exam {exam_ref} not found')
+            continue
+        grouped.setdefault(exam.pk, (exam, []))[1].append((row_number, student_ref, marks, remarks))
+
+    for exam, rows in grouped.values():
+        ingest_marks(exam, rows, recalculate_positions=False, report=report)
+        touched.add(exam.pk)
+
+def run_import_job(job):
+    """Stream a ResultImportJob's file in chunks, saving progress after every chunk"""
+    from django.utils import timezone
+    from .models import ResultImportJob
+    from .ranking import calculate_positions_for_exams
+
+    jobs = ResultImportJob.objects.filter(pk=job.pk)
+    jobs.update(status='RUNNING', started_at=timezone.now())
+
+    report = MarkImportReport()
+    exams = {}
+    touched = set()
+    processed = 0
+
+    def save_progress(**extra):
+        jobs.update(
+            processed_rows=processed,
+            success_count=report.success_count,
+            error_count=report.error_count,
+            errors=report.errors,
+            **extra
+        )
+
+    try:
+        with job.file.open('rb') as upload:
+            jobs.update(total_rows=count_upload_rows(upload, job.file_format))
+
+            chunk = []
+            for row in parse_result_rows(iter_upload_rows(upload, job.file_format)):
+                chunk.append(row)
+                if len(chunk) >= job.chunk_size:
+                    _import_chunk(job, chunk, exams, touched, report)
+                    processed += len(chunk)
+                    chunk = []
+                    save_progress()
+            if chunk:
+                _import_chunk(job, chunk, exams, touched, report)
+                processed += len(chunk)
+
+        if touched:
+            calculate_positions_for_exams(list(touched))
+
+        save_progress(
+            status='COMPLETED',
+            total_rows=processed,
+            finished_at=timezone.now(),
+            message=f'Imported {report.success_count} results with {report.error_count} errors.',
+        )
+    except Exception as e:
+        print(f"Result import {job.pk} failed: {e}")
+        save_progress(status='FAILED', finished_at=timezone.now(), message=str(e))
+
+def start_import_job(job):
+    """Run an import job on a background thread once the current transaction commits"""
+    from .models import ResultImportJob
+
+    def run():
+        try:
+            run_import_job(ResultImportJob.objects.select_related('exam', 'exam__subject').get(pk=job.pk))
+        finally:
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
+
+def default_chunk_size():
+    return getattr(settings, 'RESULT_IMPORT_CHUNK_SIZE', 500)
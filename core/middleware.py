@@ -3,7 +3,6 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from .models import Class, Section, AcademicYear
 from django.utils import timezone
-from django.core.cache import cache
 
 # core/middleware.py - SIMPLER FIX
 class SetupRequiredMiddleware:
@@ -87,6 +86,11 @@ class SetupRequiredMiddleware:
         return response
 
 class OnlineStatusMiddleware:
+    """
+    Records a presence heartbeat in the cache for every authenticated
+    request. The profile tables are written by flush_presence, at most once
+    per PRESENCE_FLUSH_INTERVAL, instead of on every request.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
@@ -101,14 +105,10 @@ class OnlineStatusMiddleware:
         return response
     
     def update_online_status(self, user):
-        """Update user's online status using cache as backup"""
         try:
-            from .views import update_user_online_status
-            update_user_online_status(user, True)
-            
-            # Also store in cache for real-time checks
-            cache_key = f'user_online_{user.id}'
-            cache.set(cache_key, True, timeout=300)  # 5 minutes timeout
+            from .presence import flush_presence_if_due, record_heartbeat
+            record_heartbeat(user.id)
+            flush_presence_if_due()
             
         except Exception as e:
-            print(f"DEBUG: Middleware online status error: {e}")
\ No newline at end of file
+            print(f"Middleware online status error: {e}")
\ No newline at end of file
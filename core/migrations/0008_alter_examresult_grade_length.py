@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_resultimportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='examresult',
+            name='grade',
+            field=models.CharField(blank=True, max_length=5),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_jobcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_count', models.PositiveIntegerField(default=0)),
+                ('marks_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('marks_sum_squares', models.DecimalField(decimal_places=4, default=0, max_digits=20)),
+                ('min_marks', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('max_marks', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('pass_count', models.PositiveIntegerField(default=0)),
+                ('grade_counts', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='core.exam')),
+            ],
+            options={
+                'verbose_name_plural': 'Exam Summaries',
+            },
+        ),
+    ]
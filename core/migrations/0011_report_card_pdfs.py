@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_examsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCardJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(choices=[('TERM1', 'First Term'), ('TERM2', 'Second Term'), ('TERM3', 'Third Term')], max_length=20)),
+                ('force', models.BooleanField(default=False, help_text='Re-render cards even when their data is unchanged')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('total_cards', models.PositiveIntegerField(default=0)),
+                ('processed_cards', models.PositiveIntegerField(default=0)),
+                ('rendered_cards', models.PositiveIntegerField(default=0)),
+                ('skipped_cards', models.PositiveIntegerField(default=0)),
+                ('archives', models.JSONField(blank=True, default=dict)),
+                ('message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reportcard',
+            name='class_level',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_cards', to='core.class'),
+        ),
+        migrations.AddField(
+            model_name='reportcard',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='reportcard',
+            name='generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportcard',
+            name='pdf',
+            field=models.FileField(blank=True, upload_to='report_cards/'),
+        ),
+        migrations.AlterField(
+            model_name='reportcard',
+            name='overall_grade',
+            field=models.CharField(max_length=5),
+        ),
+        migrations.AddIndex(
+            model_name='reportcard',
+            index=models.Index(fields=['academic_year', 'term', 'student'], name='core_report_academi_954cfb_idx'),
+        ),
+        migrations.AddField(
+            model_name='reportcardjob',
+            name='academic_year',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_jobs', to='core.academicyear'),
+        ),
+        migrations.AddField(
+            model_name='reportcardjob',
+            name='class_level',
+            field=models.ForeignKey(blank=True, help_text='Leave empty for every class', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='report_card_jobs', to='core.class'),
+        ),
+        migrations.AddField(
+            model_name='reportcardjob',
+            name='requested_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_card_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+
+def populate_rollups(apps, schema_editor):
+    Attendance = apps.get_model('core', 'Attendance')
+    ClassAttendanceDaily = apps.get_model('core', 'ClassAttendanceDaily')
+    StudentAttendanceMonthly = apps.get_model('core', 'StudentAttendanceMonthly')
+    counts = dict(present=Count('id', filter=Q(status=True)), absent=Count('id', filter=Q(status=False)))
+
+    ClassAttendanceDaily.objects.bulk_create(
+        ClassAttendanceDaily(class_level_id=class_id, date=day, present_count=present, absent_count=absent)
+        for class_id, day, present, absent in Attendance.objects.filter(student__current_class__isnull=False)
+        .order_by().values_list('student__current_class', 'date').annotate(**counts)
+    )
+    StudentAttendanceMonthly.objects.bulk_create(
+        StudentAttendanceMonthly(student_id=student_id, month=month, present_count=present, absent_count=absent)
+        for student_id, month, present, absent in Attendance.objects.order_by()
+        .annotate(month=TruncMonth('date')).values_list('student', 'month').annotate(**counts)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_attendancesubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassAttendanceDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_level', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_attendance', to='core.class')),
+            ],
+            options={
+                'ordering': ['-date', 'class_level'],
+                'indexes': [models.Index(fields=['date'], name='core_classa_date_a97cf0_idx')],
+                'unique_together': {('class_level', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentAttendanceMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('absent_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendance', to='core.student')),
+            ],
+            options={
+                'ordering': ['-month', 'student'],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
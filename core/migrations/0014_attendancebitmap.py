@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(choices=[('TERM1', 'First Term'), ('TERM2', 'Second Term'), ('TERM3', 'Third Term')], max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('marked', models.BinaryField(default=b'')),
+                ('present', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_bitmaps', to='core.academicyear')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_bitmaps', to='core.student')),
+            ],
+            options={
+                'ordering': ['student', 'start_date'],
+                'indexes': [models.Index(fields=['start_date', 'end_date'], name='core_attend_start_d_bf64ef_idx')],
+                'unique_together': {('student', 'academic_year', 'term')},
+            },
+        ),
+    ]
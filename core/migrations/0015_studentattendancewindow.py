@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_attendancebitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_days', models.PositiveSmallIntegerField()),
+                ('marked_days', models.PositiveIntegerField(default=0)),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('as_of', models.DateField()),
+                ('is_flagged', models.BooleanField(default=False)),
+                ('flagged_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['student', 'window_days'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['updated_at', 'id'], name='core_attend_updated_d5206b_idx'),
+        ),
+        migrations.AddField(
+            model_name='studentattendancewindow',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_windows', to='core.student'),
+        ),
+        migrations.AddIndex(
+            model_name='studentattendancewindow',
+            index=models.Index(fields=['is_flagged', 'window_days'], name='core_studen_is_flag_ba497b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='studentattendancewindow',
+            unique_together={('student', 'window_days')},
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:37
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_balances(apps, schema_editor):
+    Fee = apps.get_model('core', 'Fee')
+    FeePayment = apps.get_model('core', 'FeePayment')
+    StudentFeeBalance = apps.get_model('core', 'StudentFeeBalance')
+
+    totals = {}
+    for student_id, year_id, total in Fee.objects.filter(student__isnull=False).order_by().values_list(
+        'student', 'academic_year'
+    ).annotate(total=Sum('amount')):
+        totals.setdefault((student_id, year_id), [Decimal('0'), Decimal('0')])[0] = total or Decimal('0')
+    for student_id, year_id, total in FeePayment.objects.order_by().values_list(
+        'student', 'fee__academic_year'
+    ).annotate(total=Sum('amount_paid')):
+        totals.setdefault((student_id, year_id), [Decimal('0'), Decimal('0')])[1] = total or Decimal('0')
+
+    StudentFeeBalance.objects.bulk_create(
+        StudentFeeBalance(student_id=student_id, academic_year_id=year_id,
+                          total_billed=billed, total_paid=paid, outstanding=billed - paid)
+        for (student_id, year_id), (billed, paid) in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_studentattendancewindow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentFeeBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_billed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('academic_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fee_balances', to='core.academicyear')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fee_balances', to='core.student')),
+            ],
+            options={
+                'ordering': ['-academic_year__start_date', 'student'],
+                'indexes': [models.Index(fields=['academic_year', 'outstanding'], name='core_studen_academi_472c9b_idx')],
+                'unique_together': {('student', 'academic_year')},
+            },
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_conversations(apps, schema_editor):
+    Conversation = apps.get_model('core', 'Conversation')
+    Message = apps.get_model('core', 'Message')
+
+    summaries = {}
+    rows = Message.objects.order_by('sent_date', 'id').values_list('id', 'sender_id', 'receiver_id', 'sent_date', 'is_read')
+    for message_id, sender_id, receiver_id, sent_date, is_read in rows.iterator(chunk_size=2000):
+        low, high = sorted((sender_id, receiver_id))
+        summary = summaries.setdefault((low, high), [None, None, 0, 0])
+        summary[0], summary[1] = message_id, sent_date
+        if not is_read:
+            summary[2 if receiver_id == low else 3] += 1
+
+    Conversation.objects.bulk_create(
+        [
+            Conversation(user_low_id=low, user_high_id=high, last_message_id=message_id,
+                         last_activity=last_activity, unread_low=unread_low, unread_high=unread_high)
+            for (low, high), (message_id, last_activity, unread_low, unread_high) in summaries.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_reminder_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('unread_low', models.PositiveIntegerField(default=0)),
+                ('unread_high', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-last_activity'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'receiver', 'sent_date'], name='core_messag_sender__a80607_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['receiver', 'sender', 'is_read'], name='core_messag_receive_0dd468_idx'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_high',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_low',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_low', 'last_activity'], name='core_conver_user_lo_5d0e14_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_high', 'last_activity'], name='core_conver_user_hi_9ea587_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='conversation',
+            unique_together={('user_low', 'user_high')},
+        ),
+        migrations.RunPython(populate_conversations, migrations.RunPython.noop),
+    ]
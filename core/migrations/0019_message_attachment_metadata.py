@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:47
+
+import mimetypes
+import os
+
+from django.db import migrations, models
+
+
+def populate_attachment_metadata(apps, schema_editor):
+    # Existing attachments are read from storage once here; new ones are recorded on upload
+    Message = apps.get_model('core', 'Message')
+
+    messages = []
+    for message in Message.objects.exclude(file='').exclude(file__isnull=True).iterator(chunk_size=500):
+        message.file_name = os.path.basename(message.file.name)[:255]
+        message.file_type = (mimetypes.guess_type(message.file.name)[0] or '')[:100]
+        try:
+            message.file_size = message.file.size
+        except (OSError, ValueError):
+            message.file_size = None
+        messages.append(message)
+    Message.objects.bulk_update(messages, ['file_name', 'file_size', 'file_type'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_conversation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='file_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(populate_attachment_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import Sum
+
+
+def recount_balances(apps, schema_editor):
+    # Fees marked paid without a FeePayment now count towards total_paid
+    Fee = apps.get_model('core', 'Fee')
+    FeePayment = apps.get_model('core', 'FeePayment')
+    StudentFeeBalance = apps.get_model('core', 'StudentFeeBalance')
+
+    totals = {}
+    for student_id, year_id, total in Fee.objects.filter(student__isnull=False).order_by().values_list(
+        'student', 'academic_year'
+    ).annotate(total=Sum('amount')):
+        totals.setdefault((student_id, year_id), [Decimal('0'), Decimal('0')])[0] = total or Decimal('0')
+    for student_id, year_id, total in FeePayment.objects.order_by().values_list(
+        'student', 'fee__academic_year'
+    ).annotate(total=Sum('amount_paid')):
+        totals.setdefault((student_id, year_id), [Decimal('0'), Decimal('0')])[1] += total or Decimal('0')
+    for student_id, year_id, total in Fee.objects.filter(
+        student__isnull=False, status='paid', feepayment__isnull=True
+    ).order_by().values_list('student', 'academic_year').annotate(total=Sum('amount')):
+        totals.setdefault((student_id, year_id), [Decimal('0'), Decimal('0')])[1] += total or Decimal('0')
+
+    existing = {(balance.student_id, balance.academic_year_id): balance for balance in StudentFeeBalance.objects.all()}
+    to_create = []
+    to_update = []
+    for key, balance in existing.items():
+        if key not in totals:
+            totals[key] = [Decimal('0'), Decimal('0')]
+    for (student_id, year_id), (billed, paid) in totals.items():
+        balance = existing.get((student_id, year_id))
+        if balance is None:
+            balance = StudentFeeBalance(student_id=student_id, academic_year_id=year_id)
+            to_create.append(balance)
+        else:
+            to_update.append(balance)
+        balance.total_billed = billed
+        balance.total_paid = paid
+        balance.outstanding = billed - paid
+
+    StudentFeeBalance.objects.bulk_create(to_create, batch_size=500)
+    StudentFeeBalance.objects.bulk_update(to_update, ['total_billed', 'total_paid', 'outstanding'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_message_attachment_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_count_paid_fees_in_balances'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='claim_token',
+            field=models.CharField(blank=True, db_index=True, max_length=32),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_reminder_channel_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradingsystem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -2,7 +2,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 import uuid
 import os
@@ -506,11 +506,103 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ['student', 'date']
         ordering = ['-date', 'student__roll_number']
+        indexes = [models.Index(fields=['updated_at', 'id'])]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored row so the attendance rollups can be updated incrementally
+        instance._original = (
+            instance.__dict__.get('student_id'),
+            instance.__dict__.get('date'),
+            instance.__dict__.get('status'),
+        )
+        return instance
     
     def __str__(self):
         status = "Present" if self.status else "Absent"
         return f"{self.student.full_name} - {self.date} - {status}"
 
+class ClassAttendanceDaily(models.Model):
+    """Present/absent counts for one class on one day, kept in step with Attendance"""
+    class_level = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='daily_attendance')
+    date = models.DateField()
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['class_level', 'date']
+        ordering = ['-date', 'class_level']
+        indexes = [models.Index(fields=['date'])]
+    
+    @property
+    def total(self):
+        return self.present_count + self.absent_count
+    
+    def __str__(self):
+        return f"{self.class_level} - {self.date}: {self.present_count}/{self.total}"
+
+class StudentAttendanceMonthly(models.Model):
+    """Present/absent counts for one student in one month, kept in step with Attendance"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='monthly_attendance')
+    month = models.DateField(help_text="First day of the month")
+    present_count = models.PositiveIntegerField(default=0)
+    absent_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'month']
+        ordering = ['-month', 'student']
+    
+    @property
+    def total(self):
+        return self.present_count + self.absent_count
+    
+    def __str__(self):
+        return f"{self.student.full_name} - {self.month:%B %Y}: {self.present_count}/{self.total}"
+
+class StudentAttendanceWindow(models.Model):
+    """Rolling attendance counters for one student over the last N days, kept by detect_chronic_absence"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_windows')
+    window_days = models.PositiveSmallIntegerField()
+    marked_days = models.PositiveIntegerField(default=0)
+    present_days = models.PositiveIntegerField(default=0)
+    as_of = models.DateField()
+    is_flagged = models.BooleanField(default=False)
+    flagged_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'window_days']
+        ordering = ['student', 'window_days']
+        indexes = [models.Index(fields=['is_flagged', 'window_days'])]
+    
+    @property
+    def attendance_rate(self):
+        if not self.marked_days:
+            return None
+        return round(self.present_days / self.marked_days * 100, 1)
+    
+    def __str__(self):
+        return f"{self.student.full_name} - last {self.window_days} days: {self.present_days}/{self.marked_days}"
+
+class AttendanceSubmission(models.Model):
+    """Idempotency record for a batch register submission, so client retries are applied once"""
+    key = models.CharField(max_length=100)
+    submitted_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_submissions')
+    date = models.DateField()
+    record_count = models.PositiveIntegerField(default=0)
+    response = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['submitted_by', 'key']
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.submitted_by.username} - {self.date} - {self.key}"
+
 class Exam(models.Model):
     EXAM_TYPES = [
         ('MID', 'Mid Term'),
@@ -533,19 +625,11 @@ class Exam(models.Model):
 
 # In core/models.py - Update the ExamResult model
 class ExamResult(models.Model):
-    GRADES = (
-        ('A', 'A (Excellent)'),
-        ('B', 'B (Very Good)'),
-        ('C', 'C (Good)'),
-        ('D', 'D (Pass)'),
-        ('E', 'E (Fail)'),
-        ('F', 'F (Fail)'),
-    )
-    
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     marks_obtained = models.DecimalField(max_digits=6, decimal_places=2)
-    grade = models.CharField(max_length=1, choices=GRADES, blank=True)
+    # Letters come from the active GradingSystem scale (e.g. 'B+'), so there are no fixed choices
+    grade = models.CharField(max_length=5, blank=True)
     position = models.IntegerField(null=True, blank=True)
     remarks = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -554,96 +638,284 @@ class ExamResult(models.Model):
         unique_together = ['exam', 'student']
         ordering = ['-marks_obtained']
     
+    @property
+    def percentage(self):
+        from .grading import percentage_of
+        total_marks = self.exam.total_marks if self.exam_id else 100
+        return percentage_of(self.marks_obtained, total_marks)
+    
     def get_subject_specific_remark(self):
         """Get subject-appropriate default remark"""
-        subject_name = self.exam.subject.name.lower() if self.exam and self.exam.subject else ""
-        marks_float = float(self.marks_obtained)
-        total_marks = float(self.exam.total_marks) if self.exam else 100
-        percentage = (marks_float / total_marks) * 100
-        
-        # Base remarks by performance level
-        if percentage >= 90:
-            base_remark = "Outstanding performance! "
-        elif percentage >= 80:
-            base_remark = "Excellent work! "
-        elif percentage >= 70:
-            base_remark = "Very good performance. "
-        elif percentage >= 60:
-            base_remark = "Good effort. "
-        elif percentage >= 50:
-            base_remark = "Satisfactory performance. "
-        elif percentage >= 40:
-            base_remark = "Needs improvement. "
-        else:
-            base_remark = "Requires significant improvement. "
-        
-        # Subject-specific additions
-        subject_keywords = {
-            'math': "Strong problem-solving skills." if percentage >= 60 else "Needs practice in problem-solving.",
-            'english': "Good language expression." if percentage >= 60 else "Focus on grammar and vocabulary.",
-            'science': "Good scientific understanding." if percentage >= 60 else "Work on scientific concepts.",
-            'physics': "Good analytical thinking." if percentage >= 60 else "Understand physical principles better.",
-            'chemistry': "Good practical knowledge." if percentage >= 60 else "Practice chemical concepts.",
-            'biology': "Good memory and understanding." if percentage >= 60 else "Study biological processes.",
-            'history': "Good historical analysis." if percentage >= 60 else "Focus on historical events.",
-            'geography': "Good geographical knowledge." if percentage >= 60 else "Study geographical concepts.",
-            'kiswahili': "Umeweza vizuri." if percentage >= 60 else "Hitaji kujitahidi zaidi.",
-        }
-        
-        # Find matching subject keyword
-        subject_remark = ""
-        for keyword, remark in subject_keywords.items():
-            if keyword in subject_name:
-                subject_remark = remark
-                break
-        
-        return base_remark + subject_remark if subject_remark else base_remark + "Continue regular practice."
-    
-    def save(self, *args, **kwargs):
-        # Calculate grade based on marks
-        marks_float = float(self.marks_obtained)
-        
-        if marks_float >= 80:
-            self.grade = 'A'
-        elif marks_float >= 70:
-            self.grade = 'B'
-        elif marks_float >= 60:
-            self.grade = 'C'
-        elif marks_float >= 50:
-            self.grade = 'D'
-        elif marks_float >= 40:
-            self.grade = 'E'
-        else:
-            self.grade = 'F'
+        from .grading import remark_for
+        subject_name = self.exam.subject.name if self.exam_id and self.exam.subject_id else ""
+        return remark_for(self.percentage, subject_name)
+    
+    def apply_grading(self):
+        """Set the grade and default remark from the active grading scale"""
+        from .grading import get_grading_scale
+        self.grade = get_grading_scale().grade_for(self.percentage)
         
         # Set default remark if empty
         if not self.remarks:
             self.remarks = self.get_subject_specific_remark()
-        
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored marks and grade so the exam summary can be updated incrementally
+        instance._original = (instance.__dict__.get('marks_obtained'), instance.__dict__.get('grade'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.apply_grading()
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.student} - {self.exam}: {self.marks_obtained}"
 
+class ExamSummary(models.Model):
+    """Running totals for an exam's results, kept in step with every mark change"""
+    exam = models.OneToOneField(Exam, on_delete=models.CASCADE, related_name='summary')
+    result_count = models.PositiveIntegerField(default=0)
+    marks_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    marks_sum_squares = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+    min_marks = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    max_marks = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    pass_count = models.PositiveIntegerField(default=0)
+    grade_counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Exam Summaries"
+
+    def __str__(self):
+        return f"Summary for {self.exam}"
+
+    @property
+    def average(self):
+        if not self.result_count:
+            return 0
+        return float(self.marks_sum) / self.result_count
+
+    @property
+    def std_dev(self):
+        """Population standard deviation, matching the StdDev aggregate"""
+        if not self.result_count:
+            return 0
+        mean = self.average
+        variance = float(self.marks_sum_squares) / self.result_count - mean * mean
+        return max(variance, 0) ** 0.5
+
+    @property
+    def fail_count(self):
+        return self.result_count - self.pass_count
+
+    @property
+    def pass_rate(self):
+        if not self.result_count:
+            return 0
+        return round(self.pass_count / self.result_count * 100, 1)
+
+    @property
+    def fail_rate(self):
+        if not self.result_count:
+            return 0
+        return round(100 - self.pass_rate, 1)
+
+    @property
+    def grade_distribution(self):
+        return [
+            {
+                'grade': grade,
+                'count': count,
+                'percentage': count * 100.0 / self.result_count if self.result_count else 0,
+            }
+            for grade, count in sorted(self.grade_counts.items())
+            if count
+        ]
+
+    def as_stats(self):
+        return {
+            'count': self.result_count,
+            'avg_marks': self.average,
+            'max_marks': self.max_marks or 0,
+            'min_marks': self.min_marks or 0,
+            'std_dev': self.std_dev,
+            'pass_count': self.pass_count,
+            'fail_count': self.fail_count,
+            'pass_rate': self.pass_rate,
+            'grade_data': self.grade_distribution,
+        }
+
+class ResultImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    ]
+    
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='import_jobs')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='result_import_jobs')
+    file = models.FileField(upload_to='result_imports/')
+    original_name = models.CharField(max_length=255, blank=True)
+    file_format = models.CharField(max_length=4, choices=FORMAT_CHOICES, default='csv')
+    chunk_size = models.PositiveIntegerField(default=500)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    
+    # Progress
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Import {self.original_name or self.file.name} - {self.exam} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Percentage of rows processed"""
+        if self.status == 'COMPLETED':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, round(self.processed_rows * 100 / self.total_rows))
+    
+    @property
+    def is_finished(self):
+        return self.status in ('COMPLETED', 'FAILED')
+
+class JobCheckpoint(models.Model):
+    """Resume point for long-running batch jobs and incremental processors"""
+    name = models.CharField(max_length=200, unique=True)
+    last_id = models.BigIntegerField(null=True, blank=True)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
 class ReportCard(models.Model):
-    student = models.ForeignKey(Student, on_delete=models.CASCADE)
-    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE)
-    term = models.CharField(max_length=20, choices=(
+    TERM_CHOICES = (
         ('TERM1', 'First Term'),
         ('TERM2', 'Second Term'),
         ('TERM3', 'Third Term'),
-    ))
+    )
+    
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE)
+    term = models.CharField(max_length=20, choices=TERM_CHOICES)
+    class_level = models.ForeignKey(Class, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_cards')
     total_marks = models.DecimalField(max_digits=6, decimal_places=2)
     average_score = models.DecimalField(max_digits=5, decimal_places=2)
     class_position = models.IntegerField()
-    overall_grade = models.CharField(max_length=1)
+    overall_grade = models.CharField(max_length=5)
     teacher_remarks = models.TextField()
     principal_remarks = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Rendered PDF, reused until the data behind it changes
+    pdf = models.FileField(upload_to='report_cards/', blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    generated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['academic_year', 'term', 'student']),
+        ]
+    
     def __str__(self):
         return f"Report Card - {self.student} - {self.term}"
 
+class ReportCardJob(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name='report_card_jobs')
+    term = models.CharField(max_length=20, choices=ReportCard.TERM_CHOICES)
+    class_level = models.ForeignKey(Class, on_delete=models.CASCADE, null=True, blank=True,
+                                    related_name='report_card_jobs', help_text="Leave empty for every class")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_card_jobs')
+    force = models.BooleanField(default=False, help_text="Re-render cards even when their data is unchanged")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    
+    # Progress
+    total_cards = models.PositiveIntegerField(default=0)
+    processed_cards = models.PositiveIntegerField(default=0)
+    rendered_cards = models.PositiveIntegerField(default=0)
+    skipped_cards = models.PositiveIntegerField(default=0)
+    archives = models.JSONField(default=dict, blank=True)  # class id -> zip file name in storage
+    message = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        scope = self.class_level or 'All classes'
+        return f"Report cards {self.academic_year} {self.term} - {scope} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Percentage of cards processed"""
+        if self.status == 'COMPLETED':
+            return 100
+        if not self.total_cards:
+            return 0
+        return min(100, round(self.processed_cards * 100 / self.total_cards))
+    
+    @property
+    def is_finished(self):
+        return self.status in ('COMPLETED', 'FAILED')
+
+class AttendanceBitmap(models.Model):
+    """
+    A student's attendance for one term packed into bitsets, one bit per
+    calendar day from start_date. ``marked`` has a bit for every day with an
+    attendance record and ``present`` for every day the student was present.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    term = models.CharField(max_length=20, choices=ReportCard.TERM_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    marked = models.BinaryField(default=b'')
+    present = models.BinaryField(default=b'')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'academic_year', 'term']
+        ordering = ['student', 'start_date']
+        indexes = [models.Index(fields=['start_date', 'end_date'])]
+    
+    def __str__(self):
+        return f"{self.student.full_name} - {self.academic_year} {self.term}"
+
 class Assignment(models.Model):
     ASSIGNMENT_TYPES = (
         ('HOMEWORK', 'Homework'),
@@ -785,6 +1057,13 @@ class Fee(models.Model):
     def __str__(self):
         return f"{self.name} - {self.class_level} - ${self.amount}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember who was billed and for which year so the fee ledger can be recounted
+        instance._original = (instance.__dict__.get('student_id'), instance.__dict__.get('academic_year_id'))
+        return instance
+    
     def save(self, *args, **kwargs):
         if self.status == 'paid' and not self.paid_date:
             self.paid_date = timezone.now().date()
@@ -805,17 +1084,39 @@ class Reminder(models.Model):
         ('sms', 'SMS'),
         ('both', 'Both'),
     ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
     
     fee = models.ForeignKey(Fee, on_delete=models.CASCADE, related_name='reminders')
     student_name = models.CharField(max_length=200)
     fee_type = models.CharField(max_length=100)
     sent_date = models.DateTimeField(auto_now_add=True)
     sent_via = models.CharField(max_length=50, choices=REMINDER_METHODS, default='email')
-    status = models.CharField(max_length=20, default='sent')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
     notes = models.TextField(blank=True)
     
+    # Outbox delivery, filled in by the send_queued_reminders worker
+    email = models.EmailField(blank=True)
+    phone = models.CharField(max_length=15, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    # Per channel, so a 'both' reminder retries only the channel that failed
+    email_sent_at = models.DateTimeField(null=True, blank=True)
+    sms_sent_at = models.DateTimeField(null=True, blank=True)
+    # Set by the worker run that moved the reminder to 'sending'
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-sent_date']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
     
     def __str__(self):
         return f"Reminder for {self.student_name} - {self.sent_date.strftime('%Y-%m-%d %H:%M')}"
@@ -901,9 +1202,34 @@ class FeePayment(models.Model):
     transaction_id = models.CharField(max_length=100, blank=True)
     remarks = models.TextField(blank=True)
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original = (instance.__dict__.get('student_id'), instance.__dict__.get('fee_id'))
+        return instance
+    
     def __str__(self):
         return f"{self.student} - {self.fee} - ${self.amount_paid}"
 
+class StudentFeeBalance(models.Model):
+    """Billed, paid and outstanding fee totals for one student in one academic year, kept in step with Fee and FeePayment"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='fee_balances')
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name='fee_balances')
+    total_billed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'academic_year']
+        ordering = ['-academic_year__start_date', 'student']
+        indexes = [
+            models.Index(fields=['academic_year', 'outstanding']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student.full_name} - {self.academic_year}: {self.outstanding} outstanding"
+
 class Notice(models.Model):
     PRIORITY_CHOICES = [
         ('LOW', 'Low Priority'),
@@ -937,14 +1263,63 @@ class Message(models.Model):
     subject = models.CharField(max_length=255, blank=True)
     content = models.TextField()
     file = models.FileField(upload_to='message_files/', blank=True, null=True)  # Add this line
+    # Attachment details recorded at upload time so listing messages never touches storage
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    file_type = models.CharField(max_length=100, blank=True)
     sent_date = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['-sent_date']
+        indexes = [
+            models.Index(fields=['sender', 'receiver', 'sent_date']),
+            models.Index(fields=['receiver', 'sender', 'is_read']),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender} to {self.receiver}"
+    
+    def save(self, *args, **kwargs):
+        from .conversations import attachment_metadata
+        
+        # A newly assigned upload has not been written to storage yet
+        if self.file and not self.file._committed:
+            self.file_name, self.file_size, self.file_type = attachment_metadata(self.file)
+        elif not self.file:
+            self.file_name, self.file_size, self.file_type = '', None, ''
+        super().save(*args, **kwargs)
+
+class Conversation(models.Model):
+    """
+    Summary of the messages between two users, kept in step with Message.
+    The pair is stored in id order (user_low.id < user_high.id) so each
+    pair has exactly one row; unread_low/unread_high count the messages
+    each side has not read yet.
+    """
+    user_low = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_activity = models.DateTimeField(null=True, blank=True)
+    unread_low = models.PositiveIntegerField(default=0)
+    unread_high = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['user_low', 'user_high']
+        ordering = ['-last_activity']
+        indexes = [
+            models.Index(fields=['user_low', 'last_activity']),
+            models.Index(fields=['user_high', 'last_activity']),
+        ]
+    
+    def partner_of(self, user):
+        return self.user_high if user.pk == self.user_low_id else self.user_low
+    
+    def unread_for(self, user):
+        return self.unread_low if user.pk == self.user_low_id else self.unread_high
+    
+    def __str__(self):
+        return f"Conversation between {self.user_low} and {self.user_high}"
 
 # Signal to create user profile when User is created
 @receiver(post_save, sender=User)
@@ -1195,6 +1570,8 @@ class GradingSystem(models.Model):
     points = models.DecimalField(max_digits=3, decimal_places=2)
     remarks = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
+    # Part of the grading scale version (see core.grading.get_grading_scale)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['min_mark']
@@ -1203,6 +1580,175 @@ class GradingSystem(models.Model):
     def __str__(self):
         return f"{self.grade} ({self.min_mark}-{self.max_mark})"
 
+@receiver([post_save, post_delete], sender=GradingSystem)
+def invalidate_grading_scale_cache(sender, **kwargs):
+    from .grading import invalidate_grading_scale
+    invalidate_grading_scale()
+
+@receiver([post_save, post_delete], sender=ExamResult)
+def invalidate_result_exam_statistics(sender, instance, **kwargs):
+    from .exam_stats import invalidate_exam_statistics
+    invalidate_exam_statistics(instance.exam_id)
+
+@receiver([post_save, post_delete], sender=Exam)
+def invalidate_exam_statistics_cache(sender, instance, **kwargs):
+    from .exam_stats import invalidate_exam_statistics
+    invalidate_exam_statistics(instance.pk)
+
+@receiver(post_save, sender=ExamResult)
+def update_summary_on_result_save(sender, instance, created, **kwargs):
+    from decimal import Decimal
+    from .exam_stats import rebuild_exam_summaries, update_exam_summary
+    
+    new = (Decimal(str(instance.marks_obtained)), instance.grade)
+    old = getattr(instance, '_original', None)
+    if created:
+        update_exam_summary(instance, new=new)
+    elif old is None or old[0] is None:
+        # Saved without being loaded first, so the previous marks are unknown
+        if ExamSummary.objects.filter(exam_id=instance.exam_id).exists():
+            rebuild_exam_summaries([instance.exam_id])
+    elif old != new:
+        update_exam_summary(instance, old=old, new=new)
+    instance._original = new
+
+@receiver(post_delete, sender=ExamResult)
+def update_summary_on_result_delete(sender, instance, **kwargs):
+    from decimal import Decimal
+    from .exam_stats import update_exam_summary
+    
+    old = getattr(instance, '_original', None)
+    if old is None or old[0] is None:
+        old = (Decimal(str(instance.marks_obtained)), instance.grade)
+    update_exam_summary(instance, old=old)
+
+@receiver(post_save, sender=Exam)
+def rebuild_summary_on_exam_save(sender, instance, created, **kwargs):
+    # The pass count depends on the exam's passing marks
+    if not created and ExamSummary.objects.filter(exam=instance).exists():
+        from .exam_stats import rebuild_exam_summaries
+        rebuild_exam_summaries([instance.pk])
+
+@receiver(post_save, sender=Attendance)
+def update_rollups_on_attendance_save(sender, instance, created, **kwargs):
+    from .attendance import apply_attendance_changes, recount_attendance_rollups
+    
+    new = (instance.student_id, instance.date, instance.status)
+    old = getattr(instance, '_original', None)
+    if created:
+        apply_attendance_changes([(instance.student_id, instance.date, None, instance.status)])
+    elif old is None or old[0] is None:
+        # Saved without being loaded first, so the previous row is unknown
+        recount_attendance_rollups(instance.student_id, instance.date)
+    elif old != new:
+        apply_attendance_changes([
+            (old[0], old[1], old[2], None),
+            (instance.student_id, instance.date, None, instance.status),
+        ])
+    instance._original = new
+
+@receiver(post_delete, sender=Attendance)
+def update_rollups_on_attendance_delete(sender, instance, **kwargs):
+    from .attendance import apply_attendance_changes
+    
+    old = getattr(instance, '_original', None)
+    if old is None or old[0] is None:
+        old = (instance.student_id, instance.date, instance.status)
+    apply_attendance_changes([(old[0], old[1], old[2], None)])
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Teacher)
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Subject)
+def invalidate_people_metrics(sender, **kwargs):
+    from .dashboard_metrics import invalidate_dashboard_metrics
+    invalidate_dashboard_metrics('people')
+
+@receiver(post_save, sender=Fee)
+@receiver(post_delete, sender=Fee)
+def update_fee_balances_on_fee_change(sender, instance, **kwargs):
+    from .fee_ledger import recount_fee_balances
+    
+    students = {instance.student_id, getattr(instance, '_original', (None, None))[0]}
+    years = {instance.academic_year_id, getattr(instance, '_original', (None, None))[1]}
+    # Payments against this fee count towards its academic year, so their students move with it
+    students.update(FeePayment.objects.filter(fee_id=instance.pk).values_list('student_id', flat=True))
+    # Deletes only adjust existing ledger rows (they may be cascading from the student)
+    recount_fee_balances(
+        [(student_id, year_id) for student_id in students for year_id in years if student_id and year_id],
+        create='created' in kwargs,
+    )
+    instance._original = (instance.student_id, instance.academic_year_id)
+
+@receiver(post_save, sender=FeePayment)
+@receiver(post_delete, sender=FeePayment)
+def update_fee_balances_on_payment_change(sender, instance, **kwargs):
+    from .fee_ledger import recount_fee_balances
+    
+    old_student_id, old_fee_id = getattr(instance, '_original', (None, None))
+    years = dict(Fee.objects.filter(pk__in={instance.fee_id, old_fee_id}).values_list('pk', 'academic_year_id'))
+    keys = [(instance.student_id, years.get(instance.fee_id))]
+    if old_student_id is not None:
+        keys.append((old_student_id, years.get(old_fee_id)))
+    recount_fee_balances(
+        [(student_id, year_id) for student_id, year_id in keys if year_id],
+        create='created' in kwargs,
+    )
+    instance._original = (instance.student_id, instance.fee_id)
+
+@receiver(post_save, sender=Message)
+def update_conversation_on_message_save(sender, instance, created, **kwargs):
+    from .conversations import recount_conversation, record_messages
+    from .realtime import publish_new_message
+    
+    if created:
+        record_messages([instance])
+        # Push the message to the receiver's open pages
+        publish_new_message(instance)
+    else:
+        # Edited (e.g. marked read in the admin), so recount the pair from scratch
+        recount_conversation(instance.sender_id, instance.receiver_id)
+
+@receiver(post_delete, sender=Message)
+def update_conversation_on_message_delete(sender, instance, **kwargs):
+    from .conversations import recount_conversation
+    recount_conversation(instance.sender_id, instance.receiver_id)
+
+@receiver([post_save, post_delete], sender=FeePayment)
+def invalidate_fee_metrics(sender, **kwargs):
+    from .dashboard_metrics import invalidate_dashboard_metrics
+    invalidate_dashboard_metrics('fees')
+
+@receiver([post_save, post_delete], sender=AdmissionForm)
+def invalidate_admission_metrics(sender, **kwargs):
+    from .dashboard_metrics import invalidate_dashboard_metrics
+    invalidate_dashboard_metrics('admissions')
+
+@receiver([post_save, post_delete], sender=Notice)
+def invalidate_notice_metrics(sender, **kwargs):
+    from .dashboard_metrics import invalidate_dashboard_metrics
+    invalidate_dashboard_metrics('notices')
+
+@receiver([post_save, post_delete], sender=Exam)
+def invalidate_exam_metrics(sender, **kwargs):
+    from .dashboard_metrics import invalidate_dashboard_metrics
+    invalidate_dashboard_metrics('exams')
+
+@receiver([post_save, post_delete], sender=Notice)
+def bump_notice_fragments(sender, **kwargs):
+    from .fragment_cache import bump_fragment_generation
+    bump_fragment_generation('notices')
+
+@receiver([post_save, post_delete], sender=Exam)
+def bump_exam_fragments(sender, **kwargs):
+    from .fragment_cache import bump_fragment_generation
+    bump_fragment_generation('exams')
+
+@receiver([post_save, post_delete], sender=ExamResult)
+def bump_result_fragments(sender, **kwargs):
+    from .fragment_cache import bump_fragment_generation
+    bump_fragment_generation('results')
+
 class TeacherPayment(models.Model):
     PAYMENT_METHODS = [
         ('CASH', 'Cash'),
@@ -0,0 +1,105 @@
+# core/presence.py
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+FLUSH_LOCK_KEY = 'presence:flush-lock'
+
+def presence_timeout():
+    """Seconds a heartbeat keeps a user online"""
+    return getattr(settings, 'PRESENCE_TIMEOUT', 300)
+
+def flush_interval():
+    """Seconds between writes of cached presence to the profile tables"""
+    return getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 60)
+
+def _seen_key(user_id):
+    return f'presence:seen:{user_id}'
+
+def shared_cache():
+    """True when the default cache is one all processes see, rather than a per-process one"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+def record_heartbeat(user_id, now=None):
+    """Mark a user active. Only the cache is written; flush_presence copies it to the database."""
+    now = now or timezone.now()
+    cache.set(_seen_key(user_id), now.timestamp(), presence_timeout())
+
+def mark_offline(user_id):
+    cache.delete(_seen_key(user_id))
+
+def last_seen(user_ids):
+    """{user_id: datetime} for the users with a live heartbeat, from one cache read"""
+    seen = cache.get_many([_seen_key(user_id) for user_id in user_ids])
+    return {
+        int(key.rsplit(':', 1)[1]): datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+        for key, timestamp in seen.items()
+    }
+
+def online_user_ids(user_ids):
+    return set(last_seen(user_ids))
+
+def is_user_online(user_id):
+    return cache.get(_seen_key(user_id)) is not None
+
+def flush_presence(batch_size=500):
+    """
+    Copy cached presence to the Student, Teacher and Parent profiles.
+    Every profile with a user is scanned in batches and its heartbeat key
+    read with one get_many per batch: profiles with a newer heartbeat are
+    marked online with their last activity, and profiles still marked
+    online whose heartbeat has expired are marked offline. Only the rows
+    that changed are written. Heartbeats live in the cache of the process
+    that received them, so a per-process cache would mark the users of
+    every other process offline; flushing refuses to run on one.
+    Returns (online, offline) profiles written.
+    """
+    from .models import Parent, Student, Teacher
+
+    if not shared_cache():
+        raise ImproperlyConfigured(
+            'flush_presence needs a cache shared by all processes; set REDIS_URL '
+            f"(the default cache is {type(caches['default']).__name__})"
+        )
+
+    online = offline = 0
+    with transaction.atomic():
+        for model in (Student, Teacher, Parent):
+            profiles = (
+                model.objects.filter(user__isnull=False)
+                .only('id', 'user_id', 'is_online', 'last_activity')
+                .order_by('id')
+                .iterator(chunk_size=batch_size)
+            )
+            changed = []
+            while batch := list(islice(profiles, batch_size)):
+                seen = last_seen([profile.user_id for profile in batch])
+                for profile in batch:
+                    activity = seen.get(profile.user_id)
+                    if activity is not None:
+                        if not profile.is_online or profile.last_activity is None or activity > profile.last_activity:
+                            profile.is_online = True
+                            profile.last_activity = max(activity, profile.last_activity or activity)
+                            changed.append(profile)
+                            online += 1
+                    elif profile.is_online:
+                        profile.is_online = False
+                        changed.append(profile)
+                        offline += 1
+            model.objects.bulk_update(changed, ['is_online', 'last_activity'], batch_size=batch_size)
+    return online, offline
+
+def flush_presence_if_due():
+    """
+    Run flush_presence at most once per flush interval across all processes
+    sharing the cache. Does nothing on a per-process cache.
+    """
+    if shared_cache() and cache.add(FLUSH_LOCK_KEY, True, flush_interval()):
+        return flush_presence()
+    return None
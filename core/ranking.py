@@ -0,0 +1,112 @@
+# core/ranking.py
+from django.db import transaction
+from django.db.models import Avg, Count, F, Sum, Window
+from django.db.models.functions import DenseRank, Rank
+
+RANK_FUNCTIONS = {
+    'competition': Rank,   # 1, 1, 3
+    'dense': DenseRank,    # 1, 1, 2
+}
+
+def assign_ranks(scored, method='competition'):
+    """
+    Rank (key, score) pairs in a single pass, highest score first.
+    Returns a dict of key -> position.
+    """
+    if method not in RANK_FUNCTIONS:
+        raise ValueError(f"Unknown ranking method: {method}")
+
+    ranks = {}
+    position = 0
+    prev_score = None
+    for index, (key, score) in enumerate(sorted(scored, key=lambda item: item[1], reverse=True), start=1):
+        if prev_score is None or score != prev_score:
+            position = index if method == 'competition' else position + 1
+        ranks[key] = position
+        prev_score = score
+    return ranks
+
+def rank_queryset(queryset, score_field='marks_obtained', partition_by=None,
+                  method='competition', position_field='position', batch_size=None):
+    """
+    Rank the rows of a queryset with a window function and write the
+    positions back with one bulk update. Only rows whose position actually
+    changed are written. Returns the number of rows updated.
+    """
+    if method not in RANK_FUNCTIONS:
+        raise ValueError(f"Unknown ranking method: {method}")
+
+    model = queryset.model
+    window = Window(
+        expression=RANK_FUNCTIONS[method](),
+        partition_by=[F(field) for field in partition_by] if partition_by else None,
+        order_by=F(score_field).desc(),
+    )
+    ranked = queryset.order_by().annotate(computed_rank=window).values_list(
+        'pk', position_field, 'computed_rank'
+    )
+
+    changed = [
+        model(pk=pk, **{position_field: rank})
+        for pk, current, rank in ranked
+        if current != rank
+    ]
+    if changed:
+        with transaction.atomic():
+            model.objects.bulk_update(changed, [position_field], batch_size=batch_size)
+    return len(changed)
+
+def calculate_exam_positions(exam, method='competition'):
+    """Calculate positions for a single exam"""
+    from .models import ExamResult
+    return rank_queryset(ExamResult.objects.filter(exam=exam), method=method)
+
+def calculate_positions_for_exams(exams, method='competition'):
+    """Calculate positions for several exams at once, ranked per exam"""
+    from .models import ExamResult
+    return rank_queryset(
+        ExamResult.objects.filter(exam__in=exams),
+        partition_by=['exam'],
+        method=method,
+    )
+
+def rank_student_totals(results, method='competition'):
+    """
+    Rank students by their total marks across a queryset of ExamResults.
+    Filter the queryset to get per-class, per-subject or per-term positions.
+    Returns a dict of student id -> {'total', 'average', 'exams', 'position'}.
+    """
+    totals = {
+        row['student']: row
+        for row in results.order_by().values('student').annotate(
+            total=Sum('marks_obtained'),
+            average=Avg('marks_obtained'),
+            exams=Count('id'),
+        )
+    }
+    ranks = assign_ranks(((student_id, row['total']) for student_id, row in totals.items()), method)
+
+    return {
+        student_id: {
+            'total': row['total'],
+            'average': row['average'],
+            'exams': row['exams'],
+            'position': ranks[student_id],
+        }
+        for student_id, row in totals.items()
+    }
+
+def student_positions(class_level=None, subject=None, start_date=None, end_date=None, method='competition'):
+    """Overall student positions for a class, subject and/or date range (e.g. a term)"""
+    from .models import ExamResult
+
+    results = ExamResult.objects.all()
+    if class_level is not None:
+        results = results.filter(exam__class_level=class_level)
+    if subject is not None:
+        results = results.filter(exam__subject=subject)
+    if start_date is not None:
+        results = results.filter(exam__exam_date__gte=start_date)
+    if end_date is not None:
+        results = results.filter(exam__exam_date__lte=end_date)
+    return rank_student_totals(results, method)
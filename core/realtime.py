@@ -0,0 +1,42 @@
+# core/realtime.py
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+def user_group(user_id):
+    """The channel group every open socket of a user joins (see OnlineStatusConsumer)"""
+    return f"user_{user_id}"
+
+def publish(user_id, event):
+    """
+    Push an event to all of a user's open sockets. The page keeps working
+    without the push, so a missing or failing channel layer is logged and
+    never fails the request that published.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(user_group(user_id), event)
+    except Exception as e:
+        print(f"Error publishing {event.get('type')} to user {user_id}: {e}")
+
+def publish_on_commit(user_id, event):
+    """Publish once the current transaction commits, so clients never fetch rows that are not there yet"""
+    transaction.on_commit(lambda: publish(user_id, event))
+
+def publish_new_message(message):
+    from .conversations import message_json
+
+    publish_on_commit(message.receiver_id, {
+        'type': 'chat.message',
+        'message': message_json(message, message.receiver_id),
+    })
+
+def publish_messages_read(reader_id, sender_ids):
+    """Tell each sender that ``reader_id`` has read the messages they sent"""
+    for sender_id in sender_ids:
+        publish_on_commit(sender_id, {
+            'type': 'chat.read',
+            'reader_id': reader_id,
+        })
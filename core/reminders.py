@@ -0,0 +1,218 @@
+# core/reminders.py
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .fee_ledger import fee_balances
+
+REMINDER_TEMPLATE = 'emails/fee_reminder.html'
+MAX_ATTEMPTS = 3
+# A claim older than this belongs to a worker that died mid-batch
+STUCK_AFTER = timedelta(minutes=30)
+
+def reminder_from_email():
+    return getattr(settings, 'REMINDER_FROM_EMAIL', 'noreply@petra.edu')
+
+def queue_fee_reminders(fees, sent_via='email', notes=''):
+    """
+    Write one queued Reminder per fee with a single bulk_create. Contact
+    details are copied from the student so the worker needs no joins to
+    address them. Returns the number of reminders queued.
+    """
+    from .models import Reminder
+
+    fees = list(fees.filter(student__isnull=False).select_related('student'))
+    reminders = [
+        Reminder(
+            fee=fee,
+            student_name=fee.student.full_name,
+            fee_type=fee.get_fee_type_display(),
+            sent_via=sent_via,
+            status='queued',
+            email=fee.student.guardian_email,
+            phone=fee.student.guardian_phone,
+            notes=notes or f"Reminder for {fee.get_fee_type_display()} fee of KES {fee.amount}",
+        )
+        for fee in fees
+    ]
+    with transaction.atomic():
+        Reminder.objects.bulk_create(reminders, batch_size=500)
+    return len(reminders)
+
+def claim_reminders(batch_size, max_attempts=MAX_ATTEMPTS, after=0):
+    """
+    Move the next batch of queued reminders (with ids above ``after``) to
+    'sending' and return them, so parallel workers never share one. The
+    claiming update stamps the rows with a token unique to this call, and
+    only rows carrying that token are returned; a reminder another worker
+    claimed first no longer matches status='queued' and is left out.
+    claimed_at records when, for requeue_stuck_reminders.
+    """
+    from .models import Reminder
+
+    token = uuid.uuid4().hex
+    while True:
+        ids = list(
+            Reminder.objects.filter(status='queued', attempts__lt=max_attempts, id__gt=after)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        claimed = Reminder.objects.filter(id__in=ids, status='queued').update(
+            status='sending', claim_token=token, claimed_at=timezone.now()
+        )
+        if claimed:
+            return list(
+                Reminder.objects.filter(claim_token=token, status='sending')
+                .select_related('fee', 'fee__student', 'fee__student__current_class', 'fee__academic_year')
+                .order_by('id')
+            )
+        # Another worker took the whole batch; look past it
+        after = ids[-1]
+
+def _load_template():
+    """The compiled HTML template, loaded once per worker run; None means plain text only"""
+    try:
+        return get_template(REMINDER_TEMPLATE)
+    except TemplateDoesNotExist:
+        print(f"Reminder template {REMINDER_TEMPLATE} not found, sending plain text only")
+        return None
+
+def _plain_text(fee, outstanding):
+    text = (
+        f"Dear Parent,\n\nThis is a reminder for the {fee.name} fee of KES {fee.amount} "
+        f"for {fee.student.full_name}. The due date is {fee.due_date:%d %B %Y}."
+    )
+    if outstanding:
+        text += f"\n\nThe outstanding balance for {fee.academic_year} is KES {outstanding}."
+    return text + "\n\nThank you."
+
+def build_reminder_email(reminder, template, outstanding, connection):
+    fee = reminder.fee
+    class_name = fee.student.current_class.name if fee.student.current_class else fee.student.full_name
+    message = EmailMultiAlternatives(
+        subject=f'Fee Reminder: {fee.name} - {class_name}',
+        body=_plain_text(fee, outstanding),
+        from_email=reminder_from_email(),
+        to=[reminder.email],
+        connection=connection,
+    )
+    if template is not None:
+        message.attach_alternative(template.render({
+            'fee': fee,
+            'student': fee.student,
+            'outstanding': outstanding,
+            'today': timezone.now().date(),
+        }), 'text/html')
+    return message
+
+def _sms_sender():
+    """Callable (phone, text) configured with REMINDER_SMS_SENDER, or None when SMS is not set up"""
+    path = getattr(settings, 'REMINDER_SMS_SENDER', None)
+    return import_string(path) if path else None
+
+def deliver_reminders(batch_size=100, rate=None, max_attempts=MAX_ATTEMPTS, limit=None):
+    """
+    Drain the reminder outbox. Reminders are claimed in batches, sent over a
+    single SMTP connection (and the configured SMS sender, if any) and
+    their status, attempts, delivered_at and last_error written back with
+    one bulk_update per batch. ``rate`` caps messages per second. Reminders
+    that fail to send go back to the queue for the next run until they
+    reach ``max_attempts``; ones with no address to send to fail at once.
+    Each channel records when it was sent, so a retry of a 'both' reminder
+    only repeats the channel that failed. Returns a dict of totals.
+    """
+    from .models import Reminder
+
+    totals = {'sent': 0, 'failed': 0, 'retry': 0}
+    template = _load_template()
+    sms_sender = _sms_sender()
+    interval = 1.0 / rate if rate else 0
+    processed = 0
+    last_id = 0
+
+    connection = get_connection()
+    connection.open()
+    try:
+        while limit is None or processed < limit:
+            size = batch_size if limit is None else min(batch_size, limit - processed)
+            batch = claim_reminders(size, max_attempts, after=last_id)
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            balances = {}
+            for academic_year in {reminder.fee.academic_year for reminder in batch}:
+                student_ids = [reminder.fee.student_id for reminder in batch if reminder.fee.academic_year == academic_year]
+                for student_id, balance in fee_balances(student_ids, academic_year).items():
+                    balances[(student_id, academic_year.pk)] = balance.outstanding
+
+            for reminder in batch:
+                started = time.monotonic()
+                outstanding = balances.get((reminder.fee.student_id, reminder.fee.academic_year_id))
+                errors = []
+                permanent = False
+                if reminder.sent_via in ('email', 'both') and reminder.email_sent_at is None:
+                    if not reminder.email:
+                        errors.append('No guardian email address')
+                        permanent = True
+                    else:
+                        try:
+                            connection.send_messages([build_reminder_email(reminder, template, outstanding, connection)])
+                            reminder.email_sent_at = timezone.now()
+                        except Exception as e:
+                            errors.append(f'Email: {e}')
+                if reminder.sent_via in ('sms', 'both') and reminder.sms_sent_at is None:
+                    if sms_sender is None:
+                        errors.append('SMS delivery is not configured')
+                        permanent = True
+                    elif not reminder.phone:
+                        errors.append('No guardian phone number')
+                        permanent = True
+                    else:
+                        try:
+                            sms_sender(reminder.phone, _plain_text(reminder.fee, outstanding))
+                            reminder.sms_sent_at = timezone.now()
+                        except Exception as e:
+                            errors.append(f'SMS: {e}')
+
+                reminder.attempts += 1
+                if not errors:
+                    reminder.status = 'sent'
+                    reminder.delivered_at = timezone.now()
+                    reminder.last_error = ''
+                    totals['sent'] += 1
+                else:
+                    reminder.last_error = '; '.join(errors)
+                    reminder.status = 'failed' if permanent or reminder.attempts >= max_attempts else 'queued'
+                    totals['failed' if reminder.status == 'failed' else 'retry'] += 1
+
+                if interval:
+                    time.sleep(max(0, interval - (time.monotonic() - started)))
+
+            Reminder.objects.bulk_update(
+                batch, ['status', 'attempts', 'delivered_at', 'last_error', 'email_sent_at', 'sms_sent_at']
+            )
+            processed += len(batch)
+    finally:
+        connection.close()
+    return totals
+
+def requeue_stuck_reminders(older_than=STUCK_AFTER):
+    """
+    Put reminders left in 'sending' by a worker that died back in the queue.
+    Only claims made more than ``older_than`` ago count as stuck, so batches
+    a live worker is still sending are left alone.
+    """
+    from .models import Reminder
+
+    cutoff = timezone.now() - older_than
+    return Reminder.objects.filter(
+        Q(claimed_at__lt=cutoff) | Q(claimed_at__isnull=True), status='sending'
+    ).update(status='queued')
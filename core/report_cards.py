@@ -0,0 +1,415 @@
+# core/report_cards.py
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.db import connection, transaction
+from .terms import TERM_NAMES, term_dates
+
+# Bump when the PDF layout changes so every card is re-rendered once
+RENDERER_VERSION = 1
+
+def default_workers():
+    return getattr(settings, 'REPORT_CARD_WORKERS', min(4, os.cpu_count() or 1))
+
+def default_chunk_size():
+    return getattr(settings, 'REPORT_CARD_CHUNK_SIZE', 200)
+
+def report_card_students(class_ids=None, student_ids=None):
+    from .models import Student
+
+    students = Student.objects.filter(is_active=True, current_class__isnull=False)
+    if class_ids is not None:
+        students = students.filter(current_class_id__in=class_ids)
+    if student_ids is not None:
+        students = students.filter(pk__in=student_ids)
+    return students
+
+def build_report_card_data(academic_year, term, class_ids=None, student_ids=None):
+    """
+    Assemble the data for every report card in a handful of set-based
+    queries: students, their term results, attendance totals and the school
+    details. Positions are ranked in memory per class and per subject.
+    Returns plain picklable dicts, one per student, ordered by class and roll
+    number.
+    """
+    from django.db.models import Count, Q
+    from .grading import get_grading_scale, percentage_of, remark_for
+    from .models import Attendance, ExamResult, SchoolInfo
+    from .ranking import assign_ranks
+
+    if student_ids is not None:
+        # Positions are relative to the whole class, so build every card in
+        # the students' classes and keep the requested ones
+        student_ids = set(student_ids)
+        classes = set(report_card_students(class_ids, student_ids).values_list('current_class_id', flat=True))
+        cards = build_report_card_data(academic_year, term, class_ids=classes)
+        return [card for card in cards if card['student'] in student_ids]
+
+    start, end = term_dates(academic_year, term)
+    students = report_card_students(class_ids, student_ids)
+    scale = get_grading_scale()
+
+    school = SchoolInfo.objects.values('name', 'address', 'phone', 'email').first() or {}
+
+    rows = list(
+        students.order_by('current_class__level_category', 'current_class__grade_level', 'roll_number', 'pk')
+        .values('pk', 'student_id', 'first_name', 'last_name', 'roll_number',
+                'current_class_id', 'current_class__name')
+    )
+
+    results = (
+        ExamResult.objects.filter(student__in=students, exam__exam_date__range=(start, end))
+        .order_by('exam__exam_date', 'exam__name')
+        .values_list('student_id', 'exam__subject__name', 'exam__name', 'exam__exam_date',
+                     'marks_obtained', 'exam__total_marks', 'remarks')
+    )
+    by_student = {}
+    for student_pk, subject, exam_name, exam_date, marks, total, remarks in results:
+        exams = by_student.setdefault(student_pk, {}).setdefault(subject, [])
+        exams.append({
+            'exam': exam_name,
+            'date': exam_date.isoformat(),
+            'marks': float(marks),
+            'total': float(total),
+            'percentage': round(percentage_of(marks, total), 2),
+            'remarks': remarks,
+        })
+
+    attendance = {
+        row['student']: row
+        for row in Attendance.objects.filter(student__in=students, date__range=(start, end))
+        .order_by().values('student').annotate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status=True)),
+        )
+    }
+
+    cards = []
+    for row in rows:
+        subjects = []
+        for subject, exams in sorted(by_student.get(row['pk'], {}).items()):
+            average = sum(exam['percentage'] for exam in exams) / len(exams)
+            subjects.append({
+                'subject': subject,
+                'exams': exams,
+                'average': round(average, 2),
+                'grade': scale.grade_for(average),
+                'remarks': remark_for(average, subject),
+            })
+        marks = sum(exam['marks'] for subject in subjects for exam in subject['exams'])
+        possible = sum(exam['total'] for subject in subjects for exam in subject['exams'])
+        average = sum(subject['average'] for subject in subjects) / len(subjects) if subjects else 0
+        days = attendance.get(row['pk'], {'total': 0, 'present': 0})
+
+        cards.append({
+            'student': row['pk'],
+            'admission_no': row['student_id'],
+            'name': f"{row['first_name']} {row['last_name']}",
+            'roll_number': row['roll_number'],
+            'class_id': row['current_class_id'],
+            'class_name': row['current_class__name'],
+            'academic_year': academic_year.name,
+            'term': term,
+            'term_name': TERM_NAMES[term],
+            'school': school,
+            'subjects': subjects,
+            'total_marks': round(marks, 2),
+            'total_possible': round(possible, 2),
+            'average': round(average, 2),
+            'overall_grade': scale.grade_for(average) if subjects else '-',
+            'teacher_remarks': remark_for(average) if subjects else '',
+            'attendance': {
+                'present': days['present'],
+                'total': days['total'],
+                'percentage': round(days['present'] * 100 / days['total'], 1) if days['total'] else 0,
+            },
+        })
+
+    # Class positions by average, and subject positions within each class
+    by_class = {}
+    for card in cards:
+        by_class.setdefault(card['class_id'], []).append(card)
+    for class_cards in by_class.values():
+        ranked = [card for card in class_cards if card['subjects']]
+        positions = assign_ranks((card['student'], card['average']) for card in ranked)
+        subject_scores = {}
+        for card in ranked:
+            for subject in card['subjects']:
+                subject_scores.setdefault(subject['subject'], []).append((card['student'], subject['average']))
+        subject_positions = {name: assign_ranks(scores) for name, scores in subject_scores.items()}
+
+        for card in class_cards:
+            card['class_position'] = positions.get(card['student'])
+            card['class_size'] = len(ranked)
+            for subject in card['subjects']:
+                subject['position'] = subject_positions[subject['subject']][card['student']]
+
+    return cards
+
+def content_hash(card):
+    """Stable hash of everything printed on a card"""
+    encoded = json.dumps([RENDERER_VERSION, card], sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def render_report_card_pdf(card):
+    """
+    Render one report card to PDF bytes. Runs inside worker processes, so it
+    only uses the card dict and reportlab - never the database.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"Report Card - {card['name']}")
+    styles = getSampleStyleSheet()
+    school = card['school']
+    elements = []
+
+    elements.append(Paragraph(escape(school.get('name') or 'School Report'), styles['Title']))
+    contact = ' | '.join(value for value in (school.get('address'), school.get('phone'), school.get('email')) if value)
+    if contact:
+        elements.append(Paragraph(escape(contact), styles['Normal']))
+    elements.append(Paragraph(
+        f"STUDENT REPORT CARD - {card['term_name']} {card['academic_year']}", styles['Heading2']
+    ))
+
+    info = Table([
+        ['Student Name:', card['name'], 'Admission No:', card['admission_no']],
+        ['Class:', card['class_name'], 'Roll Number:', card['roll_number']],
+    ])
+    info.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    elements.append(info)
+    elements.append(Spacer(1, 12))
+
+    rows = [['Subject', 'Exams', 'Average %', 'Grade', 'Position', 'Remarks']]
+    for subject in card['subjects']:
+        exams = ', '.join(f"{exam['exam']}: {exam['marks']:g}/{exam['total']:g}" for exam in subject['exams'])
+        rows.append([
+            subject['subject'],
+            Paragraph(escape(exams), styles['Normal']),
+            f"{subject['average']:.1f}",
+            subject['grade'],
+            str(subject.get('position') or '-'),
+            Paragraph(escape(subject['remarks']), styles['Normal']),
+        ])
+    if len(rows) == 1:
+        rows.append(['No results recorded for this term', '', '', '', '', ''])
+    results = Table(rows, colWidths=[80, 130, 55, 40, 45, 150], repeatRows=1)
+    results.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ]))
+    elements.append(results)
+    elements.append(Spacer(1, 12))
+
+    attendance = card['attendance']
+    position = card.get('class_position')
+    summary = Table([
+        ['Total Marks:', f"{card['total_marks']:g} / {card['total_possible']:g}"],
+        ['Average Score:', f"{card['average']:.1f}%"],
+        ['Class Position:', f"{position} out of {card['class_size']}" if position else '-'],
+        ['Overall Grade:', card['overall_grade']],
+        ['Attendance:', f"{attendance['present']} of {attendance['total']} days ({attendance['percentage']}%)"],
+    ])
+    summary.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ]))
+    elements.append(summary)
+    elements.append(Spacer(1, 12))
+
+    if card['teacher_remarks']:
+        elements.append(Paragraph(f"<b>Class Teacher's Remarks:</b> {escape(card['teacher_remarks'])}", styles['Normal']))
+    elements.append(Spacer(1, 36))
+    elements.append(Paragraph("Class Teacher: ____________________ &nbsp;&nbsp; Principal: ____________________",
+                              styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+def render_cards(cards, workers=None):
+    """Render cards to PDF bytes in order, in a process pool when more than one worker is allowed"""
+    workers = default_workers() if workers is None else workers
+    if workers <= 1 or len(cards) <= 1:
+        return [render_report_card_pdf(card) for card in cards]
+
+    # Spawned workers avoid forking a process that may be running other threads
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(cards)), mp_context=context) as executor:
+        chunksize = max(1, len(cards) // (workers * 4))
+        return list(executor.map(render_report_card_pdf, cards, chunksize=chunksize))
+
+def _year_slug(name):
+    return str(name).replace('/', '-').replace(' ', '_')
+
+def _card_filename(card):
+    # Relative to the FileField's upload_to directory
+    return f"{_year_slug(card['academic_year'])}/{card['term']}/{card['class_id']}/{card['admission_no']}.pdf"
+
+def save_report_cards(academic_year, cards, pdfs, existing):
+    """Store rendered PDFs and write the ReportCard rows with one bulk insert and one bulk update"""
+    from decimal import Decimal
+    from django.core.files.base import ContentFile
+    from django.utils import timezone
+    from .models import ReportCard
+
+    now = timezone.now()
+    created, updated = [], []
+    for card, pdf in zip(cards, pdfs):
+        report = existing.get(card['student'])
+        if report is None:
+            report = ReportCard(student_id=card['student'], academic_year=academic_year, term=card['term'])
+            created.append(report)
+        else:
+            updated.append(report)
+            if report.pdf:
+                report.pdf.delete(save=False)
+
+        report.class_level_id = card['class_id']
+        report.total_marks = Decimal(str(card['total_marks']))
+        report.average_score = Decimal(str(card['average']))
+        report.class_position = card.get('class_position') or 0
+        report.overall_grade = card['overall_grade']
+        report.teacher_remarks = card['teacher_remarks']
+        report.content_hash = card['hash']
+        report.generated_at = now
+        report.pdf.save(_card_filename(card), ContentFile(pdf), save=False)
+        existing[card['student']] = report
+
+    with transaction.atomic():
+        ReportCard.objects.bulk_create(created)
+        ReportCard.objects.bulk_update(updated, [
+            'class_level', 'total_marks', 'average_score', 'class_position', 'overall_grade',
+            'teacher_remarks', 'content_hash', 'generated_at', 'pdf',
+        ])
+
+def generate_report_cards(academic_year, term, class_ids=None, student_ids=None, workers=None,
+                          force=False, chunk_size=None, progress=None):
+    """
+    Build, render and store report cards. Cards whose content hash matches
+    the stored PDF are skipped unless ``force`` is set. ``progress`` is
+    called as progress(processed, total, rendered, skipped) after each chunk.
+    Returns a dict of counts plus the ReportCards grouped by class id.
+    """
+    from django.core.files.storage import default_storage
+    from .models import ReportCard
+
+    chunk_size = chunk_size or default_chunk_size()
+    cards = build_report_card_data(academic_year, term, class_ids, student_ids)
+    existing = {
+        report.student_id: report
+        for report in ReportCard.objects.filter(
+            academic_year=academic_year,
+            term=term,
+            student__in=report_card_students(class_ids, student_ids),
+        ).order_by('pk')
+    }
+
+    pending, skipped = [], 0
+    for card in cards:
+        card['hash'] = content_hash(card)
+        report = existing.get(card['student'])
+        if (not force and report is not None and report.content_hash == card['hash']
+                and report.pdf and default_storage.exists(report.pdf.name)):
+            skipped += 1
+        else:
+            pending.append(card)
+
+    total = len(cards)
+    rendered = 0
+    if progress:
+        progress(skipped, total, rendered, skipped)
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        save_report_cards(academic_year, chunk, render_cards(chunk, workers), existing)
+        rendered += len(chunk)
+        if progress:
+            progress(skipped + rendered, total, rendered, skipped)
+
+    by_class = {}
+    for card in cards:
+        by_class.setdefault(card['class_id'], []).append(existing[card['student']])
+    return {'total': total, 'rendered': rendered, 'skipped': skipped, 'by_class': by_class}
+
+def bundle_class_archive(name, reports):
+    """Zip the PDFs of one class into storage, streaming each file through a temp file"""
+    from django.core.files import File
+    from django.core.files.storage import default_storage
+
+    with tempfile.TemporaryFile() as archive:
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for report in reports:
+                arcname = os.path.basename(report.pdf.name)
+                with report.pdf.open('rb') as source, bundle.open(arcname, 'w') as target:
+                    shutil.copyfileobj(source, target)
+        archive.seek(0)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        return default_storage.save(name, File(archive))
+
+# Background jobs
+
+def run_report_card_job(job, workers=None):
+    """Generate a ReportCardJob's cards and class archives, saving progress as it goes"""
+    from django.utils import timezone
+    from .models import ReportCardJob
+
+    jobs = ReportCardJob.objects.filter(pk=job.pk)
+    jobs.update(status='RUNNING', started_at=timezone.now())
+
+    def save_progress(processed, total, rendered, skipped):
+        jobs.update(total_cards=total, processed_cards=processed, rendered_cards=rendered, skipped_cards=skipped)
+
+    try:
+        class_ids = [job.class_level_id] if job.class_level_id else None
+        outcome = generate_report_cards(
+            job.academic_year, job.term, class_ids=class_ids, workers=workers, force=job.force,
+            progress=save_progress,
+        )
+
+        archives = {}
+        for class_id, reports in outcome['by_class'].items():
+            name = (f"report_cards/archives/{job.pk}/"
+                    f"{_year_slug(job.academic_year.name)}_{job.term}_class_{class_id}.zip")
+            archives[str(class_id)] = bundle_class_archive(name, reports)
+
+        jobs.update(
+            status='COMPLETED',
+            archives=archives,
+            finished_at=timezone.now(),
+            message=(f"Rendered {outcome['rendered']} report cards, "
+                     f"reused {outcome['skipped']} unchanged cards."),
+        )
+    except Exception as e:
+        print(f"Report card job {job.pk} failed: {e}")
+        jobs.update(status='FAILED', finished_at=timezone.now(), message=str(e))
+
+def start_report_card_job(job):
+    """Run a report card job on a background thread once the current transaction commits"""
+    from .models import ReportCardJob
+
+    def run():
+        try:
+            run_report_card_job(ReportCardJob.objects.select_related('academic_year').get(pk=job.pk))
+        finally:
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
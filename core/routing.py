@@ -1,6 +1,6 @@
 from django.urls import re_path
-from . import consumers
+from . import consumer
 
 websocket_urlpatterns = [
-    re_path(r'ws/online-status/$', consumers.OnlineStatusConsumer.as_asgi()),
+    re_path(r'ws/online-status/$', consumer.OnlineStatusConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -0,0 +1,20 @@
+# core/terms.py
+from datetime import timedelta
+
+TERM_NAMES = {
+    'TERM1': 'First Term',
+    'TERM2': 'Second Term',
+    'TERM3': 'Third Term',
+}
+TERMS = list(TERM_NAMES)
+
+def term_dates(academic_year, term):
+    """
+    (start, end) dates of a term. Exams have no term field, so the academic
+    year is split into three equal parts.
+    """
+    index = TERMS.index(term)
+    days = (academic_year.end_date - academic_year.start_date).days + 1
+    start = academic_year.start_date + timedelta(days=days * index // 3)
+    end = academic_year.start_date + timedelta(days=days * (index + 1) // 3 - 1)
+    return start, end
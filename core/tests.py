@@ -1,3 +1,297 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count, Q
 from django.test import TestCase
+from .attendance import commit_register
+from .attendance_bitmaps import (
+    _range_bits, _rebase, apply_bitmap_changes, attendance_counts, attendance_streaks,
+    rebuild_attendance_bitmaps, to_int,
+)
+from .fee_ledger import reconcile_fee_balances, update_fees
+from .marks import parse_result_rows
+from .models import (
+    AcademicYear, Attendance, AttendanceBitmap, Class, Fee, FeePayment, Student, StudentFeeBalance,
+)
+from .terms import TERMS, term_dates
 
-# Create your tests here.
+
+def make_student(class_level, number):
+    return Student.objects.create(
+        first_name=f'Student{number}', last_name='Test', gender='M', date_of_birth=date(2015, 1, 1),
+        address='Nairobi', father_name='Father', mother_name='Mother', current_class=class_level,
+        roll_number=str(number), student_id=f'STU-TEST-{number:04d}',
+    )
+
+
+class FeeLedgerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.class_level = Class.objects.create(level_category='PRIMARY', grade_level='4')
+        self.year = AcademicYear.objects.create(
+            name='2026', start_date=date(2026, 1, 1), end_date=date(2026, 12, 31), is_current=True
+        )
+        self.other_year = AcademicYear.objects.create(name='2025', start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+        self.student = make_student(self.class_level, 1)
+        self.other_student = make_student(self.class_level, 2)
+
+    def add_fee(self, amount, student=None, academic_year=None, status='unpaid'):
+        return Fee.objects.create(
+            student=student or self.student, class_level=self.class_level,
+            academic_year=academic_year or self.year, name='Tuition', fee_type='tuition',
+            amount=Decimal(amount), status=status, due_date=date(2026, 2, 1), created_by=self.admin,
+        )
+
+    def balance(self, student=None, academic_year=None):
+        balance = StudentFeeBalance.objects.filter(
+            student=student or self.student, academic_year=academic_year or self.year
+        ).first()
+        return balance and (balance.total_billed, balance.total_paid, balance.outstanding)
+
+    def assertInStep(self):
+        self.assertEqual(reconcile_fee_balances(fix=False), [])
+
+    def test_fee_create_update_delete(self):
+        fee = self.add_fee(100)
+        self.assertEqual(self.balance(), (100, 0, 100))
+
+        fee.amount = Decimal('150')
+        fee.save()
+        self.assertEqual(self.balance(), (150, 0, 150))
+
+        # Moving a fee to another student or year moves it in the ledger too
+        fee.student = self.other_student
+        fee.academic_year = self.other_year
+        fee.save()
+        self.assertEqual(self.balance(), (0, 0, 0))
+        self.assertEqual(self.balance(self.other_student, self.other_year), (150, 0, 150))
+
+        fee.delete()
+        self.assertEqual(self.balance(self.other_student, self.other_year), (0, 0, 0))
+        self.assertInStep()
+
+    def test_payment_create_delete(self):
+        fee = self.add_fee(100)
+        payment = FeePayment.objects.create(student=self.student, fee=fee, amount_paid=Decimal('40'))
+        self.assertEqual(self.balance(), (100, 40, 60))
+        FeePayment.objects.create(student=self.student, fee=fee, amount_paid=Decimal('25'))
+        self.assertEqual(self.balance(), (100, 65, 35))
+
+        payment.delete()
+        self.assertEqual(self.balance(), (100, 25, 75))
+        self.assertInStep()
+
+    def test_status_only_mark_paid(self):
+        fee = self.add_fee(100)
+        self.add_fee(50)
+        fee.status = 'paid'
+        fee.save()
+        self.assertEqual(self.balance(), (150, 100, 50))
+
+        # A fee with payments counts its payments, not its amount
+        FeePayment.objects.create(student=self.student, fee=fee, amount_paid=Decimal('30'))
+        self.assertEqual(self.balance(), (150, 30, 120))
+        self.assertInStep()
+
+    def test_bulk_update(self):
+        first = self.add_fee(100)
+        second = self.add_fee(60, student=self.other_student)
+        self.assertEqual(update_fees(Fee.objects.filter(status='unpaid'), status='paid'), 2)
+        self.assertEqual(self.balance(), (100, 100, 0))
+        self.assertEqual(self.balance(self.other_student), (60, 60, 0))
+
+        update_fees(Fee.objects.filter(pk=first.pk), academic_year=self.other_year)
+        self.assertEqual(self.balance(), (0, 0, 0))
+        self.assertEqual(self.balance(self.student, self.other_year), (100, 100, 0))
+
+        Fee.objects.filter(pk=second.pk).delete()
+        self.assertEqual(self.balance(self.other_student), (0, 0, 0))
+        self.assertInStep()
+
+    def test_bulk_views(self):
+        self.client.login(username='admin', password='password')
+        first = self.add_fee(100)
+        second = self.add_fee(60)
+        third = self.add_fee(40)
+
+        self.client.post('/dashboard/fees/mark-bulk-paid/', {'fee_ids': str(first.pk)})
+        self.assertEqual(self.balance(), (200, 100, 100))
+        self.client.post('/dashboard/fees/send-bulk-reminders/', {'fee_ids': str(second.pk), 'mark_paid': 'true'})
+        self.assertEqual(self.balance(), (200, 160, 40))
+        self.client.post('/dashboard/fees/bulk-actions/', {'action': 'mark_paid', 'fee_ids[]': [third.pk]})
+        self.assertEqual(self.balance(), (200, 200, 0))
+        self.client.post('/dashboard/fees/bulk-actions/', {'action': 'mark_unpaid', 'fee_ids[]': [first.pk]})
+        self.assertEqual(self.balance(), (200, 100, 100))
+        self.assertInStep()
+
+    def test_reconcile_command(self):
+        self.add_fee(100)
+        # Writes that bypass both the receivers and update_fees leave the ledger behind
+        Fee.objects.update(status='paid')
+        StudentFeeBalance.objects.filter(student=self.student).update(total_billed=0)
+
+        out = StringIO()
+        call_command('reconcile_fee_balances', '--dry-run', stdout=out)
+        self.assertEqual(self.balance(), (0, 0, 100))
+        self.assertEqual(len(reconcile_fee_balances(fix=False)), 1)
+
+        call_command('reconcile_fee_balances', stdout=StringIO())
+        self.assertEqual(self.balance(), (100, 100, 0))
+        self.assertInStep()
+
+
+class AttendanceBitmapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.class_level = Class.objects.create(level_category='PRIMARY', grade_level='4')
+        self.year = AcademicYear.objects.create(
+            name='2024/2025', start_date=date(2024, 9, 1), end_date=date(2025, 8, 31), is_current=True
+        )
+        self.students = [make_student(self.class_level, number) for number in range(1, 5)]
+        self.student = self.students[0]
+        self.terms = {term: term_dates(self.year, term) for term in TERMS}
+
+    def mark(self, day, status, student=None):
+        return Attendance.objects.create(student=student or self.student, date=day, status=status)
+
+    def bitmap(self, term):
+        return AttendanceBitmap.objects.get(student=self.student, academic_year=self.year, term=term)
+
+    def counts(self, start, end, student=None):
+        student = student or self.student
+        return attendance_counts([student.pk], start, end)[student.pk]
+
+    def raw_counts(self, student, start, end):
+        return Attendance.objects.filter(student=student, date__range=(start, end)).aggregate(
+            marked_days=Count('id'), present_days=Count('id', filter=Q(status=True))
+        )
+
+    def test_rebase(self):
+        start = date(2024, 9, 10)
+        value = 0b100001  # days 0 and 5
+        # An earlier start moves the bits up
+        self.assertEqual(_rebase(value, start, start - timedelta(days=2), start + timedelta(days=30)), 0b10000100)
+        # A later start drops the days before it
+        self.assertEqual(_rebase(value, start, start + timedelta(days=3), start + timedelta(days=30)), 0b100)
+        # An earlier end drops the days after it
+        self.assertEqual(_rebase(value, start, start, start + timedelta(days=4)), 0b1)
+
+    def test_rebase_when_year_dates_change(self):
+        self.mark(date(2024, 10, 15), True)
+        self.mark(date(2024, 10, 16), False)
+
+        AcademicYear.objects.filter(pk=self.year.pk).update(start_date=date(2024, 8, 25))
+        self.year.refresh_from_db()
+        start, end = term_dates(self.year, 'TERM1')
+        # The next write for the term moves its bitmap onto the new dates
+        self.mark(date(2024, 10, 17), True)
+
+        bitmap = self.bitmap('TERM1')
+        self.assertEqual((bitmap.start_date, bitmap.end_date), (start, end))
+        self.assertEqual(len(bytes(bitmap.marked)), ((end - start).days + 1 + 7) // 8)
+        self.assertEqual(self.counts(date(2024, 10, 1), date(2024, 10, 31)),
+                         {'marked_days': 3, 'present_days': 2, 'absent_days': 1})
+        first = (date(2024, 10, 15) - start).days
+        self.assertEqual(to_int(bitmap.marked), 0b111 << first)
+        self.assertEqual(to_int(bitmap.present), 0b101 << first)
+
+    def test_range_bits_at_term_edges(self):
+        term1_start, term1_end = self.terms['TERM1']
+        term2_start, term2_end = self.terms['TERM2']
+        self.assertEqual(term2_start, term1_end + timedelta(days=1))
+        for day, status in ((term1_start, True), (term1_end, False), (term2_start, True)):
+            self.mark(day, status)
+
+        bitmap = self.bitmap('TERM1')
+        marked, present, first, length = _range_bits(bitmap, term1_start, term1_end)
+        self.assertEqual((first, length), (term1_start, (term1_end - term1_start).days + 1))
+        self.assertEqual(marked, 1 | 1 << (length - 1))
+        self.assertEqual(present, 1)
+        # Ranges reaching past either end are clipped to the bitmap
+        self.assertEqual(_range_bits(bitmap, term1_start - timedelta(days=10), term1_start), (1, 1, term1_start, 1))
+        self.assertEqual(_range_bits(bitmap, term1_end, term1_end + timedelta(days=10)), (1, 0, term1_end, 1))
+
+        self.assertEqual(self.counts(term1_end, term2_start), {'marked_days': 2, 'present_days': 1, 'absent_days': 1})
+        self.assertEqual(self.counts(term2_start, term2_end), {'marked_days': 1, 'present_days': 1, 'absent_days': 0})
+
+    def test_clear_day(self):
+        day = date(2024, 11, 4)
+        attendance = self.mark(day, True)
+        self.mark(day + timedelta(days=1), False)
+        attendance.delete()
+
+        bitmap = self.bitmap('TERM1')
+        bit = 1 << (day - bitmap.start_date).days
+        self.assertFalse(to_int(bitmap.marked) & bit)
+        self.assertFalse(to_int(bitmap.present) & bit)
+        self.assertEqual(self.counts(day, day + timedelta(days=1)), {'marked_days': 1, 'present_days': 0, 'absent_days': 1})
+
+        # Clearing a day of a term with no bitmap stores nothing
+        apply_bitmap_changes([(self.student.pk, date(2025, 6, 2), True, None)])
+        self.assertFalse(AttendanceBitmap.objects.filter(term='TERM3').exists())
+
+    def test_streaks_across_terms(self):
+        term1_end = self.terms['TERM1'][1]
+        term2_start = self.terms['TERM2'][0]
+        days = [term1_end - timedelta(days=offset) for offset in range(5, -1, -1)]
+        days += [term2_start + timedelta(days=offset) for offset in range(4)]
+        statuses = [True, True, True, False, False, False, False, False, True, False]
+        for day, status in zip(days, statuses):
+            self.mark(day, status)
+
+        streaks = attendance_streaks(self.student, days[0], days[-1])
+        self.assertEqual(streaks, {'longest_present': 3, 'longest_absent': 5, 'current_absent': 1})
+        # Cut before the last two days, the absent run spanning both terms is still open
+        streaks = attendance_streaks(self.student, days[0], days[7])
+        self.assertEqual(streaks, {'longest_present': 3, 'longest_absent': 5, 'current_absent': 5})
+
+    def test_rebuild_matches_incremental(self):
+        rng = random.Random(7)
+        day = self.year.start_date
+        while day <= self.year.end_date:
+            if day.weekday() < 5 and rng.random() < 0.3:
+                commit_register(day, {student.pk: (rng.random() < 0.85, '') for student in self.students})
+            day += timedelta(days=1)
+        # Single-row writes go through the receivers
+        changed = Attendance.objects.filter(student=self.student).order_by('date')[10]
+        changed.status = not changed.status
+        changed.save()
+        Attendance.objects.filter(student=self.students[1]).order_by('date').first().delete()
+
+        def snapshot():
+            return {
+                (bitmap.student_id, bitmap.term): (bitmap.start_date, bytes(bitmap.marked), bytes(bitmap.present))
+                for bitmap in AttendanceBitmap.objects.all()
+            }
+
+        start, end = date(2024, 11, 15), date(2025, 6, 15)
+        self.assertEqual(len({term for term in TERMS if self.terms[term][0] <= end and self.terms[term][1] >= start}), 3)
+        incremental = snapshot()
+        for student in self.students:
+            counts = self.counts(start, end, student)
+            self.assertEqual(
+                {'marked_days': counts['marked_days'], 'present_days': counts['present_days']},
+                self.raw_counts(student, start, end),
+            )
+
+        rebuild_attendance_bitmaps(batch_size=3)
+        self.assertEqual(snapshot(), incremental)
+
+
+class ParseResultRowsTests(TestCase):
+    def test_header_names_are_normalised(self):
+        rows = [['\ufeffStudent ID', 'Marks-Obtained', 'REMARKS'], ['STU-1', '55', 'Good']]
+        self.assertEqual(list(parse_result_rows(rows)), [(2, None, 'STU-1', '55', 'Good')])
+
+    def test_header_found_by_any_column(self):
+        rows = [['No.', 'Exam', 'Marks', 'Student'], ['1', '7', '40', 'STU-1']]
+        self.assertEqual(list(parse_result_rows(rows)), [(2, '7', 'STU-1', '40', '')])
+
+    def test_rows_without_header(self):
+        rows = [['STU-1', '55', 'Good'], [], ['STU-2', '60']]
+        self.assertEqual(list(parse_result_rows(rows)), [(1, None, 'STU-1', '55', 'Good'), (3, None, 'STU-2', '60', '')])
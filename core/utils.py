@@ -67,25 +67,14 @@ def generate_teacher_id():
 
 def check_user_online(user):
     """
-    Check if user is online by checking the is_online field
+    Check if user is online from their presence heartbeat in the cache
     """
+    from .presence import is_user_online
+    
     try:
-        # Check if user has is_online field
-        if hasattr(user, 'is_online'):
-            return bool(user.is_online)
-        
-        # Check user profiles
-        if hasattr(user, 'student') and hasattr(user.student, 'is_online'):
-            return bool(user.student.is_online)
-        elif hasattr(user, 'teacher') and hasattr(user.teacher, 'is_online'):
-            return bool(user.teacher.is_online)
-        elif hasattr(user, 'parent') and hasattr(user.parent, 'is_online'):
-            return bool(user.parent.is_online)
-        
-        return False
-        
+        return is_user_online(user.id)
     except Exception as e:
-        print(f"DEBUG: Error checking online status: {e}")
+        print(f"Error checking online status: {e}")
         return False
 
 def get_user_type(user):
@@ -105,124 +94,69 @@ def get_user_type(user):
 
 def calculate_exam_positions(exam):
     """Calculate positions for an exam based on marks"""
-    from .models import ExamResult
-    from decimal import Decimal
-    
-    results = ExamResult.objects.filter(exam=exam).order_by('-marks_obtained')
-    
-    position = 1
-    prev_marks = None
-    same_rank_count = 0
-    
-    for result in results:
-        current_marks = result.marks_obtained
-        
-        if prev_marks is not None and current_marks == prev_marks:
-            same_rank_count += 1
-        else:
-            position += same_rank_count
-            same_rank_count = 1
-        
-        result.position = position
-        result.save()
-        prev_marks = current_marks
+    from .ranking import calculate_exam_positions as rank_exam
+    return rank_exam(exam)
 
 def get_parent_children(parent):
     """Helper function to get all children for a parent"""
-    from .models import Student
-    from django.db.models import Q
-    
-    children = parent.students.filter(is_active=True)
-    
-    # If no children in direct relationship, try to find by guardian info
-    if not children.exists():
-        children = Student.objects.filter(
-            Q(guardian_email=parent.email) | 
-            Q(guardian_phone=parent.phone)
-        ).filter(is_active=True).distinct()
-        
-        # Auto-link found children to parent
-        for child in children:
-            if child not in parent.students.all():
-                parent.students.add(child)
-    
-    return children
+    # Children found only through guardian details are linked in bulk by
+    # the link_guardian_children command, not on the request path
+    return parent.students.filter(is_active=True)
 
-def send_fee_reminder_email(fee, request):
-    """Send fee reminder email"""
-    from django.core.mail import send_mail
-    from django.template.loader import render_to_string
-    from django.utils import timezone
-    
-    subject = f'Fee Reminder: {fee.name} - {fee.student.current_class.name}'
-    context = {
-        'fee': fee,
-        'student': fee.student,
-        'today': timezone.now().date(),
-    }
-    
-    html_message = render_to_string('emails/fee_reminder.html', context)
-    plain_message = f"Dear Parent,\n\nThis is a reminder for the {fee.name} fee of {fee.amount} for {fee.student.full_name}. The due date is {fee.due_date}.\n\nThank you."
+def link_guardian_children(dry_run=False):
+    """
+    Link parents to active students whose guardian email or phone matches
+    theirs, for parents with no linked children yet. Runs a fixed number of
+    queries and writes all new links with one bulk insert.
+    Returns the list of (parent_id, student_id) pairs linked.
+    """
+    from .models import Parent, Student
+
+    parents = list(
+        Parent.objects.filter(students__isnull=True).order_by('pk').values_list('pk', 'email', 'phone')
+    )
+    if not parents:
+        return []
+
+    by_email = {}
+    by_phone = {}
+    for parent_id, email, phone in parents:
+        if email:
+            by_email.setdefault(email.strip().lower(), []).append(parent_id)
+        if phone:
+            by_phone.setdefault(phone.strip(), []).append(parent_id)
+
+    students = Student.objects.filter(is_active=True).exclude(
+        guardian_email='', guardian_phone=''
+    ).order_by('pk').values_list('pk', 'guardian_email', 'guardian_phone')
+
+    links = set()
+    for student_id, email, phone in students.iterator(chunk_size=2000):
+        for parent_id in by_email.get((email or '').strip().lower(), []):
+            links.add((parent_id, student_id))
+        for parent_id in by_phone.get((phone or '').strip(), []):
+            links.add((parent_id, student_id))
+
+    links = sorted(links)
+    if links and not dry_run:
+        Link = Parent.students.through
+        Link.objects.bulk_create(
+            [Link(parent_id=parent_id, student_id=student_id) for parent_id, student_id in links],
+            ignore_conflicts=True,
+        )
+    return links
+
+def send_fee_reminder_email(fee, request=None):
+    """Queue a fee reminder email; the send_queued_reminders worker delivers it"""
+    from .models import Fee
+    from .reminders import queue_fee_reminders
     
-    if fee.student.guardian_email:
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                'noreply@school.edu',
-                [fee.student.guardian_email],
-                html_message=html_message,
-                fail_silently=True,
-            )
-            return True
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            return False
-    return False
+    if not fee.student or not fee.student.guardian_email:
+        return False
+    return queue_fee_reminders(Fee.objects.filter(pk=fee.pk)) > 0
 
 def get_conversations(user):
     """Helper function to get conversations for a user"""
-    from .models import Message
-    from django.db.models import Q
-    from django.utils import timezone
-    
-    # Get unique users from sent and received messages
-    sent_users = Message.objects.filter(sender=user).values_list('receiver', flat=True).distinct()
-    received_users = Message.objects.filter(receiver=user).values_list('sender', flat=True).distinct()
-    
-    all_users = set(sent_users) | set(received_users)
-    
-    conversations = []
-    for user_id in all_users:
-        try:
-            from django.contrib.auth.models import User
-            other_user = User.objects.get(id=user_id)
-            latest_message = Message.objects.filter(
-                Q(sender=user, receiver=other_user) | 
-                Q(sender=other_user, receiver=user)
-            ).order_by('-sent_date').first()
-            
-            unread_count = Message.objects.filter(
-                sender=other_user,
-                receiver=user,
-                is_read=False
-            ).count()
-            
-            user_type = get_user_type(other_user)
-            
-            # Check online status
-            is_online = check_user_online(other_user)
-            
-            conversations.append({
-                'user': other_user,
-                'latest_message': latest_message,
-                'unread_count': unread_count,
-                'user_type': user_type,
-                'is_online': is_online,
-            })
-        except User.DoesNotExist:
-            continue
+    from .inbox import build_conversations, user_conversations
     
-    # Sort by latest message date
-    conversations.sort(key=lambda x: x['latest_message'].sent_date if x['latest_message'] else timezone.now(), reverse=True)
-    return conversations
\ No newline at end of file
+    return build_conversations(user, user_conversations(user))
@@ -79,33 +79,16 @@ def logout_view(request):
 # ADD: Helper function to update online status
 def update_user_online_status(user, is_online):
     """
-    Update user's online status across different user types
+    Update user's online status. Only the presence cache is written here;
+    the profile tables are updated in batches by flush_presence.
     """
+    from .presence import mark_offline, record_heartbeat
+    
     try:
-        # Convert boolean to integer (1 for online, 0 for offline)
-        online_status = 1 if is_online else 0
-        
-        # Update the base User model if it has is_online field
-        if hasattr(user, 'is_online'):
-            user.is_online = online_status
-            user.save(update_fields=['is_online'])
-        
-        # Update Student profile if exists
-        if hasattr(user, 'student'):
-            user.student.is_online = online_status
-            user.student.save(update_fields=['is_online'])
-        
-        # Update Teacher profile if exists
-        if hasattr(user, 'teacher'):
-            user.teacher.is_online = online_status
-            user.teacher.save(update_fields=['is_online'])
-        
-        # Update Parent profile if exists
-        if hasattr(user, 'parent'):
-            user.parent.is_online = online_status
-            user.parent.save(update_fields=['is_online'])
-            
-        print(f"DEBUG: Updated online status for {user.username} to {online_status}")
+        if is_online:
+            record_heartbeat(user.id)
+        else:
+            mark_offline(user.id)
         
     except Exception as e:
-        print(f"DEBUG: Error updating online status for {user.username}: {e}")
\ No newline at end of file
+        print(f"Error updating online status for {user.username}: {e}")
\ No newline at end of file
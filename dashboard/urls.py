@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path('metrics/', views.dashboard_metrics, name='dashboard_metrics'),
     path('dashboard/student/', views.student_dashboard, name='student_dashboard'),
     path('dashboard/teacher/', views.teacher_dashboard, name='teacher_dashboard'),
     path('dashboard/parent/', views.parent_dashboard, name='parent_dashboard'),
@@ -99,6 +100,7 @@ urlpatterns = [
     
     # Teacher AJAX endpoints
     path('teacher/mark-attendance/', views.mark_attendance, name='mark_attendance'),
+    path('teacher/attendance/batch/', views.attendance_batch, name='attendance_batch'),
     path('teacher/get-class-students/<int:class_id>/', views.get_class_students, name='get_class_students'),
 
     # Exam Management URLs
@@ -111,7 +113,10 @@ urlpatterns = [
     path('teacher/exams/<int:exam_id>/analysis/', views.exam_analysis, name='exam_analysis'),
     path('teacher/exams/<int:exam_id>/export-excel/', views.export_results_excel, name='export_results_excel'),
     path('teacher/exams/<int:exam_id>/export-pdf/', views.export_results_pdf, name='export_results_pdf'),
+    path('teacher/exams/<int:exam_id>/export-csv/', views.export_results_csv, name='export_results_csv'),
     path('teacher/exams/<int:exam_id>/bulk-upload/', views.bulk_upload_results, name='bulk_upload_results'),
+    path('teacher/result-imports/<int:job_id>/', views.result_import_status, name='result_import_status'),
+    path('teacher/result-imports/<int:job_id>/progress/', views.result_import_progress, name='result_import_progress'),
     
     path('teacher/subject-results/', views.subject_results, name='subject_results'),
     path('teacher/subject-results/<int:subject_id>/', views.subject_results, name='subject_results_detail'),
@@ -119,6 +124,11 @@ urlpatterns = [
     path('teacher/class-results/<int:class_id>/', views.class_results, name='class_results_detail'),
     path('teacher/report-card/<int:student_id>/', views.generate_report_card, name='generate_report_card'),
     path('teacher/report-card/<int:student_id>/<str:term>/', views.generate_report_card, name='generate_report_card_term'),
+    path('teacher/report-card/<int:student_id>/<str:term>/pdf/', views.download_report_card, name='download_report_card'),
+    path('teacher/class-results/<int:class_id>/report-cards/', views.start_class_report_cards, name='start_class_report_cards'),
+    path('teacher/report-card-jobs/<int:job_id>/', views.report_card_job_status, name='report_card_job_status'),
+    path('teacher/report-card-jobs/<int:job_id>/progress/', views.report_card_job_progress, name='report_card_job_progress'),
+    path('teacher/report-card-jobs/<int:job_id>/archive/<int:class_id>/', views.report_card_job_archive, name='report_card_job_archive'),
     
     # Academic Management (Missing URLs)
     path('academic/classes/', views.manage_classes, name='manage_classes'),
@@ -21,35 +21,67 @@ import string
 from core.consumer import check_user_online
 
 from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.core.files.storage import default_storage
 from django.core.exceptions import PermissionDenied
 
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-
 from core.utils import (
     check_user_online,
-    get_parent_children,
-    calculate_exam_positions,
-    get_conversations,
     get_user_type,
     generate_student_id,
     generate_teacher_id,
-    send_fee_reminder_email
+)
+from core.exam_stats import get_exam_statistics, get_exam_summary
+from core.dashboard_metrics import NUMERIC_METRICS, get_dashboard_metrics
+from core.fragment_cache import fragment_context
+from core.family_summary import family_summary
+from core.fee_ledger import fee_balance, fee_balances, update_fees
+from core.reminders import queue_fee_reminders
+from core.inbox import inbox_page, message_counts
+from core.conversations import (
+    HISTORY_PAGE_SIZE,
+    conversation_history,
+    encode_cursor,
+    mark_all_messages_read,
+    mark_conversation_read,
+    message_json,
+)
+from core.exports import (
+    ATTENDANCE_COLUMNS,
+    EXPENSE_COLUMNS,
+    FEE_COLUMNS,
+    PROMOTION_COLUMNS,
+    STUDENT_COLUMNS,
+    XLSX_CONTENT_TYPE,
+    exam_result_columns,
+    stream_csv,
+    wants_csv,
+    write_exam_results_xlsx,
+)
+from core.attendance import (
+    apply_register_batch, class_attendance_totals, commit_register, parse_register_records,
+    student_attendance_summary,
+)
+from core.report_cards import build_report_card_data, generate_report_cards, start_report_card_job
+from core.terms import TERM_NAMES
+from core.marks import (
+    MarkImportReport,
+    default_chunk_size,
+    detect_upload_format,
+    ingest_marks,
+    iter_exam_rows,
+    iter_upload_rows,
+    parse_result_rows,
+    start_import_job,
 )
 
 # Add these to your existing imports section
-import csv
 import io
 from io import BytesIO, StringIO
 from decimal import Decimal, InvalidOperation
 
 # For Excel export
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-
 try:
     import openpyxl
     OPENPYXL_AVAILABLE = True
@@ -278,54 +310,8 @@ def complete_setup(request):
 @login_required
 def dashboard(request):
     try:
-        # Get statistics
-        total_students = Student.objects.count()
-        total_teachers = Teacher.objects.filter(is_active=True).count()
-        total_classes = Class.objects.count()
-        total_subjects = Subject.objects.count()
-        
-        # Recent notices
-        recent_notices = Notice.objects.filter(is_active=True).order_by('-publish_date')[:5]
-        
-        # Today's attendance summary
-        today = timezone.now().date()
-        today_attendance = Attendance.objects.filter(date=today)
-        present_today = today_attendance.filter(status=True).count()
-        absent_today = today_attendance.filter(status=False).count()
-        
-        # Upcoming exams (next 30 days)
-        thirty_days_later = today + timedelta(days=30)
-        upcoming_exams = Exam.objects.filter(
-            exam_date__gte=today,
-            exam_date__lte=thirty_days_later
-        ).order_by('exam_date')[:5]
-        
-        # Fee collection this month
-        current_month = timezone.now().month
-        current_year = timezone.now().year
-        monthly_fee_collection = FeePayment.objects.filter(
-            payment_date__month=current_month,
-            payment_date__year=current_year
-        ).aggregate(total=Sum('amount_paid'))['total'] or 0
-        
-        # Format the fee collection to 2 decimal places
-        monthly_fee_collection = float(monthly_fee_collection)
-        
-        # Pending admissions
-        pending_admissions = AdmissionForm.objects.filter(status='PENDING').count()
-        
-        context = {
-            'total_students': total_students,
-            'total_teachers': total_teachers,
-            'total_classes': total_classes,
-            'total_subjects': total_subjects,
-            'recent_notices': recent_notices,
-            'present_today': present_today,
-            'absent_today': absent_today,
-            'upcoming_exams': upcoming_exams,
-            'monthly_fee_collection': monthly_fee_collection,
-            'pending_admissions': pending_admissions,
-        }
+        # Every tile comes from the cached dashboard metrics
+        context = get_dashboard_metrics()
         
         return render(request, 'dashboard/index.html', context)
         
@@ -346,6 +332,16 @@ def dashboard(request):
         }
         return render(request, 'dashboard/index.html', context)
 
+@login_required
+@require_GET
+def dashboard_metrics(request):
+    """AJAX endpoint the admin dashboard polls to refresh its tiles"""
+    try:
+        return JsonResponse({'success': True, 'metrics': get_dashboard_metrics(NUMERIC_METRICS)})
+    except Exception as e:
+        print(f"Dashboard metrics error: {e}")
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
 # Other users dashboards
 @login_required
 def student_dashboard(request):
@@ -365,11 +361,10 @@ def student_dashboard(request):
         
         today = timezone.now().date()
         
-        # Today's attendance
-        today_attendance = Attendance.objects.filter(
-            student=student, 
-            date=today
-        ).first()
+        # Today's attendance (only loaded when its cached fragment is missing)
+        today_attendance = SimpleLazyObject(
+            lambda: Attendance.objects.filter(student=student, date=today).first()
+        )
         
         # Upcoming exams (next 30 days)
         thirty_days_later = today + timezone.timedelta(days=30)
@@ -384,30 +379,23 @@ def student_dashboard(request):
             student=student
         ).select_related('exam', 'exam__subject').order_by('-exam__exam_date')[:5]
         
-        # Fee status
+        # Fee status for the current year from the fee ledger
         current_academic_year = AcademicYear.objects.filter(is_current=True).first()
-        fee_status = Fee.objects.filter(
-            student=student,
-            academic_year=current_academic_year
-        ).aggregate(
-            total_due=Sum('amount'),
-            total_paid=Sum('amount_paid')
-        )
+        fee_status = fee_balance(student, current_academic_year)
         
         # Attendance summary
-        attendance_summary = Attendance.objects.filter(student=student).aggregate(
-            total_days=Count('id'),
-            present_days=Count('id', filter=Q(status=True)),
-            absent_days=Count('id', filter=Q(status=False))
-        )
+        attendance_summary = SimpleLazyObject(lambda: student_attendance_summary(student))
         
         context = {
             'student': student,
+            'today': today,
+            'academic_year': current_academic_year,
             'today_attendance': today_attendance,
             'upcoming_exams': upcoming_exams,
             'recent_results': recent_results,
             'fee_status': fee_status,
             'attendance_summary': attendance_summary,
+            **fragment_context(),
         }
         
         return render(request, 'dashboard/student_dashboard.html', context)
@@ -415,7 +403,7 @@ def student_dashboard(request):
     except Exception as e:
         print(f"Student dashboard error: {e}")
         messages.error(request, "Error loading student dashboard.")
-        return render(request, 'dashboard/student_dashboard.html', {})
+        return render(request, 'dashboard/student_dashboard.html', fragment_context(cached=False))
 
 @login_required
 def teacher_dashboard(request):
@@ -429,19 +417,13 @@ def teacher_dashboard(request):
         teacher = request.user.teacher
         today = timezone.now().date()
         
-        print(f"DEBUG: Loading dashboard for teacher: {teacher.full_name}")
-        
         # Get teacher's classes (as class teacher)
         teacher_classes = Class.objects.filter(class_teacher=teacher)
         teacher_subjects = teacher.subjects.all()
         
-        print(f"DEBUG: Teacher classes count: {teacher_classes.count()}")
-        print(f"DEBUG: Teacher subjects count: {teacher_subjects.count()}")
-        
         # If teacher has no classes assigned, show all classes for demo
         if not teacher_classes.exists():
             teacher_classes = Class.objects.all()[:3]  # Show first 3 classes for demo
-            print(f"DEBUG: No classes assigned, showing demo classes: {teacher_classes.count()}")
         
         # Students in teacher's classes
         total_students = Student.objects.filter(
@@ -449,8 +431,6 @@ def teacher_dashboard(request):
             is_active=True
         ).count()
         
-        print(f"DEBUG: Total students in teacher's classes: {total_students}")
-        
         # Today's schedule - simplified approach
         today_schedule = []
         # For demo purposes, create a simple schedule
@@ -466,14 +446,9 @@ def teacher_dashboard(request):
                 })
         
         # Today's attendance
-        today_attendance = Attendance.objects.filter(
-            student__current_class__in=teacher_classes,
-            date=today
-        )
-        present_today = today_attendance.filter(status=True).count()
-        absent_today = today_attendance.filter(status=False).count()
-        
-        print(f"DEBUG: Attendance - Present: {present_today}, Absent: {absent_today}")
+        attendance_totals = class_attendance_totals(today, teacher_classes)
+        present_today = attendance_totals['present']
+        absent_today = attendance_totals['absent']
         
         # Assignments to grade - simplified
         assignments_to_grade = 5  # Demo value
@@ -494,10 +469,10 @@ def teacher_dashboard(request):
             'assignments_to_grade': assignments_to_grade,
             'recent_notices': recent_notices,
             'total_subjects': teacher_subjects.count(),
+            'today': today,
+            **fragment_context(),
         }
         
-        print(f"DEBUG: Final context - Students: {total_students}, Classes: {teacher_classes.count()}")
-        
         return render(request, 'dashboard/teacher_dashboard.html', context)
         
     except Exception as e:
@@ -516,6 +491,7 @@ def teacher_dashboard(request):
             'assignments_to_grade': 0,
             'recent_notices': [],
             'total_subjects': 0,
+            **fragment_context(cached=False),
         }
         return render(request, 'dashboard/teacher_dashboard.html', context)
 
@@ -613,34 +589,23 @@ def teacher_attendance(request):
             teacher_classes = Class.objects.filter(class_teacher=request.user.teacher)
             
             # Get all students from the teacher's classes
-            students = Student.objects.filter(current_class__in=teacher_classes)
+            student_ids = Student.objects.filter(current_class__in=teacher_classes).values_list('id', flat=True)
             
-            for student in students:
-                status_key = f'student_{student.id}'
-                remarks_key = f'remarks_{student.id}'
-                
+            entries = {}
+            for student_id in student_ids:
+                status_key = f'student_{student_id}'
                 if status_key in request.POST:
-                    status = request.POST.get(status_key) == 'present'
-                    remarks = request.POST.get(remarks_key, '')
-                    
-                    # Use get_or_create to handle attendance
-                    attendance, created = Attendance.objects.get_or_create(
-                        student=student,
-                        date=attendance_date,
-                        defaults={
-                            'status': status,
-                            'remarks': remarks,
-                            'marked_by_id': request.user.id  # Use ID directly
-                        }
+                    entries[student_id] = (
+                        request.POST.get(status_key) == 'present',
+                        request.POST.get(f'remarks_{student_id}', ''),
                     )
-                    
-                    if not created:
-                        attendance.status = status
-                        attendance.remarks = remarks
-                        attendance.marked_by_id = request.user.id
-                        attendance.save()
             
-            messages.success(request, 'Attendance marked successfully!')
+            # One read, one insert and one update for the whole register
+            outcome = commit_register(attendance_date, entries, marked_by=request.user)
+            created = sum(1 for status in outcome.values() if status == 'created')
+            updated = sum(1 for status in outcome.values() if status == 'updated')
+            
+            messages.success(request, f'Attendance marked successfully! ({created} new, {updated} updated)')
             return redirect('teacher_attendance')
             
         except Exception as e:
@@ -659,6 +624,19 @@ def teacher_attendance(request):
     teacher_classes = Class.objects.filter(class_teacher=request.user.teacher)
     students = Student.objects.filter(current_class__in=teacher_classes)
     
+    if wants_csv(request):
+        # Export a date range (defaults to the selected date)
+        try:
+            start_date = datetime.strptime(request.GET.get('start_date', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.GET.get('end_date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            start_date = end_date = attendance_date
+        records = Attendance.objects.filter(
+            student__in=students,
+            date__range=(start_date, end_date)
+        ).select_related('student', 'student__current_class').order_by('date', 'student__roll_number')
+        return stream_csv(records, ATTENDANCE_COLUMNS, f'attendance_{start_date}_{end_date}.csv')
+    
     # Get today's attendance for the selected date
     today_attendance = Attendance.objects.filter(
         student__in=students,
@@ -666,8 +644,9 @@ def teacher_attendance(request):
     )
     
     # Calculate counts
-    present_count = today_attendance.filter(status=True).count()
-    absent_count = today_attendance.filter(status=False).count()
+    attendance_totals = class_attendance_totals(attendance_date, teacher_classes)
+    present_count = attendance_totals['present']
+    absent_count = attendance_totals['absent']
     
     context = {
         'students': students,
@@ -1143,7 +1122,7 @@ def enter_marks(request, exam_id):
     existing_results = ExamResult.objects.filter(exam=exam)
     result_dict = {}
     for result in existing_results:
-        result_dict[result.student.id] = result
+        result_dict[result.student_id] = result
     
     # Check if all students already have marks
     all_graded = len(result_dict) == students.count()
@@ -1155,55 +1134,21 @@ def enter_marks(request, exam_id):
             return redirect('exam_results', exam_id=exam.id)
         
         try:
-            from decimal import Decimal, InvalidOperation
-            updated_count = 0
-            new_count = 0
-            
+            # Only rows with marks entered are saved
+            rows = []
             for student in students:
-                marks_key = f'marks_{student.id}'
-                remarks_key = f'remarks_{student.id}'
-                
-                if marks_key in request.POST:
-                    marks_obtained = request.POST.get(marks_key)
-                    remarks = request.POST.get(remarks_key, '')
-                    
-                    if marks_obtained:  # Only save if marks are provided
-                        try:
-                            # Convert to Decimal for proper storage
-                            marks_decimal = Decimal(marks_obtained)
-                            
-                            # Validate marks are within range
-                            if marks_decimal < 0:
-                                messages.error(request, f'Marks cannot be negative for {student.full_name}')
-                                continue
-                            if marks_decimal > exam.total_marks:
-                                messages.error(request, f'Marks cannot exceed total marks ({exam.total_marks}) for {student.full_name}')
-                                continue
-                            
-                            # Check if result already exists
-                            existing_result = result_dict.get(student.id)
-                            
-                            # Update or create exam result
-                            result, created = ExamResult.objects.update_or_create(
-                                exam=exam,
-                                student=student,
-                                defaults={
-                                    'marks_obtained': marks_decimal,
-                                    'remarks': remarks
-                                }
-                            )
-                            
-                            if created:
-                                new_count += 1
-                            else:
-                                updated_count += 1
-                            
-                        except InvalidOperation:
-                            messages.error(request, f'Invalid marks format for {student.full_name}')
-                            continue
-            
-            # Calculate positions after saving all marks
-            calculate_exam_positions(exam)
+                marks_obtained = request.POST.get(f'marks_{student.id}')
+                if marks_obtained:
+                    remarks = request.POST.get(f'remarks_{student.id}', '')
+                    rows.append((student.id, student.id, marks_obtained, remarks))
+            
+            report = ingest_marks(exam, rows, key='pk')
+            new_count = report.created
+            updated_count = report.updated
+            
+            student_names = {student.id: student.full_name for student in students}
+            for error in report.errors:
+                messages.error(request, f"{error['error']} for {student_names.get(error['row'], error['student'])}")
             
             if new_count > 0 and updated_count > 0:
                 messages.success(request, f'Successfully added {new_count} new marks and updated {updated_count} existing marks for {exam.name}!')
@@ -1229,28 +1174,6 @@ def enter_marks(request, exam_id):
     }
     return render(request, 'teachers/enter_marks.html', context)
 
-def calculate_exam_positions(exam):
-    """Calculate positions for an exam based on marks"""
-    results = ExamResult.objects.filter(exam=exam).order_by('-marks_obtained')
-    
-    position = 1
-    prev_marks = None
-    same_rank_count = 0
-    
-    for result in results:
-        # Convert Decimal to float for comparison
-        current_marks = float(result.marks_obtained)
-        
-        if prev_marks is not None and current_marks == prev_marks:
-            same_rank_count += 1
-        else:
-            position += same_rank_count
-            same_rank_count = 1
-        
-        result.position = position
-        result.save()
-        prev_marks = current_marks
-
 @login_required
 def edit_marks(request, exam_id):
     """Edit existing marks for an exam"""
@@ -1285,17 +1208,12 @@ def exam_results(request, exam_id):
     results = ExamResult.objects.filter(exam=exam).select_related('student').order_by('position')
     
     # Calculate statistics
-    total_students = results.count()
-    if total_students > 0:
-        average_marks = results.aggregate(Avg('marks_obtained'))['marks_obtained__avg']
-        highest_marks = results.aggregate(Max('marks_obtained'))['marks_obtained__max']
-        lowest_marks = results.aggregate(Min('marks_obtained'))['marks_obtained__min']
-        
-        # Grade distribution
-        grade_distribution = results.values('grade').annotate(count=Count('id')).order_by('grade')
-    else:
-        average_marks = highest_marks = lowest_marks = 0
-        grade_distribution = []
+    summary = get_exam_summary(exam)
+    total_students = summary.result_count
+    average_marks = summary.average
+    highest_marks = summary.max_marks or 0
+    lowest_marks = summary.min_marks or 0
+    grade_distribution = summary.grade_distribution
     
     context = {
         'exam': exam,
@@ -1319,62 +1237,26 @@ def exam_analysis(request, exam_id):
     teacher = request.user.teacher
     exam = get_object_or_404(Exam, id=exam_id, created_by=request.user)
     
-    results = ExamResult.objects.filter(exam=exam).select_related('student')
+    # Headline statistics and grade breakdown from the exam summary
+    stats = get_exam_summary(exam).as_stats()
     
-    # Detailed statistics
-    stats = results.aggregate(
-        avg_marks=Avg('marks_obtained'),
-        max_marks=Max('marks_obtained'),
-        min_marks=Min('marks_obtained'),
-        std_dev=StdDev('marks_obtained'),
-        count=Count('id')
-    )
-    
-    # Grade distribution
-    grade_data = results.values('grade').annotate(
-        count=Count('id'),
-        percentage=ExpressionWrapper(
-            Count('id') * 100.0 / stats['count'],
-            output_field=FloatField()
-        )
-    ).order_by('grade')
-    
-    # Marks distribution (by ranges)
-    marks_ranges = [
-        ('90-100', 90, 100),
-        ('80-89', 80, 89.99),
-        ('70-79', 70, 79.99),
-        ('60-69', 60, 69.99),
-        ('50-59', 50, 59.99),
-        ('40-49', 40, 49.99),
-        ('0-39', 0, 39.99),
-    ]
-    
-    marks_distribution = []
-    for range_name, min_val, max_val in marks_ranges:
-        count = results.filter(
-            marks_obtained__gte=min_val,
-            marks_obtained__lte=max_val
-        ).count()
-        percentage = (count / stats['count'] * 100) if stats['count'] > 0 else 0
-        marks_distribution.append({
-            'range': range_name,
-            'count': count,
-            'percentage': round(percentage, 1)
-        })
-    
-    # Top performers
-    top_performers = results.order_by('-marks_obtained')[:5]
+    # Marks histogram, percentiles and performers in one pass
+    distribution = get_exam_statistics(exam)
+    stats['percentiles'] = distribution['percentiles']
     
-    # Students needing improvement
-    need_improvement = results.filter(marks_obtained__lt=50).order_by('marks_obtained')[:5]
+    # Top performers and students needing improvement
+    performers = ExamResult.objects.filter(
+        pk__in=distribution['top_ids'] + distribution['bottom_ids']
+    ).select_related('student').in_bulk()
+    top_performers = [performers[pk] for pk in distribution['top_ids'] if pk in performers]
+    need_improvement = [performers[pk] for pk in distribution['bottom_ids'] if pk in performers]
     
     context = {
         'exam': exam,
         'teacher': teacher,
         'stats': stats,
-        'grade_data': grade_data,
-        'marks_distribution': marks_distribution,
+        'grade_data': stats['grade_data'],
+        'marks_distribution': distribution['marks_distribution'],
         'top_performers': top_performers,
         'need_improvement': need_improvement,
         'total_students': stats['count'],
@@ -1507,20 +1389,139 @@ def generate_report_card(request, student_id, term=None):
     # Get current academic year
     academic_year = AcademicYear.objects.filter(is_current=True).first()
     
-    if not term:
+    if term not in TERM_NAMES:
         term = 'TERM1'  # Default to first term
     
-    # Get all exam results for this student in the current academic year and term
-    # Note: You might need to add term field to Exam model or implement term logic
+    # Exams have no term field, so terms are thirds of the academic year
+    card = None
+    if academic_year:
+        cards = build_report_card_data(academic_year, term, student_ids=[student.id])
+        card = cards[0] if cards else None
     
     context = {
         'student': student,
         'teacher': teacher,
         'academic_year': academic_year,
         'term': term,
+        'terms': ReportCard.TERM_CHOICES,
+        'card': card,
     }
     return render(request, 'teachers/report_card.html', context)
 
+@login_required
+def download_report_card(request, student_id, term):
+    """Download a student's report card PDF, re-rendering it only if its data changed"""
+    if not hasattr(request.user, 'teacher'):
+        messages.error(request, "You don't have permission to access this page.")
+        return redirect('dashboard')
+    
+    student = get_object_or_404(Student, id=student_id)
+    if student.current_class not in Class.objects.filter(class_teacher=request.user.teacher):
+        messages.error(request, "This student is not in your class.")
+        return redirect('class_results')
+    
+    academic_year = AcademicYear.objects.filter(is_current=True).first()
+    if not academic_year or term not in TERM_NAMES:
+        messages.error(request, "No current academic year or invalid term.")
+        return redirect('generate_report_card', student_id=student.id)
+    
+    outcome = generate_report_cards(academic_year, term, student_ids=[student.id], workers=1)
+    report = next((report for reports in outcome['by_class'].values() for report in reports), None)
+    if report is None:
+        # Inactive students get no report card
+        messages.error(request, "No report card could be generated for this student.")
+        return redirect('generate_report_card', student_id=student.id)
+    return FileResponse(
+        report.pdf.open('rb'),
+        as_attachment=True,
+        filename=f"{student.student_id}_{term}_report_card.pdf",
+        content_type='application/pdf'
+    )
+
+@login_required
+@require_POST
+def start_class_report_cards(request, class_id):
+    """Queue report card generation for every student in a class"""
+    if not hasattr(request.user, 'teacher'):
+        messages.error(request, "You don't have permission to access this page.")
+        return redirect('dashboard')
+    
+    class_obj = get_object_or_404(Class, id=class_id, class_teacher=request.user.teacher)
+    academic_year = AcademicYear.objects.filter(is_current=True).first()
+    term = request.POST.get('term')
+    if not academic_year or term not in TERM_NAMES:
+        messages.error(request, "No current academic year or invalid term.")
+        return redirect('class_results_detail', class_id=class_obj.id)
+    
+    job = ReportCardJob.objects.create(
+        academic_year=academic_year,
+        term=term,
+        class_level=class_obj,
+        requested_by=request.user,
+        force=request.POST.get('force') == 'on',
+    )
+    start_report_card_job(job)
+    messages.info(request, f'Report card generation for {class_obj.name} has started.')
+    return redirect('report_card_job_status', job_id=job.id)
+
+@login_required
+def report_card_job_status(request, job_id):
+    """Progress page for a report card generation job"""
+    if not hasattr(request.user, 'teacher'):
+        messages.error(request, "You don't have permission to access this page.")
+        return redirect('dashboard')
+    
+    job = get_object_or_404(
+        ReportCardJob.objects.select_related('academic_year', 'class_level'),
+        id=job_id,
+        requested_by=request.user
+    )
+    
+    context = {
+        'job': job,
+        'teacher': request.user.teacher,
+    }
+    return render(request, 'teachers/report_card_job_status.html', context)
+
+@login_required
+@require_GET
+def report_card_job_progress(request, job_id):
+    """AJAX endpoint polled by the report card progress page"""
+    try:
+        job = ReportCardJob.objects.get(id=job_id, requested_by=request.user)
+    except ReportCardJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'status': job.status,
+        'progress': job.progress,
+        'total_cards': job.total_cards,
+        'processed_cards': job.processed_cards,
+        'rendered_cards': job.rendered_cards,
+        'skipped_cards': job.skipped_cards,
+        'message': job.message,
+        'is_finished': job.is_finished,
+        'archives': [
+            reverse('report_card_job_archive', args=[job.id, class_id]) for class_id in job.archives
+        ],
+    })
+
+@login_required
+def report_card_job_archive(request, job_id, class_id):
+    """Download the zip of a class's report cards"""
+    job = get_object_or_404(ReportCardJob, id=job_id, requested_by=request.user, status='COMPLETED')
+    name = job.archives.get(str(class_id))
+    if not name or not default_storage.exists(name):
+        raise Http404("Archive not found")
+    
+    return FileResponse(
+        default_storage.open(name, 'rb'),
+        as_attachment=True,
+        filename=f"report_cards_{job.term}_class_{class_id}.zip",
+        content_type='application/zip'
+    )
+
 @login_required
 def export_results_excel(request, exam_id):
     """Export exam results to Excel with comprehensive error handling"""
@@ -1531,95 +1532,24 @@ def export_results_excel(request, exam_id):
     exam = get_object_or_404(Exam, id=exam_id, created_by=request.user)
     results = ExamResult.objects.filter(exam=exam).select_related('student').order_by('position')
     
+    summary = get_exam_summary(exam)
+    
     # Check if there are any results to export
-    if not results.exists():
+    if not summary.result_count:
         messages.warning(request, 'No results available to export.')
         return redirect('exam_results', exam_id=exam.id)
     
     try:
-        import pandas as pd
-        from io import BytesIO
-        
-        # Create DataFrame with comprehensive data
-        data = []
-        for result in results:
-            percentage = (float(result.marks_obtained) / float(exam.total_marks)) * 100
-            data.append({
-                'Position': result.position or '-',
-                'Student ID': result.student.student_id,
-                'Student Name': result.student.full_name,
-                'Roll Number': result.student.roll_number,
-                'Class': exam.class_level.name,
-                'Marks Obtained': float(result.marks_obtained),
-                'Total Marks': float(exam.total_marks),
-                'Percentage': round(percentage, 2),
-                'Grade': result.grade,
-                'Remarks': result.remarks or '',
-                'Status': 'Pass' if float(result.marks_obtained) >= float(exam.passing_marks or 0) else 'Fail'
-            })
-        
-        df = pd.DataFrame(data)
-        
-        # Create Excel file in memory
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Main results sheet
-            df.to_excel(writer, sheet_name='Exam Results', index=False)
-            
-            # Summary statistics sheet
-            summary_data = {
-                'Exam Information': [
-                    'Exam Name', 'Subject', 'Class', 'Exam Date', 
-                    'Total Marks', 'Passing Marks', 'Total Students'
-                ],
-                'Details': [
-                    exam.name,
-                    exam.subject.name,
-                    exam.class_level.name,
-                    exam.exam_date.strftime('%Y-%m-%d'),
-                    float(exam.total_marks),
-                    float(exam.passing_marks or 0),
-                    len(results)
-                ]
-            }
-            
-            stats_data = {
-                'Statistics': [
-                    'Average Marks', 'Highest Marks', 'Lowest Marks', 
-                    'Pass Rate', 'Fail Rate'
-                ],
-                'Values': [
-                    float(results.aggregate(Avg('marks_obtained'))['marks_obtained__avg'] or 0),
-                    float(results.aggregate(Max('marks_obtained'))['marks_obtained__max'] or 0),
-                    float(results.aggregate(Min('marks_obtained'))['marks_obtained__min'] or 0),
-                    f"{(results.filter(marks_obtained__gte=exam.passing_marks or 0).count() / len(results) * 100):.1f}%",
-                    f"{(results.filter(marks_obtained__lt=exam.passing_marks or 0).count() / len(results) * 100):.1f}%"
-                ]
-            }
-            
-            pd.DataFrame(summary_data).to_excel(writer, sheet_name='Exam Summary', index=False)
-            pd.DataFrame(stats_data).to_excel(writer, sheet_name='Statistics', index=False)
-            
-            # Grade distribution sheet
-            grade_dist = results.values('grade').annotate(count=Count('id')).order_by('grade')
-            grade_data = []
-            for grade in grade_dist:
-                grade_data.append({
-                    'Grade': grade['grade'],
-                    'Count': grade['count'],
-                    'Percentage': f"{(grade['count'] / len(results) * 100):.1f}%"
-                })
-            pd.DataFrame(grade_data).to_excel(writer, sheet_name='Grade Distribution', index=False)
+        # Rows are streamed into a write-only workbook backed by a spooled temp file
+        output = write_exam_results_xlsx(exam, results, summary)
         
-        output.seek(0)
-        
-        # Create HTTP response
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
         filename = f"{exam.name.replace(' ', '_')}_results_{exam.exam_date}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response = FileResponse(
+            output,
+            as_attachment=True,
+            filename=filename,
+            content_type=XLSX_CONTENT_TYPE
+        )
         
         messages.success(request, f'Results exported successfully to Excel!')
         return response
@@ -1732,54 +1662,43 @@ def bulk_upload_results(request, exam_id):
         form = BulkResultForm(request.POST, request.FILES, teacher=teacher)
         if form.is_valid():
             try:
-                import csv
-                import io
-                
-                csv_file = request.FILES['results_file']
+                results_file = request.FILES['results_file']
+                file_format = detect_upload_format(results_file.name)
                 
-                # Read the CSV file
-                data_set = csv_file.read().decode('UTF-8')
-                io_string = io.StringIO(data_set)
-                
-                success_count = 0
-                error_count = 0
+                if form.cleaned_data.get('background'):
+                    job = ResultImportJob.objects.create(
+                        exam=exam,
+                        uploaded_by=request.user,
+                        file=results_file,
+                        original_name=results_file.name,
+                        file_format=file_format,
+                        chunk_size=form.cleaned_data.get('chunk_size') or default_chunk_size(),
+                    )
+                    start_import_job(job)
+                    messages.info(request, f'Import of {results_file.name} started. This page will update as rows are processed.')
+                    return redirect('result_import_status', job_id=job.id)
                 
-                for row in csv.reader(io_string, delimiter=','):
-                    if len(row) >= 2:
-                        student_id = row[0].strip()
-                        marks_obtained = row[1].strip()
-                        remarks = row[2].strip() if len(row) > 2 else ''
-                        
-                        try:
-                            # Find student
-                            student = Student.objects.get(
-                                student_id=student_id,
-                                current_class=exam.class_level,
-                                is_active=True
-                            )
-                            
-                            # Create or update result
-                            result, created = ExamResult.objects.update_or_create(
-                                exam=exam,
-                                student=student,
-                                defaults={
-                                    'marks_obtained': float(marks_obtained),
-                                    'remarks': remarks
-                                }
-                            )
-                            success_count += 1
-                            
-                        except Student.DoesNotExist:
-                            error_count += 1
-                        except ValueError:
-                            error_count += 1
+                # Parse the upload incrementally instead of reading it into one string
+                report = MarkImportReport()
+                parsed_rows = parse_result_rows(iter_upload_rows(results_file, file_format))
+                ingest_marks(exam, iter_exam_rows(exam, parsed_rows, report), report=report)
                 
-                # Recalculate positions
-                calculate_exam_positions(exam)
+                if report.error_count:
+                    messages.warning(
+                        request,
+                        f'Uploaded {report.success_count} results. {report.error_count} rows were rejected.'
+                    )
+                    context = {
+                        'form': form,
+                        'exam': exam,
+                        'teacher': teacher,
+                        'import_report': report,
+                    }
+                    return render(request, 'teachers/bulk_upload_results.html', context)
                 
                 messages.success(
                     request, 
-                    f'Successfully uploaded {success_count} results. {error_count} errors occurred.'
+                    f'Successfully uploaded {report.success_count} results.'
                 )
                 return redirect('exam_results', exam_id=exam.id)
                 
@@ -1794,9 +1713,48 @@ def bulk_upload_results(request, exam_id):
         'form': form,
         'exam': exam,
         'teacher': teacher,
+        'import_jobs': exam.import_jobs.select_related('uploaded_by')[:10],
     }
     return render(request, 'teachers/bulk_upload_results.html', context)
 
+@login_required
+def result_import_status(request, job_id):
+    """Progress page for a background result import"""
+    if not hasattr(request.user, 'teacher'):
+        messages.error(request, "You don't have permission to access this page.")
+        return redirect('dashboard')
+    
+    job = get_object_or_404(ResultImportJob.objects.select_related('exam'), id=job_id, uploaded_by=request.user)
+    
+    context = {
+        'job': job,
+        'exam': job.exam,
+        'teacher': request.user.teacher,
+    }
+    return render(request, 'teachers/result_import_status.html', context)
+
+@login_required
+@require_GET
+def result_import_progress(request, job_id):
+    """AJAX endpoint polled by the import progress page"""
+    try:
+        job = ResultImportJob.objects.get(id=job_id, uploaded_by=request.user)
+    except ResultImportJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Import not found'}, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'status': job.status,
+        'progress': job.progress,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'success_count': job.success_count,
+        'error_count': job.error_count,
+        'errors': job.errors[:100] if job.is_finished else [],
+        'message': job.message,
+        'is_finished': job.is_finished,
+    })
+
 # AJAX views for teacher functionality
 @login_required
 @require_POST
@@ -1834,6 +1792,38 @@ def mark_attendance(request):
             'error': str(e)
         })
 
+@login_required
+@require_POST
+def attendance_batch(request):
+    """
+    AJAX endpoint that saves a whole register (or just the changed rows) in
+    one request. The client sends an idempotency key so replays from its
+    offline queue are only applied once.
+    """
+    if not hasattr(request.user, 'teacher'):
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    
+    try:
+        payload = json.loads(request.body)
+        key = (request.headers.get('Idempotency-Key') or payload.get('idempotency_key') or '').strip()
+        attendance_date = datetime.strptime(payload.get('date', ''), '%Y-%m-%d').date()
+        records = payload.get('records') or []
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid register payload'}, status=400)
+    
+    if not key or len(key) > 100:
+        return JsonResponse({'success': False, 'error': 'A valid idempotency key is required'}, status=400)
+    if not isinstance(records, list):
+        return JsonResponse({'success': False, 'error': 'Records must be a list'}, status=400)
+    
+    allowed_ids = set(
+        Student.objects.filter(current_class__class_teacher=request.user.teacher).values_list('id', flat=True)
+    )
+    entries, rejected = parse_register_records(records, allowed_ids)
+    response, replayed = apply_register_batch(request.user, key, attendance_date, entries, rejected)
+    
+    return JsonResponse({'success': True, 'replayed': replayed, **response})
+
 @login_required
 def get_class_students(request, class_id):
     """AJAX view to get students for a specific class"""
@@ -1877,91 +1867,30 @@ def parent_dashboard(request):
             return redirect('dashboard')
         
         parent = request.user.parent
-        
-        print(f"DEBUG: Parent dashboard loaded for {parent.user.username}")
-        print(f"DEBUG: Parent data - Phone: {parent.phone}, Email: {parent.email}")
-        print(f"DEBUG: Parent full_name: {parent.full_name}")
-        
-        # Get children using helper function
-        children = get_parent_children(parent)
-        print(f"DEBUG: Children found: {children.count()}")
-        
-        # Initialize default data structures to avoid template errors
-        attendance_summary = {}
-        fee_status = {}
-        
-        # Get attendance summary for all children
-        for child in children:
-            try:
-                child_attendance = Attendance.objects.filter(student=child).aggregate(
-                    total_days=Count('id'),
-                    present_days=Count('id', filter=Q(status=True)),
-                    absent_days=Count('id', filter=Q(status=False))
-                )
-                attendance_summary[child.id] = child_attendance
-                print(f"DEBUG: Attendance for {child.full_name}: {child_attendance}")
-            except Exception as e:
-                print(f"DEBUG: Error getting attendance for {child.full_name}: {e}")
-                attendance_summary[child.id] = {'total_days': 0, 'present_days': 0, 'absent_days': 0}
-        
-        # Get upcoming exams
         today = timezone.now().date()
-        upcoming_exams = []
-        if children.exists():
-            try:
-                upcoming_exams = Exam.objects.filter(
-                    class_level__in=children.values('current_class')
-                ).order_by('exam_date')[:5]
-                print(f"DEBUG: Upcoming exams: {upcoming_exams.count()}")
-            except Exception as e:
-                print(f"DEBUG: Error getting upcoming exams: {e}")
-                upcoming_exams = []
         
-        # Get fee status
-        current_academic_year = AcademicYear.objects.filter(is_current=True).first()
-        for child in children:
-            try:
-                child_fees = Fee.objects.filter(
-                    student=child,
-                    academic_year=current_academic_year
-                ).aggregate(
-                    total_due=Sum('amount'),
-                    total_paid=Sum('amount_paid')
-                )
-                fee_status[child.id] = child_fees
-                print(f"DEBUG: Fees for {child.full_name}: {child_fees}")
-            except Exception as e:
-                print(f"DEBUG: Error getting fees for {child.full_name}: {e}")
-                fee_status[child.id] = {'total_due': 0, 'total_paid': 0}
+        # Children, attendance, fees, exams and results for the whole family
+        # in a fixed number of queries (see core/family_summary.py)
+        summary = family_summary(parent, today)
         
         # Get recent notices
-        recent_notices = []
-        try:
-            recent_notices = Notice.objects.filter(
-                Q(target_audience='ALL') | Q(target_audience='PARENTS'),
-                is_active=True
-            ).order_by('-publish_date')[:5]
-            print(f"DEBUG: Recent notices: {recent_notices.count()}")
-        except Exception as e:
-            print(f"DEBUG: Error getting recent notices: {e}")
-            recent_notices = []
+        recent_notices = Notice.objects.filter(
+            Q(target_audience='ALL') | Q(target_audience='PARENTS'),
+            is_active=True
+        ).order_by('-publish_date')[:5]
         
         context = {
             'parent': parent,
-            'children': children,
-            'attendance_summary': attendance_summary,
-            'upcoming_exams': upcoming_exams,
-            'fee_status': fee_status,
+            **summary,
             'recent_notices': recent_notices,
+            'today': today,
+            **fragment_context(),
         }
         
-        print("DEBUG: Rendering parent dashboard template")
         return render(request, 'dashboard/parent_dashboard.html', context)
         
     except Exception as e:
         print(f"Parent dashboard error: {e}")
-        import traceback
-        print(f"DEBUG: Full traceback: {traceback.format_exc()}")
         messages.error(request, "Error loading parent dashboard.")
         # Return minimal context to avoid template errors
         return render(request, 'dashboard/parent_dashboard.html', {
@@ -1970,7 +1899,9 @@ def parent_dashboard(request):
             'attendance_summary': {},
             'upcoming_exams': [],
             'fee_status': {},
+            'recent_results': {},
             'recent_notices': [],
+            **fragment_context(cached=False),
         })
 
 # Add these views to views.py
@@ -2055,10 +1986,15 @@ def parent_fee_history(request, parent_id):
         student__in=children
     ).select_related('student', 'class_level', 'academic_year').order_by('-created_at')
     
-    # Calculate totals
-    total_due = fees.aggregate(total=Sum('amount'))['total'] or 0
-    total_paid = fees.filter(status='paid').aggregate(total=Sum('amount'))['total'] or 0
-    total_pending = fees.filter(status='unpaid').aggregate(total=Sum('amount'))['total'] or 0
+    # Calculate totals from the fee ledger
+    totals = StudentFeeBalance.objects.filter(student__in=children).aggregate(
+        total_due=Sum('total_billed'),
+        total_paid=Sum('total_paid'),
+        total_pending=Sum('outstanding'),
+    )
+    total_due = totals['total_due'] or 0
+    total_paid = totals['total_paid'] or 0
+    total_pending = totals['total_pending'] or 0
     
     # Search and filter
     search_query = request.GET.get('search', '')
@@ -2078,6 +2014,9 @@ def parent_fee_history(request, parent_id):
     if child_filter:
         fees = fees.filter(student_id=child_filter)
     
+    if wants_csv(request):
+        return stream_csv(fees, FEE_COLUMNS, f'fee_history_{parent.id}.csv')
+    
     # Pagination
     paginator = Paginator(fees, 25)
     page_number = request.GET.get('page')
@@ -2133,6 +2072,13 @@ def all_students(request):
             Q(roll_number__icontains=search_query)
         )
     
+    if wants_csv(request):
+        return stream_csv(
+            students.select_related('current_class', 'current_section'),
+            STUDENT_COLUMNS,
+            'students.csv'
+        )
+    
     classes = Class.objects.all()
     sections = Section.objects.all()
     
@@ -2149,11 +2095,7 @@ def student_details(request, student_id):
     student = get_object_or_404(Student, student_id=student_id)
     
     # Get student's attendance summary
-    attendance_summary = Attendance.objects.filter(student=student).aggregate(
-        total_days=Count('id'),
-        present_days=Count('id', filter=Q(status=True)),
-        absent_days=Count('id', filter=Q(status=False))
-    )
+    attendance_summary = student_attendance_summary(student)
     
     # Get exam results
     exam_results = ExamResult.objects.filter(student=student).select_related('exam', 'exam__subject')
@@ -2599,6 +2541,9 @@ def promotion_history(request):
     if date_filter:
         promotions = promotions.filter(promotion_date__date=date_filter)
     
+    if wants_csv(request):
+        return stream_csv(promotions, PROMOTION_COLUMNS, 'promotion_history.csv')
+    
     # Calculate statistics - FIXED
     # Get unique students from the filtered queryset
     unique_students_count = promotions.values('student').distinct().count()
@@ -3342,6 +3287,9 @@ def expense_management(request):
     if date_filter:
         expenses = expenses.filter(date=date_filter)
     
+    if wants_csv(request):
+        return stream_csv(expenses, EXPENSE_COLUMNS, 'expenses.csv')
+    
     # Pagination
     paginator = Paginator(expenses, 10)
     page_number = request.GET.get('page')
@@ -3521,6 +3469,9 @@ def all_fees(request):
     if status_filter:
         fees_list = fees_list.filter(status=status_filter)
     
+    if wants_csv(request):
+        return stream_csv(fees_list, FEE_COLUMNS, 'fees.csv')
+    
     # Pagination
     paginator = Paginator(fees_list, 25)
     page_number = request.GET.get('page')
@@ -3560,14 +3511,14 @@ def bulk_fee_actions(request):
         print(f"DEBUG: Found {fees.count()} fees to process")
         
         if action == 'mark_paid':
-            updated_count = fees.update(status='paid', paid_date=timezone.now().date())
+            updated_count = update_fees(fees, status='paid', paid_date=timezone.now().date())
             return JsonResponse({
                 'success': True, 
                 'message': f'Successfully marked {updated_count} fee(s) as paid.'
             })
             
         elif action == 'mark_unpaid':
-            updated_count = fees.update(status='unpaid', paid_date=None)
+            updated_count = update_fees(fees, status='unpaid', paid_date=None)
             return JsonResponse({
                 'success': True, 
                 'message': f'Successfully marked {updated_count} fee(s) as unpaid.'
@@ -3582,10 +3533,10 @@ def bulk_fee_actions(request):
             })
             
         elif action == 'send_reminder':
-            # Implement reminder logic here
+            queued = queue_fee_reminders(fees)
             return JsonResponse({
                 'success': True, 
-                'message': f'Reminders sent for {fees.count()} fee(s).'
+                'message': f'Queued reminders for {queued} fee(s).'
             })
             
         else:
@@ -3620,8 +3571,8 @@ def fee_reminders(request):
         status='unpaid'
     ).select_related('student', 'student__current_class', 'student__current_section')
     
-    # Get recent sent reminders (you'll need to create a FeeReminder model)
-    recent_reminders = []  # Placeholder - you'll implement this later
+    # Most recent reminders from the outbox
+    recent_reminders = Reminder.objects.order_by('-sent_date')[:10]
     
     # Calculate statistics
     total_overdue = overdue_fees.count()
@@ -3630,6 +3581,16 @@ def fee_reminders(request):
     total_overdue_amount = overdue_fees.aggregate(Sum('amount'))['amount__sum'] or 0
     total_upcoming_amount = upcoming_fees.aggregate(Sum('amount'))['amount__sum'] or 0
     
+    # Each student's outstanding balance for the current year, from the fee ledger
+    current_academic_year = AcademicYear.objects.filter(is_current=True).first()
+    outstanding_balances = {
+        student_id: balance.outstanding
+        for student_id, balance in fee_balances(
+            all_unpaid_fees.exclude(student__isnull=True).values_list('student_id', flat=True).distinct(),
+            current_academic_year,
+        ).items()
+    }
+    
     # Filter by class if specified
     class_filter = request.GET.get('class')
     if class_filter:
@@ -3642,6 +3603,7 @@ def fee_reminders(request):
         'upcoming_fees': upcoming_fees,
         'all_unpaid_fees': all_unpaid_fees,
         'recent_reminders': recent_reminders,
+        'outstanding_balances': outstanding_balances,
         'classes': Class.objects.all(),
         'today': today,
         'next_week': next_week,
@@ -3665,16 +3627,10 @@ def send_fee_reminder(request, fee_id):
     try:
         fee = get_object_or_404(Fee, id=fee_id)
         
-        # Here you would implement your email/SMS sending logic
-        # For now, we'll just create a log entry
+        # Queued in the reminder outbox; the send_queued_reminders worker delivers it
+        queue_fee_reminders(Fee.objects.filter(pk=fee.pk), sent_via=request.POST.get('sent_via', 'email'))
         
-        # Create reminder record (you might want to create a FeeReminder model)
-        print(f"DEBUG: Sending reminder for fee ID {fee_id}")
-        print(f"DEBUG: Student: {fee.student.full_name}")
-        print(f"DEBUG: Amount: {fee.amount}")
-        print(f"DEBUG: Due Date: {fee.due_date}")
-        
-        messages.success(request, f'Reminder sent to {fee.student.full_name} for fee: {fee.name}')
+        messages.success(request, f'Reminder queued for {fee.student.full_name} for fee: {fee.name}')
         return redirect('fee_reminders')
         
     except Exception as e:
@@ -3698,7 +3654,6 @@ def send_bulk_reminders(request):
                     status='unpaid',  # Use status instead of is_paid
                     due_date__lt=today
                 ).select_related('student')
-                fee_count = fees.count()
             else:
                 # Send reminders for selected fees - handle comma-separated IDs
                 fee_ids = [int(fid.strip()) for fid in fee_ids_param.split(',') if fid.strip()]
@@ -3706,60 +3661,28 @@ def send_bulk_reminders(request):
                     id__in=fee_ids,
                     status='unpaid'  # Use status instead of is_paid
                 ).select_related('student')
-                fee_count = fees.count()
             
             # Check if we should mark as paid instead (from the bulk action)
             mark_paid = request.POST.get('mark_paid') == 'true'
             
             if mark_paid:
                 # Mark selected fees as paid
-                updated_count = fees.update(
+                updated_count = update_fees(
+                    fees,
                     status='paid',  # Use status instead of is_paid
                     paid_date=timezone.now().date()  # Use paid_date instead of payment_date
                 )
                 messages.success(request, f'Successfully marked {updated_count} fees as paid.')
                 return redirect('fee_reminders')
             
-            # Send reminders logic here
-            successful_reminders = 0
-            failed_reminders = 0
-            
-            for fee in fees:
-                try:
-                    # Create reminder record
-                    Reminder.objects.create(
-                        fee=fee,
-                        student_name=f"{fee.student.first_name} {fee.student.last_name}",
-                        fee_type=fee.get_fee_type_display(),
-                        sent_via='email',
-                        status='sent',
-                        notes=f"Reminder sent for {fee.get_fee_type_display()} fee of KES {fee.amount}"
-                    )
-                    
-                    # TODO: Add your actual email/SMS sending logic here
-                    # Example:
-                    # send_fee_reminder_email(fee)
-                    # send_fee_reminder_sms(fee)
-                    
-                    successful_reminders += 1
-                    
-                except Exception as e:
-                    print(f"Failed to send reminder for fee {fee.id}: {str(e)}")
-                    failed_reminders += 1
-            
-            if successful_reminders > 0:
-                messages.success(
-                    request, 
-                    f'Successfully sent {successful_reminders} fee reminder(s)!'
-                )
-            if failed_reminders > 0:
-                messages.warning(
-                    request,
-                    f'Failed to send {failed_reminders} reminder(s). Please check the logs.'
-                )
+            # Write every reminder to the outbox in one transaction; the
+            # send_queued_reminders worker delivers them in the background
+            queued = queue_fee_reminders(fees, sent_via=request.POST.get('sent_via', 'email'))
             
-            if successful_reminders == 0 and failed_reminders > 0:
-                messages.error(request, 'Failed to send any reminders. Please try again.')
+            if queued:
+                messages.success(request, f'Queued {queued} fee reminder(s) for delivery.')
+            else:
+                messages.warning(request, 'No unpaid fees with a student to remind.')
                 
         except Exception as e:
             messages.error(request, f'Error processing bulk reminders: {str(e)}')
@@ -3797,7 +3720,8 @@ def mark_bulk_paid(request):
                 fee_count = fees.count()
             
             # Update the fees
-            updated_count = fees.update(
+            updated_count = update_fees(
+                fees,
                 status='paid',  # Use status instead of is_paid
                 paid_date=timezone.now().date()  # Use paid_date instead of payment_date
             )
@@ -3832,25 +3756,6 @@ def mark_paid(request, fee_id):
     
     return redirect('fee_reminders')
 
-def send_fee_reminder_email(fee, request):
-    subject = f'Fee Reminder: {fee.name} - {fee.student.current_class.name}'
-    context = {
-        'fee': fee,
-        'student': fee.student,
-        'today': timezone.now().date(),
-    }
-    message = render_to_string('emails/fee_reminder.html', context)
-    
-    if fee.student.guardian_email:
-        send_mail(
-            subject,
-            message,
-            'noreply@petra.edu',
-            [fee.student.guardian_email],
-            html_message=message,
-            fail_silently=False,
-        )
-
 @login_required
 def fee_detail(request, fee_id):
     fee = get_object_or_404(Fee, id=fee_id)
@@ -3965,20 +3870,15 @@ def messaging(request):
         except Exception as e:
             messages.error(request, f'Error sending message: {str(e)}')
     
-    # Get conversations logic
-    conversations = get_conversations(request.user)
-    
-    # Get message counts for the dashboard cards
-    sent_count = Message.objects.filter(sender=request.user).count()
-    received_count = Message.objects.filter(receiver=request.user).count()
-    unread_count = Message.objects.filter(receiver=request.user, is_read=False).count()
+    # One page of conversations in a fixed number of queries
+    conversations_page, conversations = inbox_page(request.user, request.GET.get('page'))
     
     context = {
-        'users': User.objects.exclude(id=request.user.id),
+        'users': User.objects.exclude(id=request.user.id).select_related('teacher', 'student', 'parent'),
         'conversations': conversations,
-        'sent_count': sent_count,
-        'received_count': received_count,
-        'unread_count': unread_count,
+        'conversations_page': conversations_page,
+        # Message counts for the dashboard cards
+        **message_counts(request.user),
     }
     return render(request, 'messaging/messaging.html', context)
 
@@ -4051,9 +3951,10 @@ def send_message_ajax(request):
         # Add file info if file was uploaded
         if message.file:
             response_data['file_info'] = {
-                'name': message.file.name.split('/')[-1],
+                'name': message.file_name,
                 'url': message.file.url,
-                'size': message.file.size
+                'size': message.file_size,
+                'file_type': message.file_type or 'unknown',
             }
         
         return JsonResponse(response_data)
@@ -4068,58 +3969,13 @@ def send_message_ajax(request):
             'error': f'Server error: {str(e)}'
         }, status=500)
 
-def get_conversations(user):
-    """Helper function to get conversations for a user"""
-    # Get unique users from sent and received messages
-    sent_users = Message.objects.filter(sender=user).values_list('receiver', flat=True).distinct()
-    received_users = Message.objects.filter(receiver=user).values_list('sender', flat=True).distinct()
-    
-    all_users = set(sent_users) | set(received_users)
-    
-    conversations = []
-    for user_id in all_users:
-        try:
-            other_user = User.objects.get(id=user_id)
-            latest_message = Message.objects.filter(
-                models.Q(sender=user, receiver=other_user) | 
-                models.Q(sender=other_user, receiver=user)
-            ).order_by('-sent_date').first()
-            
-            unread_count = Message.objects.filter(
-                sender=other_user,
-                receiver=user,
-                is_read=False
-            ).count()
-            
-            user_type = get_user_type(other_user)
-            
-            # Check online status using the new function
-            is_online = check_user_online(other_user)
-            
-            conversations.append({
-                'user': other_user,
-                'latest_message': latest_message,
-                'unread_count': unread_count,
-                'user_type': user_type,
-                'is_online': is_online,
-            })
-        except User.DoesNotExist:
-            continue
-    
-    # Sort by latest message date
-    conversations.sort(key=lambda x: x['latest_message'].sent_date if x['latest_message'] else timezone.now(), reverse=True)
-    return conversations
-
 @login_required
 @require_POST
 def mark_all_read(request):
     """Mark all messages as read for the current user"""
     try:
-        # Mark all received messages as read
-        updated_count = Message.objects.filter(
-            receiver=request.user,
-            is_read=False
-        ).update(is_read=True)
+        # Mark all received messages as read and clear the unread counters
+        updated_count = mark_all_messages_read(request.user)
         
         return JsonResponse({
             'success': True,
@@ -4136,47 +3992,30 @@ def mark_all_read(request):
 @login_required
 @require_GET
 def get_conversation_messages(request, user_id):
-    """AJAX view to get messages for a specific conversation"""
+    """
+    AJAX view to get one page of a conversation. Pages are keyed on
+    (sent_date, id): pass ``before`` to load older messages or ``after``
+    to pick up new ones, with the cursors returned by the previous page.
+    """
     try:
-        other_user = get_object_or_404(User, id=user_id)
-        
-        # Get messages between current user and the other user
-        messages_qs = Message.objects.filter(
-            models.Q(sender=request.user, receiver=other_user) | 
-            models.Q(sender=other_user, receiver=request.user)
-        ).order_by('sent_date')
-        
-        # Mark received messages as read
-        Message.objects.filter(
-            sender=other_user,
-            receiver=request.user,
-            is_read=False
-        ).update(is_read=True)
-        
-        messages_data = []
-        for msg in messages_qs:
-            message_data = {
-                'id': msg.id,
-                'sender_id': msg.sender.id,
-                'sender_name': msg.sender.get_full_name() or msg.sender.username,
-                'content': msg.content,
-                'subject': msg.subject,
-                'sent_date': msg.sent_date.strftime('%Y-%m-%d %H:%M'),
-                'is_read': msg.is_read,
-                'is_outgoing': msg.sender.id == request.user.id,
-            }
-            
-            # Add file information if exists
-            if msg.file:
-                message_data['file_info'] = {
-                    'name': msg.file.name.split('/')[-1],
-                    'file_name': msg.file.name.split('/')[-1],
-                    'file_url': msg.file.url,
-                    'file_size': msg.file.size,
-                    'file_type': 'unknown'  # You might want to detect this
-                }
-            
-            messages_data.append(message_data)
+        other_user = get_object_or_404(User.objects.select_related('teacher', 'student', 'parent'), id=user_id)
+        before = request.GET.get('before') or None
+        after = request.GET.get('after') or None
+        
+        try:
+            limit = int(request.GET.get('limit', HISTORY_PAGE_SIZE))
+            page, has_more = conversation_history(request.user, other_user, before=before, after=after, limit=limit)
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'error': 'Invalid page cursor or limit'
+            }, status=400)
+        
+        # Mark received messages as read (older pages were read when first shown)
+        if before is None:
+            mark_conversation_read(request.user, other_user)
+        
+        messages_data = [message_json(msg, request.user.id) for msg in page]
         
         # Check if user is online using the new function
         is_online = check_user_online(other_user)
@@ -4184,6 +4023,9 @@ def get_conversation_messages(request, user_id):
         return JsonResponse({
             'success': True,
             'messages': messages_data,
+            'has_more': has_more,
+            'before_cursor': encode_cursor(page[0]) if page else before,
+            'after_cursor': encode_cursor(page[-1]) if page else after,
             'other_user': {
                 'id': other_user.id,
                 'name': other_user.get_full_name() or other_user.username,
@@ -4656,27 +4498,7 @@ def export_results_csv(request, exam_id):
     exam = get_object_or_404(Exam, id=exam_id, created_by=request.user)
     results = ExamResult.objects.filter(exam=exam).select_related('student').order_by('position')
     
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{exam.name}_results.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Position', 'Student ID', 'Student Name', 'Roll Number', 'Marks Obtained', 'Total Marks', 'Percentage', 'Grade', 'Remarks'])
-    
-    for result in results:
-        percentage = (float(result.marks_obtained) / float(exam.total_marks)) * 100
-        writer.writerow([
-            result.position,
-            result.student.student_id,
-            result.student.full_name,
-            result.student.roll_number,
-            float(result.marks_obtained),
-            float(exam.total_marks),
-            round(percentage, 2),
-            result.grade,
-            result.remarks or ''
-        ])
-    
-    return response
+    return stream_csv(results, exam_result_columns(exam), f'{exam.name}_results.csv')
 
 @login_required
 def manage_classes(request):
@@ -5630,35 +5452,3 @@ def delete_exam(request, exam_id):
         'exam': exam
     }
     return render(request, 'teachers/confirm_delete_exam.html', context)
-
-@login_required
-def export_results_csv(request, exam_id):
-    """Export exam results to CSV format"""
-    if not hasattr(request.user, 'teacher'):
-        messages.error(request, "You don't have permission to access this page.")
-        return redirect('dashboard')
-    
-    exam = get_object_or_404(Exam, id=exam_id, created_by=request.user)
-    results = ExamResult.objects.filter(exam=exam).select_related('student').order_by('position')
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{exam.name}_results.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Position', 'Student ID', 'Student Name', 'Roll Number', 'Marks Obtained', 'Total Marks', 'Percentage', 'Grade', 'Remarks'])
-    
-    for result in results:
-        percentage = (float(result.marks_obtained) / float(exam.total_marks)) * 100
-        writer.writerow([
-            result.position,
-            result.student.student_id,
-            result.student.full_name,
-            result.student.roll_number,
-            float(result.marks_obtained),
-            float(exam.total_marks),
-            round(percentage, 2),
-            result.grade,
-            result.remarks or ''
-        ])
-    
-    return response
\ No newline at end of file
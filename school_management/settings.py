@@ -75,6 +75,25 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache shared by every web, websocket and cron process (presence heartbeats,
+# grading scale, dashboard metrics). Set REDIS_URL in production, e.g.
+# redis://localhost:6379/1; without it each process gets its own local-memory
+# cache, which only suits a single development server.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -111,6 +130,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Rows committed per transaction by background result imports
+RESULT_IMPORT_CHUNK_SIZE = 500
+
+# Report card generation: PDF worker processes and cards stored per batch
+REPORT_CARD_WORKERS = 4
+REPORT_CARD_CHUNK_SIZE = 200
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'